@@ -0,0 +1,122 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import pandas as pd
+
+from helper import get_optimization_model
+from parameters import model_params
+from process_data import check_feasibility
+
+# ====================================
+
+logger = logging.getLogger(__name__ + ': ')
+
+# The model_params that are changed in the workers unless the caller says otherwise.
+# All the workers run in the same directory, so they shouldn't write the same .lp file.
+BATCH_MODEL_PARAMS = {'write_lp': False}
+
+# The columns of the result of solve_scenarios, besides those of the infeasible and failed scenarios
+RESULT_COLUMNS = ['status', 'objective_value', 'build_time', 'solve_time']
+
+# Set once per worker process by _init_worker
+_worker_state = {}
+
+
+def _init_worker(input_data, input_params, module, params):
+    model_params.update(params)
+    _worker_state['input_data'] = input_data
+    _worker_state['input_params'] = input_params
+    _worker_state['optimization_model'] = get_optimization_model(module)
+
+
+def _get_scenario_input_data(scenario):
+    if isinstance(scenario, pd.DataFrame):
+        return scenario
+    if _worker_state['input_data'] is None:
+        raise ValueError('input_data is needed for the scenarios that are given as demand vectors!')
+    input_data = _worker_state['input_data'].copy()
+    input_data['demand'] = list(scenario)
+    return input_data
+
+
+def _solve_scenario(scenario_id, scenario):
+    start = perf_counter()
+    input_data = _get_scenario_input_data(scenario)
+    optimizer = _worker_state['optimization_model'](input_data, _worker_state['input_params'])
+    build_time = perf_counter() - start
+
+    start = perf_counter()
+    optimizer.optimize()
+    solve_time = perf_counter() - start
+    return {'scenario': scenario_id, 'status': optimizer.status,
+            'objective_value': optimizer.objective_value,
+            'build_time': build_time, 'solve_time': solve_time}
+
+
+def _check_scenario(scenario, input_data, input_params):
+    # check_feasibility of a scenario without building its input_data
+    if isinstance(scenario, pd.DataFrame):
+        return check_feasibility(scenario, input_params)
+    if input_data is None:
+        return None  # the worker raises the error
+    return check_feasibility(input_data, input_params, demand=scenario)
+
+
+def solve_scenarios(input_params, scenarios, input_data=None, module=None, max_workers=None, params=None):
+    """
+    Builds and solves one model per scenario on a pool of 'max_workers' processes
+    (default is the number of processors).
+
+    'scenarios' is a dictionary of scenario id to either an input_data DataFrame
+    or a demand vector. A demand vector replaces the demand column of 'input_data',
+    which is sent to each worker only once. A list of scenarios gets ids 0, 1, ....
+    'module' is as in model_params (default is model_params['module']) and 'params'
+    are the model_params to use in the workers on top of BATCH_MODEL_PARAMS.
+
+    Returns a DataFrame indexed by the scenario id with the status, objective value,
+    and the model creation and optimization time of each scenario.
+    A scenario whose worker raises an exception is 'Error', with the exception in 'error',
+    and the other scenarios are still solved.
+    If check_feasibility is True in the params, the scenarios that are infeasible (see
+    process_data.check_feasibility) are not sent to the workers; they are 'Infeasible' with
+    the first period they fall short at and the shortfall ('shortfall_period', 'shortfall').
+    """
+    if not isinstance(scenarios, dict):
+        scenarios = dict(enumerate(scenarios))
+    if not scenarios:
+        return pd.DataFrame(columns=RESULT_COLUMNS, index=pd.Index([], name='scenario'))
+    if module is None:
+        module = model_params['module']
+    params = {**model_params, **BATCH_MODEL_PARAMS, **(params or {})}
+
+    start = perf_counter()
+    skipped = []
+    if params['check_feasibility']:
+        for scenario_id, scenario in scenarios.items():
+            infeasibility = _check_scenario(scenario, input_data, input_params)
+            if infeasibility:
+                skipped.append({'scenario': scenario_id, 'status': 'Infeasible', 'objective_value': None,
+                                'build_time': 0.0, 'solve_time': 0.0,
+                                'shortfall_period': infeasibility['period'], 'shortfall': infeasibility['shortfall']})
+        if skipped:
+            logger.info(f'{len(skipped)} infeasible scenarios are skipped!')
+    skipped_ids = {result['scenario'] for result in skipped}
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(input_data, input_params, module, params)) as executor:
+        futures = {scenario_id: executor.submit(_solve_scenario, scenario_id, scenario)
+                   for scenario_id, scenario in scenarios.items() if scenario_id not in skipped_ids}
+        results = []
+        for scenario_id, future in futures.items():
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.warning(f'Scenario {scenario_id} failed: {e!r}')
+                results.append({'scenario': scenario_id, 'status': 'Error', 'objective_value': None,
+                                'build_time': None, 'solve_time': None, 'error': repr(e)})
+    logger.info(f'{len(results)} scenarios are solved in {perf_counter() - start:.4f} sec!')
+
+    # In the order of the scenarios
+    results = pd.DataFrame(results + skipped).set_index('scenario')
+    return results.loc[list(scenarios)]
@@ -0,0 +1,915 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from generate_data import generate_input_data, get_input_params, get_native_instance, get_presolve_input_data
+from parameters import model_params
+
+# ====================================
+
+LOG_FORMAT = '%(asctime)s  %(name)-12s %(levelname)s : %(message)s'
+logger = logging.getLogger(__name__ + ': ')
+
+
+# ================== Model building ==================
+def benchmark_build(n_periods_list, repeat=3, module=None):
+    """
+    Compares the row by row construction of the model of a module (default is pulp) with the
+    vectorized one (pulp only) and the one from the model IR (see model_ir.py).
+    For each horizon, the best time of 'repeat' builds is reported.
+    """
+    from helper import get_optimization_model
+
+    optimization_model = get_optimization_model(module)
+    modes = ('vectorized', 'ir') if module in (None, 'pulp') else ('ir',)
+    build_mode = model_params['build_mode']
+    results = []
+    try:
+        for n_periods in n_periods_list:
+            input_data = generate_input_data(n_periods)
+            row = {'n_periods': n_periods}
+            for mode in (None,) + modes:
+                model_params['build_mode'] = mode
+                times = []
+                for _ in range(repeat):
+                    start = perf_counter()
+                    optimization_model(input_data, get_input_params())
+                    times.append(perf_counter() - start)
+                row[mode or 'default'] = min(times)
+            for mode in modes:
+                row[mode + '_speedup'] = row['default'] / row[mode]
+            logger.info(f"{n_periods:>9,} periods: default {row['default']:.4f}s, " + ', '.join(
+                f"{mode} {row[mode]:.4f}s ({row[mode + '_speedup']:.1f}x)" for mode in modes))
+            results.append(row)
+    finally:
+        model_params['build_mode'] = build_mode
+    return pd.DataFrame(results)
+
+
+def benchmark_registry(n_periods_list):
+    """
+    Compares a dict of period to variable, as the models used to keep their variables and
+    constraints, with a registry.Registry of the same variables: the memory of the container
+    (the variables themselves are the same), the time of looking up every period one by one,
+    and of getting all of them at once (with get_range for the registry), as the build loops do.
+    """
+    import tracemalloc
+
+    import pulp
+
+    from registry import Registry
+
+    results = []
+    for n_periods in n_periods_list:
+        variables = [pulp.LpVariable(name='X_' + str(i), lowBound=0) for i in range(n_periods)]
+        row = {'n_periods': n_periods}
+        for name, create in (('dict', lambda: dict(zip(range(n_periods), variables))),
+                             ('registry', lambda: Registry(0, list(variables)))):
+            tracemalloc.start()
+            container = create()
+            row[name + '_memory'] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            start = perf_counter()
+            for period in range(n_periods):
+                container[period]
+            row[name + '_lookup'] = perf_counter() - start
+            start = perf_counter()
+            if name == 'dict':
+                [container[period] for period in range(n_periods)]
+            else:
+                container.get_range(0, n_periods)
+            row[name + '_range'] = perf_counter() - start
+        logger.info(f"{n_periods:>9,} periods: dict {row['dict_memory'] / 1024 ** 2:.1f} MB, "
+                    f"lookup {row['dict_lookup']:.4f}s, range {row['dict_range']:.4f}s; "
+                    f"registry {row['registry_memory'] / 1024 ** 2:.1f} MB, "
+                    f"lookup {row['registry_lookup']:.4f}s, range {row['registry_range']:.4f}s")
+        results.append(row)
+    return pd.DataFrame(results)
+
+
+# ================== Native engine ==================
+def benchmark_native(n_instances, n_periods, seed=0):
+    """
+    The solve times of the 'native' module and of pulp (cbc) on random instances
+    (see generate_data.get_native_instance).
+    That they have the same status and objective value is checked in tests/test_native.py.
+    """
+    from optimization_model_native import OptimizationModel as NativeModel
+    from optimization_model_pulp import OptimizationModel as PulpModel
+
+    write_lp = model_params['write_lp']
+    model_params['write_lp'] = False
+    results = []
+    try:
+        for i in range(n_instances):
+            input_data, input_params = get_native_instance(seed + i, n_periods)
+            row = {'instance': i}
+            for name, optimization_model in (('native', NativeModel), ('pulp', PulpModel)):
+                start = perf_counter()
+                optimizer = optimization_model(input_data, input_params)
+                optimizer.optimize()
+                row[name + '_time'] = perf_counter() - start
+                row[name + '_status'] = optimizer.status
+            results.append(row)
+    finally:
+        model_params['write_lp'] = write_lp
+
+    results = pd.DataFrame(results)
+    logger.info(f"{n_instances} instances; mean time native {results['native_time'].mean():.4f}s, "
+                f"pulp {results['pulp_time'].mean():.4f}s")
+    return results
+
+
+# ================== Construction variants ==================
+def benchmark_variants(n_periods_list, backends=None, repeat=3):
+    """
+    Times every way of building the model in construction_variants (the best of 'repeat' builds)
+    and measures its peak memory in a separate build with tracemalloc. Note that tracemalloc only
+    sees the memory allocated by python, not the one allocated inside the solver libraries.
+    A variant that fails is logged and has its 'error' in the results instead of its times.
+    """
+    import tracemalloc
+
+    from construction_variants import VARIANTS, build_variant, get_variant_names
+
+    results = []
+    for backend in backends or list(VARIANTS):
+        if backend not in VARIANTS:
+            logger.info(f'{backend} is not available!')
+            continue
+        for n_periods in n_periods_list:
+            input_data = generate_input_data(n_periods)
+            for variables, constraints in get_variant_names(backend):
+                row = {'backend': backend, 'n_periods': n_periods, 'variables': variables, 'constraints': constraints}
+                try:
+                    times = []
+                    for _ in range(repeat):
+                        start = perf_counter()
+                        build_variant(backend, variables, constraints, input_data, get_input_params())
+                        times.append(perf_counter() - start)
+
+                    tracemalloc.start()
+                    try:
+                        build_variant(backend, variables, constraints, input_data, get_input_params())
+                        peak = tracemalloc.get_traced_memory()[1]
+                    finally:
+                        tracemalloc.stop()
+                except Exception as e:
+                    # e.g. a variant that the installed version of its package no longer supports;
+                    # the other variants are still timed
+                    logger.warning(f'{backend:>7} {n_periods:>9,} periods, {variables} + {constraints} failed: {e!r}')
+                    results.append({**row, 'error': repr(e)})
+                    continue
+
+                logger.info(f'{backend:>7} {n_periods:>9,} periods, {variables} + {constraints}: '
+                            f'{min(times):.4f}s, peak memory {peak / 1024 ** 2:.1f} MB')
+                results.append({**row, 'build_time': min(times), 'peak_memory': peak})
+    return pd.DataFrame(results)
+
+
+# ================== Rolling horizon ==================
+def benchmark_rolling_horizon(n_periods_list, window_lengths, overlaps, module=None):
+    """
+    Compares the rolling horizon with the full solve for every combination of
+    horizon, window length and overlap (the ones with overlap >= window length are skipped).
+    """
+    from rolling_horizon import compare_with_full_solve
+
+    write_lp = model_params['write_lp']
+    model_params['write_lp'] = False
+    results = []
+    try:
+        for n_periods in n_periods_list:
+            input_data = generate_input_data(n_periods)
+            for window_length in window_lengths:
+                for overlap in overlaps:
+                    if overlap >= window_length:
+                        continue
+                    row = compare_with_full_solve(input_data, get_input_params(), window_length, overlap, module)
+                    loss = 'n/a' if row['optimality_loss'] is None else f"{row['optimality_loss']:.4%}"
+                    logger.info(f"{n_periods:>9,} periods, window {window_length}, overlap {overlap}: "
+                                f"loss {loss}, full {row['full_time']:.4f}s, "
+                                f"rolling {row['rolling_time']:.4f}s (max window {row['max_window_time']:.4f}s)")
+                    results.append(row)
+    finally:
+        model_params['write_lp'] = write_lp
+    return pd.DataFrame(results)
+
+
+# ================== Sensitivity analysis ==================
+SENSITIVITY_RANGES = {'holding_cost': (0, 40), 'initial_inventory': (0, 20000), 'capacity_scale': (1, 1.5)}
+
+
+def benchmark_sensitivity(n_periods, n_values, parameters=tuple(SENSITIVITY_RANGES), module=None):
+    """
+    Compares sensitivity.sensitivity_analysis with building and solving the model
+    for each of 'n_values' values of each parameter (in SENSITIVITY_RANGES) independently.
+    """
+    from helper import get_optimization_model
+    from sensitivity import sensitivity_analysis
+
+    optimization_model = get_optimization_model(module)
+    input_data = generate_input_data(n_periods, capacity_tightness=0.7)
+    write_lp = model_params['write_lp']
+    model_params['write_lp'] = False
+    results = []
+    try:
+        for parameter in parameters:
+            values = np.linspace(*SENSITIVITY_RANGES[parameter], n_values)
+            start = perf_counter()
+            sweep_df, breakpoints_df = sensitivity_analysis(input_data, get_input_params(), parameter, values, module)
+            sensitivity_time = perf_counter() - start
+
+            start = perf_counter()
+            for value in values:
+                scenario_data, input_params = input_data, get_input_params()
+                if parameter == 'capacity_scale':
+                    scenario_data = input_data.assign(production_capacity=input_data['production_capacity'] * value)
+                else:
+                    input_params[parameter] = value
+                optimization_model(scenario_data, input_params).optimize()
+            independent_time = perf_counter() - start
+            logger.info(f'{parameter}: sensitivity {sensitivity_time:.4f}s ({sweep_df.solved.sum()} of {n_values} '
+                        f'values solved, {len(breakpoints_df)} breakpoints), independent {independent_time:.4f}s')
+            results.append({'parameter': parameter, 'sensitivity_time': sensitivity_time,
+                             'independent_time': independent_time, 'n_breakpoints': len(breakpoints_df)})
+    finally:
+        model_params['write_lp'] = write_lp
+    return pd.DataFrame(results)
+
+
+# ================== Start-up time ==================
+STARTUP_STATEMENTS = {
+    'import execute_oo': 'import execute_oo',
+    'cli --help': "import execute_oo, sys; sys.argv = ['execute_oo.py', '--help']; execute_oo.main()",
+}
+for _module in ('pulp', 'native', 'gurobi', 'cplex', 'xpress'):
+    STARTUP_STATEMENTS[f'load {_module}'] = ('import execute_oo, helper, process_data; '
+                                            f"helper.get_optimization_model('{_module}')")
+
+
+def _parse_importtime(stderr):
+    # Lines look like "import time:   self [us] | cumulative | imported package". The top level
+    # imports are the ones without indentation and their cumulative times add up to the total.
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, package = line[len('import time:'):].split('|')
+        if not package[1:].startswith(' '):
+            imports.append((package.strip(), int(cumulative)))
+    return imports
+
+
+def benchmark_startup(repeat=5, top=5):
+    """
+    Measures the cold start of execute_oo.py in fresh interpreters with 'python -X importtime'.
+    For each statement, the best of 'repeat' runs is reported along with its slowest top level imports.
+    The statements that fail (e.g. the solver package isn't installed) are skipped.
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for name, statement in STARTUP_STATEMENTS.items():
+        runs = []
+        for _ in range(repeat):
+            start = perf_counter()
+            process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                                     cwd=cwd, capture_output=True, text=True)
+            wall_time = perf_counter() - start
+            if process.returncode:
+                break
+            imports = _parse_importtime(process.stderr)
+            runs.append((wall_time, sum(t for _, t in imports) / 1e6, imports))
+        if not runs:
+            logger.info(f'{name:>18}: skipped')
+            continue
+        wall_time, import_time, imports = min(runs)
+        slowest = ', '.join(f'{package} {t / 1e3:.0f}ms'
+                            for package, t in sorted(imports, key=lambda x: -x[1])[:top])
+        logger.info(f'{name:>18}: wall {wall_time:.3f}s, imports {import_time:.3f}s ({slowest})')
+        results.append({'statement': name, 'wall_time': wall_time, 'import_time': import_time})
+    return pd.DataFrame(results)
+
+
+# ================== Data loading ==================
+def benchmark_load(n_rows_list, input_types=('csv', 'parquet', 'feather', 'npz', 'excel')):
+    """
+    Writes a generated input_data table of each size in every format to a temporary
+    directory and times reading it back. Excel is skipped beyond its row limit.
+    """
+    import tempfile
+
+    import helper
+    from convert_data import WRITERS
+
+    writers = {'csv': lambda df, path: df.to_csv(path, index=False),
+               'excel': lambda df, path: df.to_excel(path, sheet_name='input_data', index=False),
+               **WRITERS}
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in n_rows_list:
+            input_data = generate_input_data(n_rows)
+            row = {'n_rows': n_rows}
+            for input_type in input_types:
+                if input_type == 'excel' and n_rows >= 2 ** 20:
+                    continue
+                _, extension, reader = helper.INPUT_TYPES[input_type]
+                path = os.path.join(directory, 'input_data' + extension)
+                writers[input_type](input_data, path)
+                start = perf_counter()
+                reader([path])
+                row[input_type] = perf_counter() - start
+                os.remove(path)
+            logger.info(f'{n_rows:>11,} rows: ' + ', '.join(f'{input_type} {row[input_type]:.4f}s'
+                                                             for input_type in input_types if input_type in row))
+            results.append(row)
+    return pd.DataFrame(results)
+
+
+def benchmark_csv_chunks(n_rows, chunk_sizes):
+    """
+    Peak memory (tracemalloc) and time of going through a generated input_data csv file
+    with helper.read_csv_chunks, compared with reading it at once with default dtypes.
+    """
+    import tempfile
+    import tracemalloc
+
+    from helper import read_csv_chunks
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'input_data.csv')
+        generate_input_data(n_rows).to_csv(path, index=False)
+        for chunk_size in [None] + list(chunk_sizes):
+            tracemalloc.start()
+            start = perf_counter()
+            if chunk_size is None:
+                total_demand = pd.read_csv(path)['demand'].sum()
+            else:
+                total_demand = sum(chunk['demand'].to_numpy().sum(dtype=float) for chunk in read_csv_chunks(path, chunk_size))
+            elapsed = perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            logger.info(f"{n_rows:,} rows, chunk size {chunk_size or 'whole file'}: "
+                        f"{elapsed:.4f}s, peak memory {peak / 1024 ** 2:.1f} MB (total demand {total_demand:,.0f})")
+            results.append({'n_rows': n_rows, 'chunk_size': chunk_size, 'time': elapsed, 'peak_memory': peak})
+    return pd.DataFrame(results)
+
+
+# ================== In-memory solve ==================
+def _solve_highs_from_file(model, directory):
+    # The same HiGHS solve as highs_solver.solve_highs, but the model goes through an .mps file
+    import highspy
+
+    path = os.path.join(directory, model.name + '.mps')
+    model.writeMPS(path)
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    highs.readModel(path)
+    highs.run()
+    values = dict(zip(highs.getLp().col_names_, highs.getSolution().col_value))
+    for var in model.variables():
+        var.varValue = values.get(var.name, 0.0)
+
+
+def benchmark_highs(n_periods_list, repeat=3):
+    """
+    Compares three ways of solving the pulp model of each size:
+    'in_memory' passes the model to HiGHS as arrays (solver='highs'),
+    'mps_file' writes the model to an .mps file that HiGHS reads, which is the file round-trip
+    of the command line solvers, and 'cbc' is pulp's default. The best time of 'repeat' solves is reported.
+    """
+    import tempfile
+
+    import pulp
+
+    from highs_solver import solve_highs
+    from optimization_model_pulp import OptimizationModel
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_periods in n_periods_list:
+            optimizer = OptimizationModel(generate_input_data(n_periods), get_input_params())
+            row = {'n_periods': n_periods}
+            for name, solve in (('in_memory', lambda: solve_highs(optimizer.model)),
+                                ('mps_file', lambda: _solve_highs_from_file(optimizer.model, directory)),
+                                ('cbc', lambda: optimizer.model.solve(pulp.PULP_CBC_CMD(msg=False)))):
+                times = []
+                for _ in range(repeat):
+                    start = perf_counter()
+                    solve()
+                    times.append(perf_counter() - start)
+                row[name] = min(times)
+            row['round_trip'] = row['mps_file'] - row['in_memory']
+            logger.info(f"{n_periods:>9,} periods: in memory {row['in_memory']:.4f}s, mps file {row['mps_file']:.4f}s "
+                        f"(round trip {row['round_trip']:.4f}s), cbc {row['cbc']:.4f}s")
+            results.append(row)
+    return pd.DataFrame(results)
+
+
+def benchmark_race(n_periods_list, solvers=None):
+    """
+    The time of each solver on its own vs the race of them (solver='race') for the pulp model of
+    each size, with the winner of the race. The race isn't recorded in model_params['race_log'].
+    """
+    import pulp
+
+    from optimization_model_pulp import OptimizationModel
+    from solver_race import get_available_solvers, race
+
+    solvers = get_available_solvers(solvers)
+    race_log = model_params['race_log']
+    model_params['race_log'] = None
+    results = []
+    try:
+        for n_periods in n_periods_list:
+            optimizer = OptimizationModel(generate_input_data(n_periods), get_input_params())
+            row = {'n_periods': n_periods}
+            for name in solvers:
+                start = perf_counter()
+                race(optimizer.model, [name])
+                row[name] = perf_counter() - start
+            start = perf_counter()
+            race(optimizer.model, solvers)
+            row['race'] = perf_counter() - start
+            row['objective'] = optimizer.model.objective.value() \
+                if optimizer.model.status == pulp.LpStatusOptimal else None
+            logger.info(f'{n_periods:>9,} periods: ' + ', '.join(f'{name} {row[name]:.4f}s' for name in solvers)
+                        + f", race {row['race']:.4f}s")
+            results.append(row)
+    finally:
+        model_params['race_log'] = race_log
+    return pd.DataFrame(results)
+
+
+# ================== Presolve ==================
+def benchmark_presolve(n_periods_list, cost_run=30, capacity_tightness=0.85, module=None):
+    """
+    Compares the full solve with the presolved one (see presolve.py) on instances whose production
+    cost is the same for runs of 'cost_run' periods, with the size of the reduction and both objective values.
+    The lower the capacity_tightness (see generate_input_data), the more periods can be in a block.
+    """
+    from helper import get_optimization_model
+    from presolve import PresolvedModel
+
+    OptimizationModel = get_optimization_model(module)
+    write_lp = model_params['write_lp']
+    model_params['write_lp'] = False
+    results = []
+    try:
+        for n_periods in n_periods_list:
+            input_data = get_presolve_input_data(n_periods, cost_run, capacity_tightness=capacity_tightness)
+            start = perf_counter()
+            optimizer = OptimizationModel(input_data, get_input_params())
+            optimizer.optimize()
+            full_time = perf_counter() - start
+
+            start = perf_counter()
+            presolved = PresolvedModel(input_data, get_input_params(), OptimizationModel)
+            presolved.optimize()
+            presolve_time = perf_counter() - start
+            row = {'n_periods': n_periods, 'n_blocks': presolved.report['n_blocks'],
+                   'n_rounds': presolved.report['n_rounds'], 'full_time': full_time, 'presolve_time': presolve_time,
+                   'time_saved': 1 - presolve_time / full_time, 'full_objective': optimizer.objective_value,
+                   'presolve_objective': presolved.objective_value}
+            logger.info(f"{n_periods:>9,} periods in {row['n_blocks']:,} blocks ({row['n_rounds']} rounds): "
+                        f"full {full_time:.4f}s, presolved {presolve_time:.4f}s ({row['time_saved']:.1%} saved), "
+                        f"objective {row['full_objective']:,.2f} vs {row['presolve_objective']:,.2f}")
+            results.append(row)
+    finally:
+        model_params['write_lp'] = write_lp
+    return pd.DataFrame(results)
+
+
+# ================== Setup costs ==================
+def benchmark_setup_costs(n_periods_list, setup_cost=100000, capacity_tightness=0.6, module=None, time_limit=60):
+    """
+    Compares the MIP of the model with setup costs (from scratch and from the warm start of lot_sizing.py)
+    with the engines of lot_sizing.py, on the uncapacitated (the capacities are the total demand) and
+    the capacitated version of each instance: wagner_whitin is optimal for the former, and
+    capacitated_heuristic is not necessarily optimal for the latter, so its gap to the MIP is reported.
+    The MIP solves stop at 'time_limit' seconds.
+    """
+    from helper import get_optimization_model
+    from lot_sizing import solve_setup_lot_sizing
+
+    OptimizationModel = get_optimization_model(module)
+    params = {name: model_params[name] for name in ('write_lp', 'warm_start', 'time_limit')}
+    model_params.update(write_lp=False, time_limit=time_limit)
+    results = []
+    try:
+        for n_periods in n_periods_list:
+            capacitated = generate_input_data(n_periods, capacity_tightness=capacity_tightness)
+            capacitated['setup_cost'] = float(setup_cost)
+            uncapacitated = capacitated.assign(production_capacity=capacitated['demand'].sum())
+            for case, input_data in (('uncapacitated', uncapacitated), ('capacitated', capacitated)):
+                row = {'n_periods': n_periods, 'case': case}
+                for warm_start in (False, True):
+                    model_params['warm_start'] = warm_start
+                    start = perf_counter()
+                    optimizer = OptimizationModel(input_data, get_input_params())
+                    optimizer.optimize()
+                    name = 'mip_warm_start' if warm_start else 'mip'
+                    row[name + '_time'] = perf_counter() - start
+                    row[name + '_objective'] = optimizer.objective_value
+                start = perf_counter()
+                production, inventory, setups, optimal = solve_setup_lot_sizing(input_data, get_input_params())
+                row['lot_sizing_time'] = perf_counter() - start
+                row['lot_sizing_optimal'] = optimal
+                row['lot_sizing_objective'] = float(
+                    input_data['production_cost'].to_numpy() @ production + get_input_params()['holding_cost']
+                    * inventory.sum() + input_data['setup_cost'].to_numpy()[setups].sum())
+                best = row['mip_warm_start_objective'] or row['mip_objective']
+                row['lot_sizing_gap'] = row['lot_sizing_objective'] / best - 1 if best else None
+                gap = 'n/a' if row['lot_sizing_gap'] is None else f"{row['lot_sizing_gap']:.4%}"
+                logger.info(f"{n_periods:>9,} periods, {case}: mip {row['mip_time']:.4f}s, "
+                            f"warm start {row['mip_warm_start_time']:.4f}s, "
+                            f"lot_sizing {row['lot_sizing_time']:.4f}s (gap {gap})")
+                results.append(row)
+    finally:
+        model_params.update(params)
+    return pd.DataFrame(results)
+
+
+def benchmark_multi_product(n_products_list, n_plants=10, n_periods=52, plants_per_product=2, active_share=0.5,
+                            solve=True):
+    """
+    The size and the time of building (and optionally solving) the model of multi_product.py for
+    generated instances, to see that they grow with the number of (product, plant, period) triples
+    rather than with products x plants x periods.
+    """
+    from generate_data import generate_multi_product_instance
+    from multi_product import MultiProductModel, build_multi_product_ir
+
+    params = {name: model_params[name] for name in ('write_lp',)}
+    model_params['write_lp'] = False
+    results = []
+    try:
+        for n_products in n_products_list:
+            input_df_dict = generate_multi_product_instance(n_products, n_plants, n_periods,
+                                                            plants_per_product=plants_per_product,
+                                                            active_share=active_share)
+            input_params = input_df_dict.pop('parameters').set_index('attribute')['value'].to_dict()
+            row = {'n_products': n_products, 'dense': n_products * n_plants * n_periods,
+                   'n_triples': len(input_df_dict['product_data'])}
+            start = perf_counter()
+            build_multi_product_ir(input_df_dict, input_params)
+            row['ir_time'] = perf_counter() - start
+            start = perf_counter()
+            optimizer = MultiProductModel(input_df_dict, input_params)
+            row['build_time'] = perf_counter() - start
+            row['n_constraints'] = len(optimizer.ir['rhs'])
+            if solve:
+                start = perf_counter()
+                optimizer.optimize()
+                row['solve_time'] = perf_counter() - start
+            logger.info(f"{n_products:>7,} products: {row['n_triples']:,} of {row['dense']:,} triples, "
+                        f"ir {row['ir_time']:.4f}s, build {row['build_time']:.4f}s"
+                        + (f", solve {row['solve_time']:.4f}s" if solve else ''))
+            results.append(row)
+    finally:
+        model_params.update(params)
+    return pd.DataFrame(results)
+
+
+# ================== Output ==================
+def benchmark_extraction(n_periods_list, repeat=3):
+    """
+    Compares write_outputs, which reads the value of one variable at a time into a Series,
+    with extract_values + create_output_df_dict on a pulp model of each size.
+    The variables are given values directly, so no solver is needed.
+    """
+    from optimization_model_pulp import OptimizationModel
+    from process_data import create_output_df_dict, extract_values, write_outputs
+
+    results = []
+    for n_periods in n_periods_list:
+        optimizer = OptimizationModel(generate_input_data(n_periods), get_input_params())
+        dict_of_variables = {'production_variables': optimizer.production_variables,
+                             'inventory_variables': optimizer.inventory_variables}
+        for var in dict_of_variables.values():
+            for k, v in var.items():
+                v.varValue = float(k)
+        row = {'n_periods': n_periods}
+        for name, extract in (('write_outputs', lambda: write_outputs(dict_of_variables)),
+                              ('bulk', lambda: create_output_df_dict(extract_values(dict_of_variables)))):
+            times = []
+            for _ in range(repeat):
+                start = perf_counter()
+                extract()
+                times.append(perf_counter() - start)
+            row[name] = min(times)
+        row['speedup'] = row['write_outputs'] / row['bulk']
+        logger.info(f"{n_periods:>9,} periods: write_outputs {row['write_outputs']:.4f}s, "
+                    f"bulk {row['bulk']:.4f}s ({row['speedup']:.1f}x)")
+        results.append(row)
+    return pd.DataFrame(results)
+
+
+def benchmark_output_types(n_periods_list, output_types=('csv', 'csv.gz', 'csv.zst', 'parquet', 'feather'),
+                           wide_output=False):
+    """
+    Writes the output tables of a generated solution of each size in every output type
+    to a temporary directory and reports the write time and the total file size.
+    """
+    import tempfile
+
+    from helper import write_output
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n_periods in n_periods_list:
+            periods = np.arange(1, n_periods + 1)
+            values = np.arange(n_periods, dtype=float)
+            output_df_dict = {'production_variables': pd.DataFrame({'period': periods, 'value': values}),
+                              'inventory_variables': pd.DataFrame({'period': periods, 'value': values})}
+            for output_type in output_types:
+                output_folder = os.path.join(directory, output_type)
+                start = perf_counter()
+                write_output(output_df_dict, output_folder, output_type, wide_output)
+                elapsed = perf_counter() - start
+                size = sum(entry.stat().st_size for entry in os.scandir(output_folder))
+                logger.info(f'{n_periods:>9,} periods, {output_type:<7}: {elapsed:.4f}s, {size / 1024 ** 2:.2f} MB')
+                results.append({'n_periods': n_periods, 'output_type': output_type, 'time': elapsed, 'size': size})
+    return pd.DataFrame(results)
+
+
+# ================== Scaling ==================
+SCALING_PHASES = ('load', 'build', 'lp_write', 'solve', 'extraction', 'csv_write')
+MODULES = ('pulp', 'native', 'gurobi', 'cplex', 'xpress')
+
+
+def _write_lp(module, optimizer, path):
+    if module == 'pulp':
+        optimizer.model.writeLP(path)
+    elif module == 'gurobi':
+        optimizer.model.write(path)
+    elif module == 'cplex':
+        optimizer.model.export_as_lp(path)
+    elif module == 'xpress':
+        optimizer.model.write(path, 'lp')
+
+
+def _run_phases(module, optimization_model, n_periods, directory):
+    from generate_data import generate_instance, write_instance
+    from helper import read_csv_files, write_to_csv
+    from process_data import get_modified_data
+
+    write_instance(generate_instance(n_periods), directory)
+    times = {}
+
+    start = perf_counter()
+    input_files = [os.path.join(directory, name + '.csv') for name in ('input_data', 'parameters')]
+    input_df_dict, input_param_dict = get_modified_data(read_csv_files(input_files))
+    times['load'] = perf_counter() - start
+
+    start = perf_counter()
+    optimizer = optimization_model(input_df_dict['input_data'], input_param_dict)
+    times['build'] = perf_counter() - start
+
+    start = perf_counter()
+    _write_lp(module, optimizer, os.path.join(directory, 'prod_planning.lp'))
+    times['lp_write'] = perf_counter() - start
+
+    start = perf_counter()
+    optimizer.optimize()
+    times['solve'] = perf_counter() - start
+
+    start = perf_counter()
+    output_df = optimizer.get_output()
+    times['extraction'] = perf_counter() - start
+
+    start = perf_counter()
+    write_to_csv(output_df, output_folder=os.path.join(directory, 'output'))
+    times['csv_write'] = perf_counter() - start
+    return times, optimizer
+
+
+def benchmark_scaling(n_periods_list, modules=MODULES, report_file=None, time_budget=600):
+    """
+    Times each phase of execute_oo.py (see SCALING_PHASES) on generated instances for every
+    module that can be imported. Once a horizon takes more than 'time_budget' seconds for a
+    module, its longer horizons are skipped, and so are they once a horizon fails (its status is 'Error'
+    and the exception is in 'error'). The report is a dictionary (written as json to
+    'report_file' if given) that can be compared with another one by compare_reports.
+    """
+    import json
+    import platform
+    import tempfile
+    from datetime import datetime, timezone
+
+    from helper import get_optimization_model
+
+    write_lp = model_params['write_lp']
+    model_params['write_lp'] = False
+    results = []
+    try:
+        for module in modules:
+            try:
+                optimization_model = get_optimization_model(None if module == 'pulp' else module)
+            except ImportError:
+                logger.info(f'{module} is not available!')
+                continue
+            for n_periods in sorted(n_periods_list):
+                try:
+                    with tempfile.TemporaryDirectory() as directory:
+                        times, optimizer = _run_phases(module, optimization_model, n_periods, directory)
+                except Exception as e:
+                    # Recorded like the time budget: the longer horizons of the module are skipped
+                    logger.warning(f'{module:>7} {n_periods:>9,} periods failed: {e!r}; '
+                                   f'the longer horizons are skipped!')
+                    results.append({'module': module, 'n_periods': n_periods,
+                                    'build_mode': model_params['build_mode'], 'status': 'Error', 'error': repr(e)})
+                    break
+                results.append({'module': module, 'n_periods': n_periods, 'build_mode': model_params['build_mode'],
+                                'status': optimizer.status, 'objective_value': optimizer.objective_value,
+                                **times})
+                logger.info(f'{module:>7} {n_periods:>9,} periods: '
+                            + ', '.join(f'{phase} {times[phase]:.4f}s' for phase in SCALING_PHASES))
+                if sum(times.values()) > time_budget:
+                    logger.info(f'{module} took more than {time_budget}s; the longer horizons are skipped!')
+                    break
+    finally:
+        model_params['write_lp'] = write_lp
+
+    report = {'metadata': {'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                           'python': platform.python_version(), 'platform': platform.platform(),
+                           'numpy': np.__version__, 'pandas': pd.__version__},
+              'phases': list(SCALING_PHASES),
+              'results': results}
+    if report_file:
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        logger.info(f'The report is written to {report_file}!')
+    return report
+
+
+def compare_reports(old_report_file, new_report_file, threshold=1.2):
+    """
+    Ratio of the new to the old time of each phase, for the modules and horizons in both reports.
+    The ones that got slower by more than 'threshold' are logged.
+    """
+    import json
+
+    frames = []
+    for report_file in (old_report_file, new_report_file):
+        with open(report_file) as f:
+            report = json.load(f)
+        # The horizons that failed have no times (see benchmark_scaling)
+        frames.append(pd.DataFrame(report['results']).set_index(['module', 'n_periods'])
+                      .reindex(columns=report['phases']))
+    ratio = (frames[1] / frames[0]).dropna(how='all')
+    for (module, n_periods), row in ratio.iterrows():
+        for phase, value in row[row > threshold].items():
+            logger.warning(f'{module} {n_periods:,} periods: {phase} is {value:.2f}x slower!')
+    return ratio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks for the production planning model.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='row by row vs vectorized (or IR) model creation')
+    build_parser.add_argument('--periods', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    build_parser.add_argument('--repeat', type=int, default=3)
+    build_parser.add_argument('--module', choices=['pulp', 'gurobi', 'cplex', 'xpress'])
+
+    native_parser = subparsers.add_parser('native', help="solve times of the 'native' module vs pulp")
+    native_parser.add_argument('--instances', type=int, default=20)
+    native_parser.add_argument('--periods', type=int, default=200)
+
+    rolling_parser = subparsers.add_parser('rolling', help='rolling horizon vs full solve')
+    rolling_parser.add_argument('--periods', type=int, nargs='+', default=[1000, 10000])
+    rolling_parser.add_argument('--windows', type=int, nargs='+', default=[100, 365])
+    rolling_parser.add_argument('--overlaps', type=int, nargs='+', default=[0, 30])
+    rolling_parser.add_argument('--module', default=None)
+
+    startup_parser = subparsers.add_parser('startup', help='cold start time of execute_oo.py (-X importtime)')
+    startup_parser.add_argument('--repeat', type=int, default=5)
+
+    load_parser = subparsers.add_parser('load', help='load time of input_data in each input_type')
+    load_parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000, 10000000])
+    load_parser.add_argument('--input-types', nargs='+', default=['csv', 'parquet', 'feather', 'npz', 'excel'])
+
+    chunks_parser = subparsers.add_parser('chunks', help='peak memory of reading input_data.csv in chunks')
+    chunks_parser.add_argument('--rows', type=int, default=5000000)
+    chunks_parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+
+    scaling_parser = subparsers.add_parser('scaling', help='time of each phase of execute_oo.py per module')
+    scaling_parser.add_argument('--periods', type=int, nargs='+', default=[100, 1000, 10000, 100000, 1000000])
+    scaling_parser.add_argument('--modules', nargs='+', default=list(MODULES), choices=MODULES)
+    scaling_parser.add_argument('--build-mode', choices=['vectorized', 'ir'])
+    scaling_parser.add_argument('--time-budget', type=float, default=600)
+    scaling_parser.add_argument('--report', help='json file to write the report to')
+
+    compare_parser = subparsers.add_parser('compare', help='compare two scaling reports')
+    compare_parser.add_argument('old_report')
+    compare_parser.add_argument('new_report')
+    compare_parser.add_argument('--threshold', type=float, default=1.2)
+
+    variants_parser = subparsers.add_parser('variants', help='the ways of building the model in execute_*.py')
+    variants_parser.add_argument('--periods', type=int, nargs='+', default=[100, 1000, 10000])
+    variants_parser.add_argument('--backends', nargs='+', choices=['pulp', 'gurobi', 'cplex', 'xpress'])
+    variants_parser.add_argument('--repeat', type=int, default=3)
+
+    extraction_parser = subparsers.add_parser('extraction', help='per variable vs bulk extraction of the solution')
+    extraction_parser.add_argument('--periods', type=int, nargs='+', default=[1000, 100000, 1000000])
+    extraction_parser.add_argument('--repeat', type=int, default=3)
+
+    output_parser = subparsers.add_parser('output', help='write time and size of each output_type')
+    output_parser.add_argument('--periods', type=int, nargs='+', default=[1000, 100000, 1000000])
+    output_parser.add_argument('--output-types', nargs='+', default=['csv', 'csv.gz', 'csv.zst', 'parquet', 'feather'])
+    output_parser.add_argument('--wide-output', action='store_true')
+
+    highs_parser = subparsers.add_parser('highs', help='in-memory HiGHS solve vs the file round-trip')
+    highs_parser.add_argument('--periods', type=int, nargs='+', default=[1000, 10000, 100000])
+    highs_parser.add_argument('--repeat', type=int, default=3)
+
+    race_parser = subparsers.add_parser('race', help='each solver on its own vs the race of them')
+    race_parser.add_argument('--periods', type=int, nargs='+', default=[1000, 10000, 100000])
+    race_parser.add_argument('--solvers', nargs='+')
+
+    presolve_parser = subparsers.add_parser('presolve', help='full solve vs the presolved one')
+    presolve_parser.add_argument('--periods', type=int, nargs='+', default=[1000, 10000, 100000])
+    presolve_parser.add_argument('--cost-run', type=int, default=30, help='periods with the same production cost')
+    presolve_parser.add_argument('--capacity-tightness', type=float, default=0.85)
+    presolve_parser.add_argument('--module', default=None)
+
+    setup_parser = subparsers.add_parser('setup', help='MIP with setup costs vs the engines of lot_sizing.py')
+    setup_parser.add_argument('--periods', type=int, nargs='+', default=[100, 500, 1000])
+    setup_parser.add_argument('--setup-cost', type=float, default=100000)
+    setup_parser.add_argument('--capacity-tightness', type=float, default=0.6)
+    setup_parser.add_argument('--time-limit', type=float, default=60, help='of each MIP solve, in seconds')
+    setup_parser.add_argument('--module', default=None)
+
+    multi_parser = subparsers.add_parser('multi', help='size and build time of the multi-product model')
+    multi_parser.add_argument('--products', type=int, nargs='+', default=[100, 1000, 10000])
+    multi_parser.add_argument('--plants', type=int, default=10)
+    multi_parser.add_argument('--periods', type=int, default=52)
+    multi_parser.add_argument('--plants-per-product', type=int, default=2)
+    multi_parser.add_argument('--active-share', type=float, default=0.5, help='of the periods, for each product')
+    multi_parser.add_argument('--no-solve', action='store_true')
+
+    registry_parser = subparsers.add_parser('registry', help='memory of dicts vs registries of variables')
+    registry_parser.add_argument('--periods', type=int, nargs='+', default=[10000, 1000000])
+
+    sensitivity_parser = subparsers.add_parser('sensitivity', help='sensitivity analysis vs independent solves')
+    sensitivity_parser.add_argument('--periods', type=int, default=1000)
+    sensitivity_parser.add_argument('--values', type=int, default=50)
+    sensitivity_parser.add_argument('--parameters', nargs='+', default=list(SENSITIVITY_RANGES),
+                                    choices=list(SENSITIVITY_RANGES))
+    sensitivity_parser.add_argument('--module', default=None)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+    if args.command == 'build':
+        benchmark_build(args.periods, args.repeat, None if args.module == 'pulp' else args.module)
+    elif args.command == 'registry':
+        benchmark_registry(args.periods)
+    elif args.command == 'variants':
+        benchmark_variants(args.periods, args.backends, args.repeat)
+    elif args.command == 'native':
+        benchmark_native(args.instances, args.periods)
+    elif args.command == 'rolling':
+        benchmark_rolling_horizon(args.periods, args.windows, args.overlaps, args.module)
+    elif args.command == 'sensitivity':
+        benchmark_sensitivity(args.periods, args.values, args.parameters, args.module)
+    elif args.command == 'startup':
+        benchmark_startup(args.repeat)
+    elif args.command == 'load':
+        benchmark_load(args.rows, args.input_types)
+    elif args.command == 'chunks':
+        benchmark_csv_chunks(args.rows, args.chunk_sizes)
+    elif args.command == 'extraction':
+        benchmark_extraction(args.periods, args.repeat)
+    elif args.command == 'highs':
+        benchmark_highs(args.periods, args.repeat)
+    elif args.command == 'race':
+        benchmark_race(args.periods, args.solvers)
+    elif args.command == 'presolve':
+        benchmark_presolve(args.periods, args.cost_run, args.capacity_tightness, None if args.module == 'pulp' else args.module)
+    elif args.command == 'setup':
+        benchmark_setup_costs(args.periods, args.setup_cost, args.capacity_tightness,
+                              None if args.module == 'pulp' else args.module, args.time_limit)
+    elif args.command == 'multi':
+        benchmark_multi_product(args.products, args.plants, args.periods, args.plants_per_product,
+                                args.active_share, not args.no_solve)
+    elif args.command == 'output':
+        benchmark_output_types(args.periods, args.output_types, args.wide_output)
+    elif args.command == 'scaling':
+        model_params['build_mode'] = args.build_mode
+        benchmark_scaling(args.periods, args.modules, args.report, args.time_budget)
+    elif args.command == 'compare':
+        logger.info('\n' + compare_reports(args.old_report, args.new_report, args.threshold).to_string())
+
+
+if __name__ == '__main__':
+    main()
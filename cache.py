@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+# ====================================
+
+logger = logging.getLogger(__name__ + ': ')
+
+# The model_params that can change the solution of a model, hence they are part of its key
+SOLUTION_PARAMS = ('module', 'solver', 'mip_gap', 'time_limit', 'presolve')
+
+
+def _hash(*parts):
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part if isinstance(part, bytes) else str(part).encode())
+    return sha.hexdigest()
+
+
+def get_files_key(files):
+    # A file is considered unchanged as long as its path, size and modification time are the same
+    stats = [(os.path.abspath(f), os.stat(f).st_mtime_ns, os.stat(f).st_size) for f in sorted(files)]
+    return _hash('inputs', stats)
+
+
+def get_solution_key(input_data, input_params, params=None):
+    # parameters is imported here, as in helper.load_raw_data, so importing helper doesn't load it
+    from parameters import model_params
+
+    params = model_params if params is None else params
+    relevant_params = {name: params.get(name) for name in SOLUTION_PARAMS}
+    return _hash('solution',
+                 list(input_data.columns),
+                 pd.util.hash_pandas_object(input_data, index=True).to_numpy().tobytes(),
+                 json.dumps(input_params, sort_keys=True, default=str),
+                 json.dumps(relevant_params, sort_keys=True, default=str))
+
+
+class DiskCache(object):
+    """
+    A size-bounded cache of pickled objects in 'directory'. When the total size goes
+    over 'max_mb', the least recently used entries are removed. The modification time
+    of an entry is its last use, so the cache is shared by all the runs that use the same directory.
+    """
+
+    def __init__(self, directory, max_mb=256):
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 ** 2
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)
+        return value
+
+    def set(self, key, value):
+        # Written to a temporary file first, so other runs never read a half-written entry.
+        # helper is imported here, since it imports this module
+        from helper import set_default_mode
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            set_default_mode(tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def get_cache():
+    # None if the cache is disabled in the model_params
+    from parameters import model_params
+
+    if not model_params['cache_dir']:
+        return None
+    return DiskCache(model_params['cache_dir'], model_params['cache_max_mb'])
@@ -0,0 +1,329 @@
+# The different ways of building the model that are shown in execute_pulp.py, execute_grb.py,
+# execute_docplex.py and execute_xpress.py, as functions, so they can be timed against each other
+# (see `python benchmark.py variants`). For each package, there are a few ways of creating the
+# variables and a few ways of creating the constraints, and any of them can be combined with build_variant.
+# The objective is the same in all of them. Only the packages that are installed are in VARIANTS.
+
+try:
+    import pulp
+except ImportError:
+    pulp = None
+try:
+    import gurobipy as grb
+except ImportError:
+    grb = None
+try:
+    import docplex.mp.model as cpx
+except ImportError:
+    cpx = None
+try:
+    import xpress as xp
+except ImportError:
+    xp = None
+
+
+# ================== pulp ==================
+def _pulp_add_constr(model, constraint):
+    model.addConstraint(constraint)
+    return constraint
+
+
+def _pulp_dicts_variables(model, input_data):
+    production_variables = pulp.LpVariable.dicts(name='X', indexs=input_data.index,
+                                                 lowBound=0, cat=pulp.LpContinuous)
+    inventory_variables = pulp.LpVariable.dicts(name='I', indexs=input_data.index,
+                                                lowBound=0, cat=pulp.LpContinuous)
+    return production_variables, inventory_variables
+
+
+def _pulp_comprehension_variables(model, input_data):
+    production_variables = {index: pulp.LpVariable(name='X_' + str(row['period']),
+                                                   lowBound=0, cat=pulp.LpContinuous)
+                            for index, row in input_data.iterrows()}
+    inventory_variables = {index: pulp.LpVariable(name='I_' + str(row['period']),
+                                                  lowBound=0, cat=pulp.LpContinuous)
+                           for index, row in input_data.iterrows()}
+    return production_variables, inventory_variables
+
+
+def _pulp_version_1_constraints(model, input_data, input_params, production_variables, inventory_variables):
+    for period, value in input_data.iloc[1:].iterrows():
+        model.addConstraint(pulp.LpConstraint(
+            e=inventory_variables[period - 1] + production_variables[period] - inventory_variables[period],
+            sense=pulp.LpConstraintEQ,
+            name='inv_balance' + str(period),
+            rhs=value.demand))
+
+    model.addConstraint(pulp.LpConstraint(
+        e=production_variables[0] - inventory_variables[0],
+        sense=pulp.LpConstraintEQ,
+        name='inv_balance0',
+        rhs=input_data.iloc[0].demand - input_params['initial_inventory']))
+
+    for index, value in production_variables.items():
+        model.addConstraint(pulp.LpConstraint(
+            e=value,
+            sense=pulp.LpConstraintLE,
+            name='prod_cap_month_' + str(index),
+            rhs=input_data.iloc[index].production_capacity))
+
+
+def _pulp_version_2_constraints(model, input_data, input_params, production_variables, inventory_variables,
+                                add=None):
+    # Version 2 keeps the return value of model.addConstraint, which is None.
+    # Version 2-modified keeps the constraints through add_constr.
+    add = add or (lambda m, c: m.addConstraint(c))
+    inv_balance_constraints = {
+        period: add(model, pulp.LpConstraint(
+            e=inventory_variables[period - 1] + production_variables[period] - inventory_variables[period],
+            sense=pulp.LpConstraintEQ,
+            name='inv_balance' + str(period),
+            rhs=value.demand))
+        for period, value in input_data.iloc[1:].iterrows()}
+
+    first_period_inv_balance_constraints = add(model, pulp.LpConstraint(
+        e=production_variables[0] - inventory_variables[0],
+        sense=pulp.LpConstraintEQ,
+        name='inv_balance0',
+        rhs=input_data.iloc[0].demand - input_params['initial_inventory']))
+
+    production_capacity_constraints = {
+        index: add(model, pulp.LpConstraint(
+            e=value,
+            sense=pulp.LpConstraintLE,
+            name='prod_cap_month_' + str(index),
+            rhs=input_data.iloc[index].production_capacity))
+        for index, value in production_variables.items()}
+    return inv_balance_constraints, first_period_inv_balance_constraints, production_capacity_constraints
+
+
+def _pulp_version_2_modified_constraints(model, input_data, input_params, production_variables, inventory_variables):
+    return _pulp_version_2_constraints(model, input_data, input_params, production_variables, inventory_variables,
+                                       add=_pulp_add_constr)
+
+
+def _pulp_objective(model, input_data, input_params, production_variables, inventory_variables):
+    total_holding_cost = input_params['holding_cost'] * pulp.lpSum(inventory_variables)
+    total_production_cost = pulp.lpSum(row['production_cost'] * production_variables[index]
+                                       for index, row in input_data.iterrows())
+    model.setObjective(total_holding_cost + total_production_cost)
+
+
+# ================== gurobipy ==================
+def _grb_addvars_variables(model, input_data):
+    production_variables = model.addVars(input_data.index, vtype=grb.GRB.CONTINUOUS, name="X")
+    inventory_variables = model.addVars(input_data.index, vtype=grb.GRB.CONTINUOUS, name="I")
+    return production_variables, inventory_variables
+
+
+def _grb_comprehension_variables(model, input_data):
+    production_variables = {index: model.addVar(name='X_' + str(row['period']), vtype=grb.GRB.CONTINUOUS)
+                            for index, row in input_data.iterrows()}
+    inventory_variables = {index: model.addVar(name='I_' + str(row['period']), vtype=grb.GRB.CONTINUOUS)
+                           for index, row in input_data.iterrows()}
+    return production_variables, inventory_variables
+
+
+def _grb_dict_constraints(model, input_data, input_params, production_variables, inventory_variables):
+    inv_balance_constraints = {
+        period: model.addLConstr(
+            lhs=inventory_variables[period - 1] + production_variables[period] - inventory_variables[period],
+            sense=grb.GRB.EQUAL,
+            name='inv_balance' + str(period),
+            rhs=value.demand)
+        for period, value in input_data.iloc[1:].iterrows()}
+
+    first_period_inv_balance_constraints = model.addLConstr(
+        lhs=production_variables[0] - inventory_variables[0],
+        sense=grb.GRB.EQUAL,
+        name='inv_balance0',
+        rhs=input_data.iloc[0].demand - input_params['initial_inventory'])
+
+    production_capacity_constraints = {
+        index: model.addLConstr(
+            lhs=value,
+            sense=grb.GRB.LESS_EQUAL,
+            name='prod_cap_month_' + str(index),
+            rhs=input_data.iloc[index].production_capacity)
+        for index, value in production_variables.items()}
+    return inv_balance_constraints, first_period_inv_balance_constraints, production_capacity_constraints
+
+
+def _grb_objective(model, input_data, input_params, production_variables, inventory_variables):
+    total_holding_cost = input_params['holding_cost'] * grb.quicksum(inventory_variables.values())
+    total_production_cost = grb.quicksum(row['production_cost'] * production_variables[index]
+                                         for index, row in input_data.iterrows())
+    model.setObjective(total_holding_cost + total_production_cost, grb.GRB.MINIMIZE)
+    # gurobi adds the variables and constraints lazily; update() makes the timing comparable
+    model.update()
+
+
+# ================== docplex ==================
+def _cpx_var_dict_variables(model, input_data):
+    production_variables = model.continuous_var_dict(input_data.index, name="X")
+    inventory_variables = model.continuous_var_dict(input_data.index, name="I")
+    return production_variables, inventory_variables
+
+
+def _cpx_comprehension_variables(model, input_data):
+    production_variables = {index: model.continuous_var(name='X_' + str(row['period']))
+                            for index, row in input_data.iterrows()}
+    inventory_variables = {index: model.continuous_var(name='I_' + str(row['period']))
+                           for index, row in input_data.iterrows()}
+    return production_variables, inventory_variables
+
+
+def _cpx_add_constraints_constraints(model, input_data, input_params, production_variables, inventory_variables):
+    inv_balance_constraints = model.add_constraints(
+        (inventory_variables[period - 1] + production_variables[period]
+         - inventory_variables[period] == value.demand,
+         'inv_balance' + str(period))
+        for period, value in input_data.iloc[1:].iterrows())
+
+    first_period_inv_balance_constraints = model.add_constraint(
+        ct=production_variables[0] - inventory_variables[0]
+           == input_data.iloc[0].demand - input_params['initial_inventory'],
+        ctname='inv_balance0')
+
+    production_capacity_constraints = model.add_constraints(
+        (value <= input_data.iloc[index].production_capacity,
+         'prod_cap_month_' + str(index))
+        for index, value in production_variables.items())
+    return inv_balance_constraints, first_period_inv_balance_constraints, production_capacity_constraints
+
+
+def _cpx_version_2_constraints(model, input_data, input_params, production_variables, inventory_variables):
+    inv_balance_constraints = {
+        period: model.add_constraint(
+            ct=inventory_variables[period - 1] + production_variables[period]
+               - inventory_variables[period] == value.demand,
+            ctname='inv_balance' + str(period))
+        for period, value in input_data.iloc[1:].iterrows()}
+
+    first_period_inv_balance_constraints = model.add_constraint(
+        ct=production_variables[0] - inventory_variables[0]
+           == input_data.iloc[0].demand - input_params['initial_inventory'],
+        ctname='inv_balance0')
+
+    production_capacity_constraints = {
+        index: model.add_constraint(
+            ct=value <= input_data.iloc[index].production_capacity,
+            ctname='prod_cap_month_' + str(index))
+        for index, value in production_variables.items()}
+    return inv_balance_constraints, first_period_inv_balance_constraints, production_capacity_constraints
+
+
+def _cpx_objective(model, input_data, input_params, production_variables, inventory_variables):
+    total_holding_cost = input_params['holding_cost'] * model.sum(inventory_variables)
+    total_production_cost = model.sum(row['production_cost'] * production_variables[index]
+                                      for index, row in input_data.iterrows())
+    model.minimize(total_holding_cost + total_production_cost)
+
+
+# ================== xpress ==================
+def _xp_vars_variables(model, input_data):
+    production_variables = xp.vars(input_data.index, name='X', vartype=xp.continuous)
+    inventory_variables = xp.vars(input_data.index, name='I', vartype=xp.continuous)
+    model.addVariable(production_variables, inventory_variables)
+    return production_variables, inventory_variables
+
+
+def _xp_comprehension_variables(model, input_data):
+    production_variables = {i: xp.var(name=f'X{i}', vartype=xp.continuous) for i in input_data.index}
+    inventory_variables = {i: xp.var(name=f'I{i}', vartype=xp.continuous) for i in input_data.index}
+    model.addVariable(production_variables, inventory_variables)
+    return production_variables, inventory_variables
+
+
+def _xp_version_1_constraints(model, input_data, input_params, production_variables, inventory_variables):
+    model.addConstraint(
+        xp.constraint(
+            body=inventory_variables[period - 1] + production_variables[period] - inventory_variables[period],
+            sense=xp.eq,
+            name='inv_balance' + str(period),
+            rhs=value.demand)
+        for period, value in input_data.iloc[1:].iterrows())
+
+    model.addConstraint(
+        xp.constraint(
+            body=production_variables[0] - inventory_variables[0],
+            sense=xp.eq,
+            name='inv_balance0',
+            rhs=input_data.iloc[0].demand - input_params['initial_inventory']))
+
+    model.addConstraint(
+        xp.constraint(
+            body=value,
+            sense=xp.leq,
+            name='prod_cap_month_' + str(index),
+            rhs=input_data.iloc[index].production_capacity)
+        for index, value in production_variables.items())
+
+
+def _xp_version_2_constraints(model, input_data, input_params, production_variables, inventory_variables):
+    model.addConstraint(
+        (inventory_variables[period - 1] + production_variables[period]
+         - inventory_variables[period] == value.demand)
+        for period, value in input_data.iloc[1:].iterrows())
+
+    model.addConstraint(
+        production_variables[0] - inventory_variables[0]
+        == input_data.iloc[0].demand - input_params['initial_inventory'])
+
+    model.addConstraint(
+        (value <= input_data.iloc[index].production_capacity)
+        for index, value in production_variables.items())
+
+
+def _xp_objective(model, input_data, input_params, production_variables, inventory_variables):
+    total_holding_cost = input_params['holding_cost'] * xp.Sum(inventory_variables)
+    total_production_cost = xp.Sum(row['production_cost'] * production_variables[index]
+                                   for index, row in input_data.iterrows())
+    model.setObjective(total_holding_cost + total_production_cost, sense=xp.minimize)
+
+
+# ================== Registry ==================
+VARIANTS = {}
+if pulp:
+    VARIANTS['pulp'] = {
+        'new_model': lambda: pulp.LpProblem(name='prod_planning', sense=pulp.LpMinimize),
+        'variables': {'LpVariable.dicts': _pulp_dicts_variables, 'comprehension': _pulp_comprehension_variables},
+        'constraints': {'version_1': _pulp_version_1_constraints, 'version_2': _pulp_version_2_constraints,
+                        'version_2_modified': _pulp_version_2_modified_constraints},
+        'objective': _pulp_objective}
+if grb:
+    VARIANTS['gurobi'] = {
+        'new_model': lambda: grb.Model('prod_planning'),
+        'variables': {'addVars': _grb_addvars_variables, 'comprehension': _grb_comprehension_variables},
+        'constraints': {'addLConstr_dict': _grb_dict_constraints},
+        'objective': _grb_objective}
+if cpx:
+    VARIANTS['cplex'] = {
+        'new_model': lambda: cpx.Model('prod_planning'),
+        'variables': {'continuous_var_dict': _cpx_var_dict_variables,
+                      'comprehension': _cpx_comprehension_variables},
+        'constraints': {'add_constraints': _cpx_add_constraints_constraints,
+                        'version_2': _cpx_version_2_constraints},
+        'objective': _cpx_objective}
+if xp:
+    VARIANTS['xpress'] = {
+        'new_model': lambda: xp.problem(name='prod_planning'),
+        'variables': {'xp.vars': _xp_vars_variables, 'comprehension': _xp_comprehension_variables},
+        'constraints': {'version_1': _xp_version_1_constraints, 'version_2': _xp_version_2_constraints},
+        'objective': _xp_objective}
+
+
+def get_variant_names(backend):
+    # All the (variables, constraints) combinations of a backend
+    return [(variables, constraints) for variables in VARIANTS[backend]['variables']
+            for constraints in VARIANTS[backend]['constraints']]
+
+
+def build_variant(backend, variables, constraints, input_data, input_params):
+    # Builds and returns the whole model of 'backend' with the chosen ways of creating variables and constraints
+    variants = VARIANTS[backend]
+    model = variants['new_model']()
+    production_variables, inventory_variables = variants['variables'][variables](model, input_data)
+    variants['constraints'][constraints](model, input_data, input_params, production_variables, inventory_variables)
+    variants['objective'](model, input_data, input_params, production_variables, inventory_variables)
+    return model
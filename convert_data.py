@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+import os
+
+import numpy as np
+from pandas.api.types import is_numeric_dtype
+
+from helper import INPUT_TYPES, ensure_directory_exists, get_file_directory, load_raw_data
+
+# ====================================
+
+LOG_FORMAT = '%(asctime)s  %(name)-12s %(levelname)s : %(message)s'
+logger = logging.getLogger(__name__ + ': ')
+
+
+def _to_npz(df, path):
+    # Text columns are stored as fixed-width unicode arrays, so no pickling is needed to read them
+    np.savez(path, **{col: df[col].to_numpy(dtype=None if is_numeric_dtype(df[col]) else str)
+                      for col in df.columns})
+
+
+WRITERS = {
+    'parquet': lambda df, path: df.to_parquet(path, index=False),
+    # Uncompressed feather files can be memory mapped when they are read
+    'feather': lambda df, path: df.to_feather(path, compression='uncompressed'),
+    'npz': _to_npz,
+}
+
+
+def convert_input_data(input_df_dict, output_type, directory=None):
+    """
+    Writes each table of input_df_dict (e.g. the output of load_raw_data) as one file
+    in the 'output_type' format. The default directory is the one that load_raw_data reads.
+    """
+    default_directory, extension, _ = INPUT_TYPES[output_type]
+    output_dir = get_file_directory(directory or default_directory)
+    ensure_directory_exists(output_dir)
+    for name, df in input_df_dict.items():
+        path = os.path.join(output_dir, name + extension)
+        WRITERS[output_type](df, path)
+        logger.info(f'{path} is written!')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Converts the input data to a columnar format.')
+    parser.add_argument('output_type', choices=list(WRITERS))
+    parser.add_argument('--input-type', default='csv', choices=list(INPUT_TYPES))
+    args = parser.parse_args(argv)
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+    convert_input_data(load_raw_data(args.input_type), args.output_type)
+
+
+if __name__ == '__main__':
+    main()
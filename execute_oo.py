@@ -1,38 +1,129 @@
 #!/usr/bin/env python
 
+import argparse
 import logging
 from time import time
 
-from process_data import load_data
-from parameters import model_params
-
-if model_params['module'] == 'gurobi':
-    from optimization_model_gurobi import OptimizationModel
-elif model_params['module'] == 'cplex':
-    from optimization_model_docplex import OptimizationModel
-elif model_params['module'] == 'xpress':
-    from optimization_model_xpress import OptimizationModel
-else:
-    from optimization_model_pulp import OptimizationModel
-
 __author__ = 'Ehsan Khodabandeh'
-__version__ = '1.1'
+__version__ = '1.2'
 # ====================================
 
 LOG_FORMAT = '%(asctime)s  %(name)-12s %(levelname)s : %(message)s'
-logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
 logger = logging.getLogger(__name__ + ': ')
 
-# ================== Set up data ==================
-input_df_dict, input_param_dict = load_data()
-logger.info('Data is loaded!')
 
-# ================== Optimization ==================
-start = time()
-optimizer = OptimizationModel(input_df_dict['input_data'], input_param_dict)
-logger.info(f'Model creation time in sec: {time() - start:.4f}')
-optimizer.optimize()
+def parse_args(argv=None):
+    # Any argument that isn't given keeps its value from parameters.py
+    parser = argparse.ArgumentParser(description='Solves the production planning model.')
+    parser.add_argument('--module', choices=['pulp', 'gurobi', 'cplex', 'xpress', 'native'])
+    parser.add_argument('--solver', choices=['cbc', 'gurobi', 'cplex', 'glpk', 'xpress', 'highs', 'race'], help='used for pulp')
+    parser.add_argument('--input-type', choices=['excel', 'csv', 'parquet', 'feather', 'npz'])
+    parser.add_argument('--build-mode', choices=['vectorized', 'ir'])
+    parser.add_argument('--time-limit', type=float, help='in seconds')
+    parser.add_argument('--mip-gap', type=float)
+    parser.add_argument('--cache-dir')
+    parser.add_argument('--chunk-size', type=int, help='stream input_data.csv into the model (pulp)')
+    parser.add_argument('--output-type', choices=['csv', 'csv.gz', 'csv.zst', 'parquet', 'feather'])
+    parser.add_argument('--wide-output', action='store_true', default=None,
+                        help='write all the outputs to one table')
+    parser.add_argument('--metrics-file', help='.jsonl (appended) or .prom file for the time of each phase')
+    parser.add_argument('--profile', dest='profile_phases', nargs='+', metavar='PHASE',
+                        help='phases to profile, e.g. build optimize')
+    parser.add_argument('--profiler', choices=['cprofile', 'tracemalloc', 'both'])
+    parser.add_argument('--no-warm-start', dest='warm_start', action='store_false', default=None,
+                        help="with setup costs, don't start the MIP from the plan of lot_sizing.py")
+    parser.add_argument('--presolve', action='store_true', default=None,
+                        help='solve the periods with the same cost as blocks (see presolve.py)')
+    parser.add_argument('--no-lp', dest='write_lp', action='store_false', default=None,
+                        help="don't write the model .lp file")
+    parser.add_argument('--no-feasibility-check', dest='check_feasibility', action='store_false', default=None,
+                        help="don't check the feasibility of the input before building the model")
+    return parser.parse_args(argv)
+
+
+def _write_metrics():
+    from metrics import write_metrics
+    from parameters import model_params
+
+    if model_params['metrics_file']:
+        write_metrics(model_params['metrics_file'])
+        logger.info(f"Metrics are written to {model_params['metrics_file']}!")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+
+    # The modules below import pandas and the solver packages, which take most of the start-up time.
+    # They are imported here, so importing this module or asking for --help stays fast.
+    from parameters import model_params
+    model_params.update({name: value for name, value in vars(args).items() if value is not None})
+    if model_params['module'] == 'pulp':
+        model_params['module'] = None
+
+    from cache import get_cache, get_solution_key
+    from helper import get_optimization_model, write_output, write_output_chunks
+    from process_data import check_feasibility, iter_output_chunks, load_data, load_data_chunks
+
+    # ================== Set up data ==================
+    if model_params['chunk_size']:
+        # input_data is streamed into the model, so there is no DataFrame to cache the solution by
+        if model_params['module']:
+            raise ValueError('chunk_size is only supported by the pulp module!')
+        input_data, input_param_dict = load_data_chunks(model_params['chunk_size'])
+        cache = None
+    else:
+        input_df_dict, input_param_dict = load_data()
+        input_data = input_df_dict['input_data']
+        cache = get_cache()
+    logger.info('Data is loaded!')
+
+    # ================== Feasibility check ==================
+    # An input that can't be feasible is reported right away, without building and solving the model
+    if model_params['check_feasibility'] and not model_params['chunk_size']:
+        infeasibility = check_feasibility(input_data, input_param_dict)
+        if infeasibility:
+            logger.error(f"The problem is infeasible! The demand up to period {infeasibility['period']} is more than "
+                         f"the initial inventory and production capacity up to it by {infeasibility['shortfall']:,.2f}")
+            _write_metrics()
+            return
+
+    # ================== Optimization ==================
+    # If the same data was solved before with the same settings, its solution is reused
+    if cache:
+        solution_key = get_solution_key(input_data, input_param_dict)
+        output_df = cache.get(solution_key)
+    else:
+        output_df = None
+
+    if output_df is None:
+        OptimizationModel = get_optimization_model(model_params['module'])
+        start = time()
+        if model_params['presolve'] and not model_params['chunk_size']:
+            from presolve import PresolvedModel
+            optimizer = PresolvedModel(input_data, input_param_dict, OptimizationModel)
+        else:
+            optimizer = OptimizationModel(input_data, input_param_dict)
+        logger.info(f'Model creation time in sec: {time() - start:.4f}')
+        optimizer.optimize()
+        if not model_params['chunk_size']:
+            output_df = optimizer.get_output()
+            if cache and optimizer.status == 'Optimal':
+                cache.set(solution_key, output_df)
+    else:
+        logger.info('The solution is loaded from the cache!')
+
+    # ================== Output ==================
+    if output_df is None:
+        # The outputs are streamed to disk in chunks too, rather than built as whole DataFrames
+        write_output_chunks(iter_output_chunks(optimizer.get_values(), model_params['chunk_size'],
+                                               model_params['wide_output']),
+                            output_type=model_params['output_type'])
+    else:
+        write_output(output_df)
+    logger.info(f"Outputs are written to {model_params['output_type']}!")
+    _write_metrics()
+
 
-# ================== Output ==================
-optimizer.create_output()
-logger.info('Outputs are written to csv!')
+if __name__ == '__main__':
+    main()
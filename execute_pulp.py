@@ -59,6 +59,8 @@ start = time()
 # you can evaluate their execution time and use them depending on your case!
 # Even "insertions sort" can sometimes become the best sorting algorithm!
 # https://www.toptal.com/developers/sorting-algorithms
+# `python benchmark.py variants` times the alternatives of all the execute_*.py modules
+# (defined in construction_variants.py) for a few model sizes.
 
 # ================== Decision variables ==================
 production_variables = pulp.LpVariable.dicts(name='X', indexs=input_df_dict['input_data'].index,
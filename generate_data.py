@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from helper import ensure_directory_exists, get_file_directory
+
+# ====================================
+
+LOG_FORMAT = '%(asctime)s  %(name)-12s %(levelname)s : %(message)s'
+logger = logging.getLogger(__name__ + ': ')
+
+
+def generate_input_data(n_periods, seed=0, initial_inventory=500, base_demand=6000, season_length=12,
+                        seasonality=0.35, noise=0.1, capacity_tightness=0.85, base_cost=140, cost_seasonality=0.05):
+    """
+    Generates an input_data table like data/csv/input_data.csv for any number of periods.
+    - demand follows a seasonal cycle of 'season_length' periods (the peak is 'seasonality'
+      above the base) with 'noise' relative normal noise,
+    - production_capacity is, on average, demand / 'capacity_tightness', so 1.0 means no slack,
+    - production_cost is higher in the high season by up to 'cost_seasonality'.
+    The instance is always feasible: wherever cumulative demand would exceed the initial inventory
+    plus cumulative capacity, the capacity of that period is increased just enough.
+    The same seed always gives the same instance.
+    """
+    rng = np.random.default_rng(seed)
+    season = np.sin(2 * np.pi * np.arange(n_periods) / season_length)
+
+    demand = base_demand * (1 + seasonality * season) * (1 + noise * rng.standard_normal(n_periods))
+    demand = np.maximum(np.rint(demand), 0).astype(np.int64)
+
+    mean_capacity = base_demand / capacity_tightness
+    capacity = np.rint(mean_capacity * (1 + 0.05 * rng.standard_normal(n_periods))).astype(np.int64)
+    capacity = np.maximum(capacity, 0)
+
+    shortfall = np.cumsum(demand) - initial_inventory - np.cumsum(capacity)
+    extra_capacity = np.diff(np.maximum.accumulate(np.maximum(shortfall, 0)), prepend=0)
+    capacity += extra_capacity
+
+    production_cost = np.rint(base_cost * (1 + cost_seasonality * season
+                                           + 0.02 * rng.standard_normal(n_periods))).astype(np.int64)
+
+    return pd.DataFrame({'period': np.arange(1, n_periods + 1), 'demand': demand,
+                         'production_cost': production_cost, 'production_capacity': capacity})
+
+
+def generate_instance(n_periods, seed=0, holding_cost=8, initial_inventory=500, **kwargs):
+    # The same tables as load_raw_data returns. kwargs are passed to generate_input_data
+    parameters = pd.DataFrame({'attribute': ['holding_cost', 'initial_inventory'],
+                               'value': [holding_cost, initial_inventory]})
+    input_data = generate_input_data(n_periods, seed=seed, initial_inventory=initial_inventory, **kwargs)
+    return {'input_data': input_data, 'parameters': parameters}
+
+
+def get_input_params():
+    # The input_params of generate_instance with its default parameters
+    return {'holding_cost': 8, 'initial_inventory': 500}
+
+
+def get_native_instance(seed, n_periods):
+    # Capacities close to the demand, so some instances need production ahead of time and some are infeasible
+    rng = np.random.default_rng(seed)
+    input_data = generate_input_data(n_periods, seed=seed)
+    input_data['production_capacity'] = rng.integers(4000, 9000, size=n_periods)
+    input_params = {'holding_cost': int(rng.integers(1, 20)), 'initial_inventory': int(rng.integers(0, 5000))}
+    return input_data, input_params
+
+
+def get_presolve_input_data(n_periods, cost_run=30, seed=0, **kwargs):
+    # An instance of generate_input_data with the production cost kept the same for runs of 'cost_run' periods
+    input_data = generate_input_data(n_periods, seed=seed, **kwargs)
+    input_data['production_cost'] = input_data['production_cost'].groupby(np.arange(n_periods) // cost_run) \
+        .transform('first')
+    return input_data
+
+
+def generate_multi_product_instance(n_products, n_plants, n_periods, seed=0, plants_per_product=2,
+                                    active_share=0.5, holding_cost=8, capacity_tightness=0.85):
+    """
+    Generates the tables of multi_product.load_multi_product_data. Each product is made at
+    'plants_per_product' random plants and is active for a random run of about 'active_share' of the periods
+    (e.g. its life cycle), so only those triples are in product_data. The capacity of each plant and period is
+    the demand of its triples divided by 'capacity_tightness', so producing each demand in its period is feasible.
+    """
+    rng = np.random.default_rng(seed)
+    plants_per_product = min(plants_per_product, n_plants)
+    plants = np.argsort(rng.random((n_products, n_plants)), axis=1)[:, :plants_per_product]
+    length = np.maximum(1, np.rint(active_share * n_periods * rng.uniform(0.5, 1.5, n_products))).astype(int)
+    length = np.minimum(length, n_periods)
+    start = rng.integers(0, n_periods - length + 1)
+
+    # A row per product, plant and active period, without the cross product of all of them
+    pairs = np.repeat(np.arange(n_products), plants_per_product)
+    pair_length = length[pairs]
+    product = np.repeat(pairs, pair_length)
+    plant = np.repeat(plants.ravel(), pair_length)
+    offset = np.arange(pair_length.sum()) - np.repeat(np.cumsum(pair_length) - pair_length, pair_length)
+    period = start[product] + offset + 1
+    base_demand = rng.lognormal(4, 1, n_products)
+    demand = np.rint(base_demand[product] * rng.uniform(0.5, 1.5, len(product)))
+    product_data = pd.DataFrame({'product': product, 'plant': plant, 'period': period, 'demand': demand,
+                                 'production_cost': np.rint(rng.uniform(50, 150, n_plants)[plant]
+                                                            * rng.uniform(0.95, 1.05, len(product)))})
+
+    plant_capacity = product_data.groupby(['plant', 'period'], as_index=False)['demand'].sum()
+    plant_capacity['production_capacity'] = np.ceil(plant_capacity.pop('demand') / capacity_tightness)
+    parameters = pd.DataFrame({'attribute': ['holding_cost'], 'value': [holding_cost]})
+    return {'product_data': product_data, 'plant_capacity': plant_capacity, 'parameters': parameters}
+
+
+def write_instance(input_df_dict, output_folder):
+    # As csv files, so they can be loaded like the files in data/csv
+    output_dir = get_file_directory(output_folder)
+    ensure_directory_exists(output_dir)
+    for name, df in input_df_dict.items():
+        df.to_csv(os.path.join(output_dir, name + '.csv'), index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generates a production planning instance.')
+    parser.add_argument('n_periods', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--capacity-tightness', type=float, default=0.85)
+    parser.add_argument('--output-folder', default='data/generated')
+    parser.add_argument('--multi-product', type=int, nargs=2, metavar=('PRODUCTS', 'PLANTS'),
+                        help='generate the tables of multi_product.py instead')
+    args = parser.parse_args(argv)
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+    if args.multi_product:
+        input_df_dict = generate_multi_product_instance(*args.multi_product, args.n_periods, args.seed,
+                                                        capacity_tightness=args.capacity_tightness)
+    else:
+        input_df_dict = generate_instance(args.n_periods, args.seed, capacity_tightness=args.capacity_tightness)
+    write_instance(input_df_dict, args.output_folder)
+    logger.info(f'The instance is written to {args.output_folder}!')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,13 @@
 import errno
 import glob
 import os
+import tempfile
 
+import numpy as np
 import pandas as pd
 
-from parameters import model_params
+from cache import get_cache, get_files_key
+from metrics import timed
 
 
 def get_file_directory(file):
@@ -42,27 +45,250 @@ def read_csv_files(input_files):
     return input_df_dict
 
 
-def load_raw_data():
-    if model_params['input_type'] == 'excel':
+# Compact dtypes of the input_data columns for reading it in chunks. Only the periods are made smaller;
+# the costs and quantities stay float64, so the model and its objective are the same as with pd.read_csv
+INPUT_DATA_DTYPES = {'period': 'int32', 'demand': 'float64',
+                     'production_cost': 'float64', 'production_capacity': 'float64'}
+
+
+def read_csv_chunks(input_file, chunk_size=100000, dtype=None):
+    """
+    Reads a (large) input_data csv file 'chunk_size' rows at a time with compact dtypes
+    (INPUT_DATA_DTYPES by default) and yields each chunk as a DataFrame. So, only one chunk is
+    in memory at a time. The index continues from one chunk to the next, as in the whole DataFrame.
+    Raises ValueError as soon as the periods are not strictly increasing.
+    """
+    last_period = None
+    for chunk in pd.read_csv(input_file, chunksize=chunk_size, dtype=dtype or INPUT_DATA_DTYPES):
+        periods = chunk['period'].to_numpy()
+        if last_period is not None:
+            periods = np.concatenate(([last_period], periods))
+        unordered = np.flatnonzero(np.diff(periods) <= 0)
+        if unordered.size:
+            raise ValueError(f'Periods should be increasing in {input_file}, '
+                             f'but period {periods[unordered[0] + 1]} comes after {periods[unordered[0]]}!')
+        last_period = periods[-1]
+        yield chunk
+
+
+# The columnar formats below are much faster to load than excel or csv files, as there is no parsing.
+# Parquet and feather files are memory mapped, so the numeric columns are not read
+# into memory before they are used. Both need 'pyarrow'.
+def read_parquet_files(input_files):
+    return {os.path.splitext(os.path.basename(_file))[0]: pd.read_parquet(_file, memory_map=True)
+            for _file in input_files}
+
+
+def read_feather_files(input_files):
+    import pyarrow.feather as feather
+    return {os.path.splitext(os.path.basename(_file))[0]: feather.read_table(_file, memory_map=True).to_pandas()
+            for _file in input_files}
+
+
+def read_npz_files(input_files):
+    # Each array of an .npz file is one column. The members of a zip file can't be memory mapped,
+    # but with np.savez (no compression) loading them is a plain copy.
+    input_df_dict = {}
+    for _file in input_files:
+        with np.load(_file) as npz_file:
+            input_df_dict[os.path.splitext(os.path.basename(_file))[0]] = pd.DataFrame(
+                {col: npz_file[col] for col in npz_file.files})
+    return input_df_dict
+
+
+# input_type: (directory, file extension, reader)
+INPUT_TYPES = {
+    'excel': ('data/excel/', '.xlsx', lambda input_files: read_excel(input_files[0])),
+    'csv': ('data/csv/', '.csv', read_csv_files),
+    'parquet': ('data/parquet/', '.parquet', read_parquet_files),
+    'feather': ('data/feather/', '.feather', read_feather_files),
+    'npz': ('data/npz/', '.npz', read_npz_files),
+}
+
+
+def get_input_files(input_type):
+    if input_type not in INPUT_TYPES:
+        raise ValueError(f'input_type parameter should be one of {", ".join(INPUT_TYPES)}!')
+    directory, extension, _ = INPUT_TYPES[input_type]
+    input_files = sorted(glob.glob(get_file_directory(directory) + '*' + extension))
+    if input_type == 'excel':
         # I assume I only have one excel file in the directory
-        _input_file = glob.glob(get_file_directory('data/excel/') + '*.xlsx')[0]
-        if not _input_file:
-            raise ValueError('Invalid file path! No Excel file was found!')
-        input_df_dict = read_excel(_input_file)
-    elif model_params['input_type'] == 'csv':
-        _input_file = glob.glob(get_file_directory('data/csv/') + '*.csv')
-        if not _input_file:
-            raise ValueError('Invalid file path! No csv file was found!')
-        input_df_dict = read_csv_files(_input_file)
-    else:
-        raise ValueError('input_type parameter should be either "excel" or "csv"!')
+        input_files = input_files[:1]
+    if not input_files:
+        raise ValueError(f'Invalid file path! No {input_type} file was found!')
+    return input_files
+
+
+@timed('load')
+def load_raw_data(input_type=None):
+    if input_type is None:
+        from parameters import model_params
+        input_type = model_params['input_type']
+    input_files = get_input_files(input_type)
+
+    # With the cache, the files are parsed only once as long as they are not modified
+    cache = get_cache()
+    if cache:
+        key = get_files_key(input_files)
+        input_df_dict = cache.get(key)
+        if input_df_dict is not None:
+            return input_df_dict
 
+    input_df_dict = INPUT_TYPES[input_type][2](input_files)
+
+    if cache:
+        cache.set(key, input_df_dict)
     return input_df_dict
 
 
+def get_optimization_model(module=None):
+    # The modules are imported here, so only the package of the chosen module needs to be installed
+    if module == 'gurobi':
+        from optimization_model_gurobi import OptimizationModel
+    elif module == 'cplex':
+        from optimization_model_docplex import OptimizationModel
+    elif module == 'xpress':
+        from optimization_model_xpress import OptimizationModel
+    elif module == 'native':
+        from optimization_model_native import OptimizationModel
+    else:
+        from optimization_model_pulp import OptimizationModel
+    return OptimizationModel
+
+
+def _atomic_path(path):
+    # A temporary file next to 'path'. Once it's written, os.replace moves it into place in one step,
+    # so readers of the output folder never see a half-written file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    set_default_mode(tmp_path)
+    return tmp_path
+
+
+def set_default_mode(path):
+    # mkstemp creates the file as 0600, and os.replace keeps that mode, so it's given the mode
+    # that open() would have given it (0666 without the bits of the umask)
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, 0o666 & ~umask)
+
+
+@timed('output_write')
 def write_to_csv(output_df_dict, output_folder='output'):
     output_dir = get_file_directory(output_folder + '/')
     ensure_directory_exists(output_dir)
     for key, df in output_df_dict.items():
         out_name = ''.join(('optimal_', key, '.csv'))
-        df.to_csv(os.path.join(output_dir, out_name))
+        path = os.path.join(output_dir, out_name)
+        tmp_path = _atomic_path(path)
+        try:
+            df.to_csv(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+# ================== Output types ==================
+# The extension of each output type. write_output writes 'csv' with write_to_csv as before; the compressed csv
+# and any csv streamed by write_output_chunks are in the same format, and parquet and feather are written
+# with pyarrow without the index column.
+OUTPUT_TYPES = {
+    'csv': '.csv',
+    'csv.gz': '.csv.gz',
+    'csv.zst': '.csv.zst',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+
+def _open_table_writer(path, output_type, schema):
+    import pyarrow as pa
+
+    if output_type == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(path, schema)
+    # Feather (V2) is the arrow IPC file format
+    return pa.ipc.new_file(path, schema)
+
+
+def _write_csv_chunks(chunks, path, output_type):
+    # Each chunk is written by pandas as in write_to_csv, with an index that continues the one of the
+    # previous chunks (those of process_data.iter_output_chunks all start at 0), so the file is the same.
+    # Returns False if there was no chunk
+    import pyarrow as pa
+
+    codec = {'csv': None, 'csv.gz': 'gzip', 'csv.zst': 'zstd'}[output_type]
+    n_chunks, n_rows = 0, 0
+    with (pa.CompressedOutputStream(path, codec) if codec else pa.OSFile(path, 'wb')) as sink:
+        for chunk in chunks:
+            if isinstance(chunk.index, pd.RangeIndex):
+                chunk = chunk.set_axis(chunk.index + n_rows)
+            sink.write(chunk.to_csv(header=n_chunks == 0).encode())
+            n_chunks, n_rows = n_chunks + 1, n_rows + len(chunk)
+    return n_chunks > 0
+
+
+def write_table_chunks(chunks, path, output_type):
+    """
+    Writes an iterable of DataFrames with the same columns as one file of 'output_type'.
+    Only one chunk is in memory at a time, so very large solutions can be streamed to disk.
+    """
+    import pyarrow as pa
+
+    tmp_path = _atomic_path(path)
+    writer = None
+    try:
+        if output_type in ('csv', 'csv.gz', 'csv.zst'):
+            written = _write_csv_chunks(chunks, tmp_path, output_type)
+        else:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = _open_table_writer(tmp_path, output_type, table.schema)
+                writer.write_table(table)
+            written = writer is not None
+            if written:
+                writer.close()
+        if not written:
+            raise ValueError(f'There is nothing to write to {path}!')
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@timed('output_write')
+def write_output_chunks(output_chunks_dict, output_folder='output', output_type='csv'):
+    # Like write_output, but each table is given as an iterable of DataFrames (e.g. by process_data.iter_output_chunks)
+    output_dir = get_file_directory(output_folder + '/')
+    ensure_directory_exists(output_dir)
+    for key, chunks in output_chunks_dict.items():
+        out_name = ''.join(('optimal_', key, OUTPUT_TYPES[output_type]))
+        write_table_chunks(chunks, os.path.join(output_dir, out_name), output_type)
+
+
+def get_wide_output(output_df_dict):
+    # All the tables in one, with one column per table, e.g. period, production, inventory
+    wide_df = None
+    for key, df in output_df_dict.items():
+        df = df.rename(columns={'value': key.replace('_variables', '')})
+        wide_df = df if wide_df is None else wide_df.merge(df, on='period', how='outer')
+    return {'solution': wide_df}
+
+
+def write_output(output_df_dict, output_folder='output', output_type=None, wide_output=None):
+    """
+    Writes the output tables in 'output_type' (see OUTPUT_TYPES), one file per table,
+    or in one file if 'wide_output' is True. Any of them that isn't given is read from model_params.
+    """
+    if output_type is None or wide_output is None:
+        from parameters import model_params
+        output_type = output_type or model_params['output_type']
+        wide_output = model_params['wide_output'] if wide_output is None else wide_output
+    if wide_output:
+        output_df_dict = get_wide_output(output_df_dict)
+    if output_type == 'csv':
+        write_to_csv(output_df_dict, output_folder)
+    else:
+        write_output_chunks({key: [df] for key, df in output_df_dict.items()}, output_folder, output_type)
@@ -0,0 +1,103 @@
+import logging
+from itertools import chain
+
+import highspy
+import numpy as np
+import pulp
+
+# ====================================
+
+logger = logging.getLogger(__name__ + ': ')
+
+# The model status of HiGHS in pulp's terms. Anything else, e.g. reaching the time limit, is pulp's 'Not Solved'
+STATUS = {
+    highspy.HighsModelStatus.kOptimal: pulp.LpStatusOptimal,
+    highspy.HighsModelStatus.kInfeasible: pulp.LpStatusInfeasible,
+    highspy.HighsModelStatus.kUnbounded: pulp.LpStatusUnbounded,
+    highspy.HighsModelStatus.kUnboundedOrInfeasible: pulp.LpStatusUndefined,
+    highspy.HighsModelStatus.kModelEmpty: pulp.LpStatusOptimal,
+}
+
+
+def get_model_arrays(model):
+    """
+    The pulp model as numpy arrays, i.e. the bounds and cost of the variables and the bounds of the
+    constraints, plus their coefficients in the compressed sparse row format (starts, indices, values).
+    The variables are in the order of model.variables() and the constraints in the order of model.constraints.
+    """
+    variables = model.variables()
+    index = {var.name: i for i, var in enumerate(variables)}
+    inf = highspy.kHighsInf
+
+    col_lower = np.array([-inf if var.lowBound is None else var.lowBound for var in variables], dtype=float)
+    col_upper = np.array([inf if var.upBound is None else var.upBound for var in variables], dtype=float)
+    col_cost = np.zeros(len(variables))
+    for var, coef in model.objective.items():
+        col_cost[index[var.name]] = coef
+    integers = np.array([i for i, var in enumerate(variables) if var.cat == pulp.LpInteger], dtype=np.int32)
+
+    constraints = list(model.constraints.values())
+    rhs = np.array([-constr.constant for constr in constraints], dtype=float)
+    senses = np.array([constr.sense for constr in constraints])
+    row_lower = np.where(senses == pulp.LpConstraintLE, -inf, rhs)
+    row_upper = np.where(senses == pulp.LpConstraintGE, inf, rhs)
+
+    lengths = np.fromiter((len(constr) for constr in constraints), dtype=np.int32, count=len(constraints))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int32)
+    indices = np.fromiter((index[var.name] for var in chain.from_iterable(constraints)),
+                          dtype=np.int32, count=lengths.sum())
+    values = np.fromiter(chain.from_iterable(constr.values() for constr in constraints),
+                         dtype=float, count=lengths.sum())
+
+    return {'variables': variables, 'constraints': constraints, 'col_lower': col_lower, 'col_upper': col_upper,
+            'col_cost': col_cost, 'integers': integers, 'row_lower': row_lower, 'row_upper': row_upper,
+            'starts': starts, 'indices': indices, 'values': values}
+
+
+def solve_highs(model, msg=False, mip_gap=None, time_limit=None, arrays=None, warm_start=False):
+    """
+    Solves the pulp model with HiGHS in this process: the model is passed to HiGHS as arrays
+    (see get_model_arrays), so no file is written and no solver process is started.
+    If the arrays of the model are already known (e.g. see model_ir.get_highs_arrays), they can be given.
+    With warm_start, the MIP starts from the values of the variables that have one (e.g. by setInitialValue).
+    Like pulp's own solvers, it sets model.status, the varValue (and dj) of the variables and
+    the pi (dual value) of the constraints, the latter two only for LPs. Returns model.status.
+    """
+    arrays = get_model_arrays(model) if arrays is None else arrays
+    n_cols, n_rows = len(arrays['variables']), len(arrays['constraints'])
+
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', bool(msg))
+    if mip_gap is not None:
+        highs.setOptionValue('mip_rel_gap', mip_gap)
+    if time_limit is not None:
+        highs.setOptionValue('time_limit', float(time_limit))
+
+    highs.addVars(n_cols, arrays['col_lower'], arrays['col_upper'])
+    highs.changeColsCost(n_cols, np.arange(n_cols, dtype=np.int32), arrays['col_cost'])
+    highs.changeObjectiveOffset(float(model.objective.constant))
+    if model.sense == pulp.LpMaximize:
+        highs.changeObjectiveSense(highspy.ObjSense.kMaximize)
+    if len(arrays['integers']):
+        highs.changeColsIntegrality(len(arrays['integers']), arrays['integers'],
+                                    np.full(len(arrays['integers']), highspy.HighsVarType.kInteger))
+    highs.addRows(n_rows, arrays['row_lower'], arrays['row_upper'], len(arrays['values']),
+                  arrays['starts'], arrays['indices'], arrays['values'])
+    if warm_start:
+        start = [(i, var.varValue) for i, var in enumerate(arrays['variables']) if var.varValue is not None]
+        if start:
+            indices, values = zip(*start)
+            highs.setSolution(len(start), np.array(indices, dtype=np.int32), np.array(values, dtype=float))
+    highs.run()
+
+    model.status = STATUS.get(highs.getModelStatus(), pulp.LpStatusNotSolved)
+    solution = highs.getSolution()
+    if solution.value_valid:
+        for var, value in zip(arrays['variables'], solution.col_value):
+            var.varValue = value
+    if solution.dual_valid and not len(arrays['integers']):
+        for var, value in zip(arrays['variables'], solution.col_dual):
+            var.dj = value
+        for constr, value in zip(arrays['constraints'], solution.row_dual):
+            constr.pi = value
+    return model.status
@@ -0,0 +1,130 @@
+import logging
+
+import numpy as np
+
+from optimization_model_native import solve_lot_sizing
+from process_data import get_first_shortfall, has_setup_costs
+
+# ====================================
+
+logger = logging.getLogger(__name__ + ': ')
+
+_EPS = 1e-9
+
+
+# ================== Uncapacitated lot sizing ==================
+def wagner_whitin(demand, production_cost, setup_cost, holding_cost, initial_inventory, production_capacity=None):
+    """
+    Solves the model with setup costs and no capacity limits by the Wagner-Whitin dynamic program.
+    Without capacities, there is an optimal plan that only produces when the inventory has run out,
+    and then for the demand of a run of periods. So, if F(t) is the cost of the demand before period t,
+    F(t) = min over s < t of F(s) + setup_cost_s + (the cost of producing the demand of s..t-1 in s),
+    or F(t - 1) if there is no demand in period t - 1. The cost of each run comes from cumulative sums,
+    so each F(t) is one numpy minimum over the s and the whole program is O(T^2).
+    As in solve_lot_sizing, the initial inventory is used for the earliest demands.
+    If production_capacity is given, the runs are only the ones within the capacity of their first period
+    (or of one period), which is a quick way to a good set of setups for the capacitated model.
+
+    Returns the production and inventory arrays, and whether there is a setup in each period.
+    """
+    demand = np.asarray(demand, dtype=float)
+    production_cost = np.asarray(production_cost, dtype=float)
+    setup_cost = np.asarray(setup_cost, dtype=float)
+    n = len(demand)
+
+    net_demand = demand - np.diff(np.minimum(np.cumsum(demand), initial_inventory), prepend=0.0)
+    # Cumulative demand and cumulative demand times period, from the first period up to (not including) t
+    cum_demand = np.concatenate(([0.0], np.cumsum(net_demand)))
+    cum_weighted = np.concatenate(([0.0], np.cumsum(net_demand * np.arange(n))))
+    periods = np.arange(n)
+    if production_capacity is not None:
+        production_capacity = np.asarray(production_capacity, dtype=float)
+
+    cost = np.zeros(n + 1)
+    last_setup = np.full(n + 1, -1)
+    for t in range(1, n + 1):
+        s = periods[:t]
+        run_demand = cum_demand[t] - cum_demand[:t]
+        # The demand of period k held from s to k costs holding_cost * (k - s) per unit
+        run_cost = (cost[:t] + setup_cost[:t] + production_cost[:t] * run_demand
+                    + holding_cost * (cum_weighted[t] - cum_weighted[:t] - s * run_demand))
+        if production_capacity is not None:
+            run_cost[:t - 1][run_demand[:t - 1] > production_capacity[:t - 1] + _EPS] = np.inf
+        best = int(run_cost.argmin())
+        cost[t], last_setup[t] = run_cost[best], best
+        if net_demand[t - 1] <= _EPS and cost[t - 1] <= cost[t]:
+            cost[t], last_setup[t] = cost[t - 1], -1
+
+    production = np.zeros(n)
+    t = n
+    while t > 0:
+        if last_setup[t] < 0:
+            t -= 1
+            continue
+        s = last_setup[t]
+        production[s] = cum_demand[t] - cum_demand[s]
+        t = s
+    inventory = initial_inventory + np.cumsum(production - demand)
+    return production, np.maximum(inventory, 0.0), production > _EPS
+
+
+# ================== Capacitated lot sizing ==================
+def capacitated_heuristic(demand, production_capacity, production_cost, setup_cost, holding_cost,
+                          initial_inventory):
+    """
+    A plan for the model with setup costs and capacities, which is not necessarily optimal:
+    1. the setups of the Wagner-Whitin plan with runs within the capacities (see wagner_whitin),
+    2. while the capacity of the periods with a setup can't meet the cumulative demand (see
+       process_data.get_first_shortfall), a setup is added to the latest period without one before the shortfall,
+    3. the best production for these setups is found by solve_lot_sizing, with no capacity in the other periods,
+    4. the setups of the periods that don't produce are dropped.
+
+    Returns the production and inventory arrays and the setups, or None for all of them if it's infeasible.
+    """
+    production_capacity = np.asarray(production_capacity, dtype=float)
+    _, _, setups = wagner_whitin(demand, production_cost, setup_cost, holding_cost, initial_inventory,
+                                 production_capacity)
+    setups &= production_capacity > 0
+    while True:
+        first_shortfall = get_first_shortfall(demand, production_capacity * setups, initial_inventory)
+        if first_shortfall is None:
+            break
+        position = first_shortfall[0]
+        candidates = np.flatnonzero(~setups[:position + 1] & (production_capacity[:position + 1] > 0))
+        if not candidates.size:
+            return None, None, None
+        setups[candidates[-1]] = True
+
+    production, inventory = solve_lot_sizing(demand, production_capacity * setups, production_cost,
+                                             holding_cost, initial_inventory)
+    return production, inventory, setups & (production > _EPS)
+
+
+def solve_setup_lot_sizing(input_data, input_params):
+    """
+    The plan of input_data with its setup_cost column: the Wagner-Whitin plan if it's within the
+    capacities (then it's optimal), and otherwise the plan of capacitated_heuristic.
+    Returns the production, inventory and setups (None if it's infeasible), and whether the plan is optimal.
+    """
+    demand = input_data['demand'].to_numpy(dtype=float)
+    production_capacity = input_data['production_capacity'].to_numpy(dtype=float)
+    args = (input_data['production_cost'].to_numpy(dtype=float), input_data['setup_cost'].to_numpy(dtype=float),
+            input_params['holding_cost'], input_params['initial_inventory'])
+    production, inventory, setups = wagner_whitin(demand, *args)
+    if (production <= production_capacity + _EPS).all():
+        return production, inventory, setups, True
+    return (*capacitated_heuristic(demand, production_capacity, *args), False)
+
+
+def get_mip_start(input_data, input_params):
+    """
+    The plan of solve_setup_lot_sizing as {name: values} of the variables of the models with setup costs,
+    to start their MIP from it. None if input_data has no setup costs or no plan is found.
+    """
+    if not has_setup_costs(input_data):
+        return None
+    production, inventory, setups, _ = solve_setup_lot_sizing(input_data, input_params)
+    if production is None:
+        return None
+    return {'production_variables': production, 'inventory_variables': inventory,
+            'setup_variables': setups.astype(float)}
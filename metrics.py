@@ -0,0 +1,219 @@
+import cProfile
+import json
+import logging
+import os
+import sys
+import tempfile
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter, process_time, time
+
+try:
+    import resource
+except ImportError:  # e.g. on Windows, where the peak memory is not recorded
+    resource = None
+
+# ====================================
+
+logger = logging.getLogger(__name__ + ': ')
+
+# The records of the last phases of this process, oldest first (see phase)
+MAX_RECORDS = 10000
+_records = deque(maxlen=MAX_RECORDS)
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+PROMETHEUS_PREFIX = 'prod_planning_phase'
+
+
+def get_peak_rss():
+    # The peak resident set size of this process so far in bytes, or None if it's not available
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+@contextmanager
+def phase(name, **labels):
+    """
+    Records the wall time, CPU time and the increase of the peak resident set size (RSS) of the process
+    during the code in the 'with' block, e.g.
+
+        with phase('solve', module='pulp'):
+            optimizer.optimize()
+
+    Phases can be nested; each one is recorded on its own. 'labels' are added to the record.
+    A phase is recorded even if its block raises an exception.
+    The peak RSS only grows, so 'rss_increase' is how much the phase raised it: zero if the phase used no more
+    memory than an earlier one, and a lower bound of its own memory otherwise (see profiler for its allocations).
+    If the phase is in model_params['profile_phases'], it's also profiled (see _start_profiling).
+    """
+    # parameters is imported here, so importing helper (which imports this module) doesn't load it
+    from parameters import model_params
+
+    profilers = _start_profiling(name) if model_params['profile_phases'] else None
+    wall_start, cpu_start, rss_start = perf_counter(), process_time(), get_peak_rss()
+    try:
+        yield
+    finally:
+        rss_increase = None if rss_start is None else get_peak_rss() - rss_start
+        _records.append({'phase': name, **labels, 'timestamp': time(), 'wall_time': perf_counter() - wall_start,
+                         'cpu_time': process_time() - cpu_start, 'rss_increase': rss_increase})
+        if profilers:
+            _stop_profiling(name, profilers)
+
+
+def timed(name):
+    # The same as phase, as a decorator of a function or method
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_records():
+    return list(_records)
+
+
+def reset():
+    _records.clear()
+
+
+# ================== Profiling ==================
+# The number of reports written for each phase, so a phase that runs more than once doesn't overwrite them
+_profile_counts = {}
+_active_profilers = []
+MEMORY_REPORT_TOP = 25
+
+
+def _start_profiling(name):
+    """
+    Starts cProfile and/or tracemalloc (model_params['profiler'] is 'cprofile', 'tracemalloc' or 'both')
+    for a phase in model_params['profile_phases']. Only one profiler of each kind can run at a time,
+    so a phase that is nested in another profiled phase is only profiled by the outer one.
+    """
+    from parameters import model_params
+
+    if name not in model_params['profile_phases']:
+        return None
+    profilers = {}
+    if model_params['profiler'] in ('cprofile', 'both') and not any(
+            isinstance(p, cProfile.Profile) for p in _active_profilers):
+        profilers['cprofile'] = cProfile.Profile()
+    if model_params['profiler'] in ('tracemalloc', 'both') and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        profilers['tracemalloc'] = tracemalloc
+    if 'cprofile' in profilers:
+        _active_profilers.append(profilers['cprofile'])
+        profilers['cprofile'].enable()
+    return profilers
+
+
+def _stop_profiling(name, profilers):
+    from helper import ensure_directory_exists, get_file_directory
+    from parameters import model_params
+
+    profile = profilers.get('cprofile')
+    if profile:
+        profile.disable()
+        _active_profilers.remove(profile)
+    if 'tracemalloc' in profilers:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    output_dir = get_file_directory(model_params['profile_dir'] + '/')
+    ensure_directory_exists(output_dir)
+    _profile_counts[name] = _profile_counts.get(name, 0) + 1
+    file_name = 'profile_' + name + (f'_{_profile_counts[name]}' if _profile_counts[name] > 1 else '')
+
+    if profile:
+        path = os.path.join(output_dir, file_name + '.pstats')
+        profile.dump_stats(path)
+        logger.info(f'The profile of {name} is written to {path} (python -m pstats {path})!')
+    if 'tracemalloc' in profilers:
+        path = os.path.join(output_dir, file_name + '_memory.txt')
+        stats = snapshot.statistics('lineno')
+        with open(path, 'w') as f:
+            f.write(f'Peak traced memory of {name}: {peak / 1024 ** 2:.2f} MB\n')
+            f.write(f'Top {MEMORY_REPORT_TOP} allocations that are still alive at its end:\n')
+            f.writelines(f'{stat}\n' for stat in stats[:MEMORY_REPORT_TOP])
+        logger.info(f'The allocations of {name} are written to {path}!')
+
+
+# ================== Export ==================
+def to_json_lines(records=None):
+    # One json object per record and line
+    return ''.join(json.dumps(record) + '\n' for record in (get_records() if records is None else records))
+
+
+def _escape_label_value(value):
+    # Backslashes, double quotes and line feeds are escaped in the label values of the Prometheus text format
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key):
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in key) + '}'
+
+
+def to_prometheus(records=None, prefix=PROMETHEUS_PREFIX):
+    """
+    The records in the Prometheus text format. The records of the same phase (and labels) are
+    combined: their wall and CPU times are summed, their number is counted (runs_total), and the
+    RSS increase is the largest one.
+    """
+    totals = {}
+    for record in get_records() if records is None else records:
+        key = tuple(sorted((name, value) for name, value in record.items()
+                           if name not in ('timestamp', 'wall_time', 'cpu_time', 'rss_increase')))
+        total = totals.setdefault(key, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'runs_total': 0,
+                                        'rss_increase_bytes': None})
+        total['wall_seconds'] += record['wall_time']
+        total['cpu_seconds'] += record['cpu_time']
+        total['runs_total'] += 1
+        if record['rss_increase'] is not None:
+            total['rss_increase_bytes'] = max(total['rss_increase_bytes'] or 0, record['rss_increase'])
+
+    # {metric: (type, description)}
+    descriptions = {'wall_seconds': ('gauge', 'Wall time of the phase in seconds'),
+                    'cpu_seconds': ('gauge', 'CPU time of the phase in seconds'),
+                    'runs_total': ('counter', 'Number of times the phase was run'),
+                    'rss_increase_bytes': ('gauge', 'Largest increase of the peak resident set size of the '
+                                                    'process during the phase in bytes')}
+    lines = []
+    for metric, (metric_type, description) in descriptions.items():
+        lines += [f'# HELP {prefix}_{metric} {description}', f'# TYPE {prefix}_{metric} {metric_type}']
+        lines += [f'{prefix}_{metric}{_format_labels(key)} {total[metric]}'
+                  for key, total in totals.items() if total[metric] is not None]
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(path, records=None):
+    """
+    Writes the records to 'path': in the Prometheus text format if it ends with '.prom', and otherwise
+    appended to it as json lines, so the file keeps the history of the runs. A '.prom' file is replaced
+    in one step, so a Prometheus textfile collector never reads a half-written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if not path.endswith('.prom'):
+        with open(path, 'a') as f:
+            f.write(to_json_lines(records))
+        return
+    from helper import set_default_mode
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(to_prometheus(records))
+        set_default_mode(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
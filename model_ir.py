@@ -0,0 +1,143 @@
+import numpy as np
+
+from metrics import timed
+from process_data import has_setup_costs
+
+# ====================================
+
+# The row senses of the IR, in the letters of the solvers' matrix interfaces
+EQUAL, LESS_EQUAL, GREATER_EQUAL = 'E', 'L', 'G'
+
+
+# ================== Building the IR ==================
+@timed('ir')
+def build_ir(input_data, input_params):
+    """
+    The production planning model as arrays that any backend can load in bulk (the IR of the model),
+    built from the columns of input_data without a Python object per term:
+    - the columns (variables) are X_t (production) followed by I_t (inventory) of each period of input_data,
+      with their names, lower and upper bounds (np.inf for none) and objective coefficients ('col_cost'),
+    - the rows (constraints) are the inventory balance constraints I_{t-1} + X_t - I_t = d_t
+      (X_0 - I_0 = d_0 - initial_inventory for the first period) followed by the production
+      capacity constraints X_t <= p_t, with their names, senses (see EQUAL...) and right-hand sides,
+    - the coefficients of the rows are in the compressed sparse row format (indptr, indices, values).
+    'col_blocks' and 'row_blocks' are the slices of each family of variables and constraints.
+    With setup costs (see process_data.has_setup_costs), the binary setup variables Y_t are the last columns
+    ('integers' are their positions) and the setup constraints X_t - p_t * Y_t <= 0 are the last rows.
+    The periods of input_data should be consecutive.
+    """
+    periods = input_data.index.to_numpy()
+    n = len(periods)
+    production, inventory = np.arange(n), n + np.arange(n)
+    period_names = list(map(str, periods.tolist()))
+
+    # Each balance row has I_{t-1}, X_t and I_t, except the first one, which has no I_{t-1}
+    balance_indices = np.column_stack((inventory - 1, production, inventory)).ravel()[1:]
+    balance_values = np.tile([1.0, 1.0, -1.0], n)[1:]
+    balance_indptr = np.concatenate(([0], np.arange(2, 3 * n, 3)))
+
+    ir = {
+        'periods': periods,
+        'col_names': ['X_' + p for p in period_names] + ['I_' + p for p in period_names],
+        'col_lower': np.zeros(2 * n),
+        'col_upper': np.full(2 * n, np.inf),
+        'col_cost': get_col_cost(input_data, input_params),
+        'col_blocks': {'production_variables': slice(0, n), 'inventory_variables': slice(n, 2 * n)},
+        'integers': np.array([], dtype=np.int32),
+        'row_names': ['inv_balance' + p for p in period_names] + ['prod_cap_month_' + p for p in period_names],
+        'row_senses': np.repeat([EQUAL, LESS_EQUAL], n),
+        'rhs': get_rhs(input_data, input_params),
+        'row_blocks': {'inv_balance_constraints': slice(0, n), 'production_capacity_constraints': slice(n, 2 * n)},
+        'indptr': np.concatenate((balance_indptr, balance_indptr[-1] + np.arange(1, n + 1))).astype(np.int32),
+        'indices': np.concatenate((balance_indices, production)).astype(np.int32),
+        'values': np.concatenate((balance_values, np.ones(n))),
+    }
+    if has_setup_costs(input_data):
+        setup = 2 * n + np.arange(n)
+        ir['col_names'] += ['Y_' + p for p in period_names]
+        ir['col_lower'] = np.zeros(3 * n)
+        ir['col_upper'] = np.concatenate((ir['col_upper'], np.ones(n)))
+        ir['col_blocks']['setup_variables'] = slice(2 * n, 3 * n)
+        ir['integers'] = setup.astype(np.int32)
+        ir['row_names'] += ['setup_' + p for p in period_names]
+        ir['row_senses'] = np.repeat([EQUAL, LESS_EQUAL, LESS_EQUAL], n)
+        ir['row_blocks']['setup_constraints'] = slice(2 * n, 3 * n)
+        # Each setup row has X_t and Y_t
+        ir['indptr'] = np.concatenate((ir['indptr'], ir['indptr'][-1] + np.arange(2, 2 * n + 1, 2))).astype(np.int32)
+        ir['indices'] = np.concatenate((ir['indices'], np.column_stack((production, setup)).ravel())).astype(np.int32)
+        ir['values'] = np.concatenate((ir['values'], np.zeros(2 * n)))
+        set_setup_values(ir, input_data)
+    return ir
+
+
+def get_col_cost(input_data, input_params):
+    col_cost = [input_data['production_cost'].to_numpy(dtype=float),
+                np.full(len(input_data), float(input_params['holding_cost']))]
+    if has_setup_costs(input_data):
+        col_cost.append(input_data['setup_cost'].to_numpy(dtype=float))
+    return np.concatenate(col_cost)
+
+
+def get_rhs(input_data, input_params):
+    demand = input_data['demand'].to_numpy(dtype=float, copy=True)
+    demand[0] -= input_params['initial_inventory']
+    rhs = [demand, input_data['production_capacity'].to_numpy(dtype=float)]
+    if has_setup_costs(input_data):
+        rhs.append(np.zeros(len(input_data)))
+    return np.concatenate(rhs)
+
+
+def set_setup_values(ir, input_data):
+    # The coefficients of Y_t in the setup constraints are minus the production capacities
+    first = ir['indptr'][ir['row_blocks']['setup_constraints'].start]
+    ir['values'][first::2] = 1.0
+    ir['values'][first + 1::2] = -input_data['production_capacity'].to_numpy(dtype=float)
+
+
+def update_ir(ir, input_data, input_params):
+    # After a change of the data or parameters (see update_data and update_params of the models)
+    ir['col_cost'] = get_col_cost(input_data, input_params)
+    ir['rhs'] = get_rhs(input_data, input_params)
+    if 'setup_constraints' in ir['row_blocks']:
+        set_setup_values(ir, input_data)
+
+
+# ================== Views of the IR ==================
+def get_rows(ir, rows):
+    """
+    The rows of the slice 'rows' (e.g. ir['row_blocks']['inv_balance_constraints']) as
+    (indptr, indices, values, senses, rhs), with indptr starting from 0, to load a block of constraints at once.
+    """
+    first, last = ir['indptr'][rows.start], ir['indptr'][rows.stop]
+    return (ir['indptr'][rows.start:rows.stop + 1] - first, ir['indices'][first:last], ir['values'][first:last],
+            ir['row_senses'][rows], ir['rhs'][rows])
+
+
+def get_csc(ir):
+    """
+    The coefficients in the compressed sparse column format (col_start, row_indices, values),
+    for the solvers that load the matrix column by column (e.g. xpress loadproblem).
+    """
+    n_rows, n_cols = len(ir['rhs']), len(ir['col_cost'])
+    rows = np.repeat(np.arange(n_rows, dtype=np.int32), np.diff(ir['indptr']))
+    order = np.argsort(ir['indices'], kind='stable')
+    col_start = np.concatenate(([0], np.cumsum(np.bincount(ir['indices'], minlength=n_cols)))).astype(np.int32)
+    return col_start, rows[order], ir['values'][order]
+
+
+def get_row_bounds(ir):
+    # The lower and upper bounds of the rows, for the solvers that take ranges rather than senses (e.g. HiGHS)
+    senses, rhs = ir['row_senses'], ir['rhs']
+    return np.where(senses == LESS_EQUAL, -np.inf, rhs), np.where(senses == GREATER_EQUAL, np.inf, rhs)
+
+
+def get_highs_arrays(ir, variables, constraints):
+    """
+    The IR in the format of highs_solver.get_model_arrays for the pulp 'variables' and 'constraints'
+    it was loaded into (in the order of its columns and rows), so solve_highs doesn't read them from the model.
+    """
+    row_lower, row_upper = get_row_bounds(ir)
+    return {'variables': variables, 'constraints': constraints, 'col_lower': ir['col_lower'],
+            'col_upper': ir['col_upper'], 'col_cost': ir['col_cost'], 'integers': ir['integers'],
+            'row_lower': row_lower, 'row_upper': row_upper, 'starts': ir['indptr'][:-1],
+            'indices': ir['indices'], 'values': ir['values']}
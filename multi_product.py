@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+import os
+
+import numpy as np
+
+from helper import get_file_directory, get_optimization_model, read_csv_files, write_output
+from metrics import timed
+from model_ir import EQUAL, LESS_EQUAL
+from parameters import model_params
+from process_data import extract_values
+from registry import Registry
+
+# ====================================
+
+LOG_FORMAT = '%(asctime)s  %(name)-12s %(levelname)s : %(message)s'
+logger = logging.getLogger(__name__ + ': ')
+
+# The index of the long-format tables; a row of product_data is a valid (product, plant, period) triple
+KEYS = ['product', 'plant', 'period']
+
+
+# ================== Data ==================
+# The multi-product, multi-plant model has these tables (e.g. product_data.csv in a folder):
+# - product_data: product, plant, period, demand, production_cost and optionally holding_cost (per period),
+#   with one row per triple of a product that can be made and stocked at a plant in a period.
+#   Only these triples have variables, so the model grows with the number of rows, not with
+#   products x plants x periods,
+# - plant_capacity: plant, period, production_capacity, shared by all the products of the plant in that period.
+#   The plants and periods that are not in it have no capacity limit,
+# - initial_inventory (optional): product, plant, initial_inventory; it's zero for the ones that are not in it,
+# - parameters: as in data/csv; holding_cost is used for the triples without a holding_cost.
+def load_multi_product_data(input_folder):
+    input_dir = get_file_directory(input_folder)
+    names = ['product_data', 'plant_capacity', 'initial_inventory', 'parameters']
+    input_df_dict = read_csv_files([os.path.join(input_dir, name + '.csv') for name in names
+                                    if os.path.exists(os.path.join(input_dir, name + '.csv'))])
+    input_param_dict = input_df_dict.pop('parameters').set_index('attribute')['value'].to_dict()
+    return input_df_dict, input_param_dict
+
+
+def get_sorted_triples(product_data):
+    # product_data sorted by product, plant and period, so each (product, plant) is a run of rows
+    triples = product_data.sort_values(KEYS, kind='stable', ignore_index=True)
+    duplicated = triples.duplicated(KEYS)
+    if duplicated.any():
+        raise ValueError(f'product_data has more than one row for {tuple(triples.loc[duplicated.idxmax(), KEYS])}!')
+    return triples
+
+
+# ================== Building the IR ==================
+@timed('ir')
+def build_multi_product_ir(input_df_dict, input_params):
+    """
+    The multi-product, multi-plant model in the format of model_ir.build_ir, built with grouped numpy
+    operations on the triples of product_data (see get_sorted_triples) rather than a loop over them:
+    - the columns are X (production) and I (inventory) of each triple,
+    - the inventory balance rows I_prev + X - I = d, where I_prev is the inventory of the previous period of
+      the same product and plant (the initial inventory, on the right-hand side, for its first period),
+    - the production capacity rows, one per plant and period in plant_capacity that has triples:
+      the sum of X of its triples <= production_capacity.
+    If the periods of a product at a plant are not consecutive, the inventory of a period is held until
+    its next period, so its holding cost is multiplied by the number of periods in between.
+    'triples' is the sorted product_data and 'capacity_keys' the plant and period of each capacity row.
+    The names are made of the positions of the triples and capacity rows (e.g. X_0 and prod_cap_0) rather than
+    of the products and plants, which may have characters that the solvers replace and so make names collide.
+    A product and plant with more than one initial_inventory or a plant and period with more than one
+    production_capacity raise a pandas MergeError (a ValueError).
+    """
+    triples = get_sorted_triples(input_df_dict['product_data'])
+    n = len(triples)
+    production, inventory = np.arange(n), n + np.arange(n)
+    product, plant = triples['product'].to_numpy(), triples['plant'].to_numpy()
+    period = triples['period'].to_numpy()
+    # Whether each triple is the first one of its product and plant
+    first = np.ones(n, dtype=bool)
+    first[1:] = (product[1:] != product[:-1]) | (plant[1:] != plant[:-1])
+    last = np.append(first[1:], True)
+
+    # ================== Inventory balance rows ==================
+    rhs = triples['demand'].to_numpy(dtype=float, copy=True)
+    if 'initial_inventory' in input_df_dict:
+        initial_inventory = triples.loc[first, ['product', 'plant']].merge(
+            input_df_dict['initial_inventory'], on=['product', 'plant'], how='left',
+            validate='many_to_one')['initial_inventory']
+        rhs[first] -= initial_inventory.fillna(0.0).to_numpy(dtype=float)
+    # Each balance row has I_prev, X and I, except the first row of each product and plant, which has no I_prev
+    has_term = np.ones((n, 3), dtype=bool)
+    has_term[:, 0] = ~first
+    has_term = has_term.ravel()
+    balance_indptr = np.concatenate(([0], np.cumsum(np.where(first, 2, 3))))
+    balance_indices = np.column_stack((inventory - 1, production, inventory)).ravel()[has_term]
+    balance_values = np.tile([1.0, 1.0, -1.0], n)[has_term]
+
+    # ================== Production capacity rows ==================
+    # The triples of each row are found by sorting the triples by their row (plant and period)
+    capacity = triples[['plant', 'period']].merge(
+        input_df_dict['plant_capacity'], on=['plant', 'period'], how='left',
+        validate='many_to_one')['production_capacity'].to_numpy(dtype=float)
+    capacitated = np.flatnonzero(~np.isnan(capacity))
+    keys = triples.loc[capacitated, ['plant', 'period']]
+    row = keys.groupby(['plant', 'period'], sort=True).ngroup().to_numpy()
+    order = np.argsort(row, kind='stable')
+    counts = np.bincount(row)
+    capacity_keys = keys.drop_duplicates().sort_values(['plant', 'period'], ignore_index=True)
+    capacity_rhs = np.zeros(len(capacity_keys))
+    capacity_rhs[row] = capacity[capacitated]
+
+    # ================== Costs ==================
+    holding_cost = triples['holding_cost'].to_numpy(dtype=float) if 'holding_cost' in triples \
+        else np.full(n, float(input_params['holding_cost']))
+    periods_held = np.where(last, 1, np.diff(period, append=period[-1] if n else 0))
+
+    m = len(capacity_keys)
+    names = list(map(str, range(n)))
+    return {
+        'triples': triples[KEYS],
+        'capacity_keys': capacity_keys,
+        'col_names': ['X_' + name for name in names] + ['I_' + name for name in names],
+        'col_lower': np.zeros(2 * n),
+        'col_upper': np.full(2 * n, np.inf),
+        'col_cost': np.concatenate((triples['production_cost'].to_numpy(dtype=float), holding_cost * periods_held)),
+        'col_blocks': {'production_variables': slice(0, n), 'inventory_variables': slice(n, 2 * n)},
+        'integers': np.array([], dtype=np.int32),
+        'row_names': ['inv_balance_' + name for name in names] + [f'prod_cap_{j}' for j in range(m)],
+        'row_senses': np.concatenate((np.full(n, EQUAL), np.full(m, LESS_EQUAL))),
+        'rhs': np.concatenate((rhs, capacity_rhs)),
+        'row_blocks': {'inv_balance_constraints': slice(0, n), 'production_capacity_constraints': slice(n, n + m)},
+        'indptr': np.concatenate((balance_indptr, balance_indptr[-1] + np.cumsum(counts))).astype(np.int32),
+        'indices': np.concatenate((balance_indices, production[capacitated[order]])).astype(np.int32),
+        'values': np.concatenate((balance_values, np.ones(len(capacitated)))),
+    }
+
+
+# ================== Model ==================
+class MultiProductModel(object):
+    """
+    The multi-product, multi-plant model of the tables of load_multi_product_data, loaded from its IR
+    (see build_multi_product_ir) by the OptimizationModel of 'module' (as in model_params; default is
+    model_params['module']) and solved by it, e.g. with model_params['solver'] for pulp ('highs' passes
+    the IR to HiGHS as is). The 'native' module has no IR, so it can't be used. The outputs are in the
+    long format: one row per triple with its production and inventory.
+    """
+
+    def __init__(self, input_df_dict, input_params, module=None):
+        self.module = model_params['module'] if module is None else module
+        if self.module == 'native':
+            raise ValueError('The native module has no IR, so it can\'t solve the multi-product model!')
+        self.input_df_dict = input_df_dict
+        self.input_params = input_params
+        self.ir = build_multi_product_ir(input_df_dict, input_params)
+        self.optimizer = get_optimization_model(self.module)(None, input_params, ir=self.ir)
+        self.model = self.optimizer.model
+        self.status = None
+        self.objective_value = None
+        logger.info(f"The model has {len(self.ir['triples']):,} triples, {len(self.ir['col_cost']):,} variables "
+                    f"and {len(self.ir['rhs']):,} constraints!")
+
+    # ================== Optimization ==================
+    def optimize(self):
+        self.optimizer.optimize()
+        self.status = self.optimizer.status
+        self.objective_value = self.optimizer.objective_value
+
+    # ================== Output ==================
+    def get_values(self):
+        # The production and inventory of each triple as numpy arrays, in the order of ir['triples']
+        _, values = extract_values({'variables': Registry(0, self.optimizer.variables)}, module=self.module,
+                                   model=self.model)['variables']
+        return {name: values[block] for name, block in self.ir['col_blocks'].items()}
+
+    def get_output(self):
+        values = self.get_values()
+        return {'multi_product_plan': self.ir['triples'].assign(production=values['production_variables'],
+                                                                 inventory=values['inventory_variables'])}
+
+    @timed('create_output')
+    def create_output(self):
+        write_output(self.get_output())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Solves the multi-product, multi-plant production planning model.')
+    parser.add_argument('--input-folder', help='with product_data.csv, plant_capacity.csv, parameters.csv and '
+                                               'optionally initial_inventory.csv')
+    parser.add_argument('--generate', type=int, nargs=3, metavar=('PRODUCTS', 'PLANTS', 'PERIODS'),
+                        help='solve a generated instance instead (see generate_data.generate_multi_product_instance)')
+    parser.add_argument('--module', choices=['pulp', 'gurobi', 'cplex', 'xpress'])
+    parser.add_argument('--solver', choices=['cbc', 'gurobi', 'cplex', 'glpk', 'xpress', 'highs', 'race'],
+                        help='the solver of the pulp module')
+    args = parser.parse_args(argv)
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+    if args.module:
+        model_params['module'] = None if args.module == 'pulp' else args.module
+    if args.solver:
+        model_params['solver'] = args.solver
+
+    if args.generate:
+        from generate_data import generate_multi_product_instance
+        input_df_dict = generate_multi_product_instance(*args.generate)
+        input_param_dict = input_df_dict.pop('parameters').set_index('attribute')['value'].to_dict()
+    elif args.input_folder:
+        input_df_dict, input_param_dict = load_multi_product_data(args.input_folder)
+    else:
+        parser.error('either --input-folder or --generate is needed!')
+    optimizer = MultiProductModel(input_df_dict, input_param_dict)
+    optimizer.optimize()
+    if optimizer.status == 'Optimal':
+        optimizer.create_output()
+        logger.info(f"Outputs are written to {model_params['output_type']}!")
+
+
+if __name__ == '__main__':
+    main()
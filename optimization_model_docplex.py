@@ -1,11 +1,17 @@
 import logging
 
 import docplex.mp.model as cpx
+import numpy as np
+from docplex.mp.advmodel import AdvModel
 from docplex.mp.context import Context
+from docplex.util.status import JobSolveStatus
 
-from helper import write_to_csv
+from helper import write_output
+from metrics import phase, timed
+from model_ir import build_ir, get_rows
 from parameters import model_params
-from process_data import write_outputs
+from process_data import create_output_df_dict, extract_values, get_data_changes, has_setup_costs
+from registry import Registry
 
 __author__ = 'Ehsan Khodabandeh'
 __version__ = '1.0'
@@ -13,20 +19,41 @@ __version__ = '1.0'
 
 logger = logging.getLogger(__name__ + ': ')
 
+# docplex solve status in the same terms as pulp.LpStatus
+STATUS = {JobSolveStatus.OPTIMAL_SOLUTION: 'Optimal', JobSolveStatus.INFEASIBLE_SOLUTION: 'Infeasible',
+          JobSolveStatus.UNBOUNDED_SOLUTION: 'Unbounded', JobSolveStatus.INFEASIBLE_OR_UNBOUNDED_SOLUTION: 'Undefined'}
+
 
 class OptimizationModel(object):
-    def __init__(self, input_data, input_params):
+    @timed('build')
+    def __init__(self, input_data, input_params, ir=None):
         self.input_data = input_data
         self.input_params = input_params
         self.model = cpx.Model('prod_planning')
-        self._create_decision_variables()
-        self._create_main_constraints()
-        self._set_objective_function()
+        self.status = None
+        self.objective_value = None
+        # The binary setup variables and their constraints, if input_data has setup costs (see has_setup_costs)
+        self.setup_variables = None
+        if ir is not None:
+            # The IR of another model (e.g. multi_product.build_multi_product_ir) is loaded as is (see _load_ir)
+            self.model = AdvModel('prod_planning')
+            self._load_ir(ir)
+        elif model_params['build_mode'] == 'ir':
+            # AdvModel is a Model with the bulk methods, such as matrix_constraints
+            self.model = AdvModel('prod_planning')
+            self._create_model_from_ir(build_ir(input_data, input_params))
+        else:
+            self._create_decision_variables()
+            self._create_main_constraints()
+            self._set_objective_function()
 
     # ================== Decision variables ==================
+    @timed('variables')
     def _create_decision_variables(self):
         self.production_variables = self.model.continuous_var_dict(self.input_data.index, name="X")
         self.inventory_variables = self.model.continuous_var_dict(self.input_data.index, name="I")
+        if has_setup_costs(self.input_data):
+            self.setup_variables = self.model.binary_var_dict(self.input_data.index, name="Y")
 
         # Alternative way of creating the variables
         # self.production_variables = {index: self.model.continuous_var(name='X_' + str(row['period']))
@@ -44,25 +71,37 @@ class OptimizationModel(object):
         # the slack variables of certain constraints, you know they already exists in your model
 
         # ================== Inventory balance constraints ==================
-        self.inv_balance_constraints = self.model.add_constraints(
-            (self.inventory_variables[period - 1] + self.production_variables[period]
-             - self.inventory_variables[period] == value.demand,
-             'inv_balance' + str(period))
-            for period, value in self.input_data.iloc[1:].iterrows())
-
-        # inv balance for first period
-        self.first_period_inv_balance_constraints = self.model.add_constraint(
-            ct=self.production_variables[0] - self.inventory_variables[0]
-               == self.input_data.iloc[0].demand - self.input_params['initial_inventory'],
-            ctname='inv_balance0')
+        with phase('inventory_balance_constraints'):
+            self.inv_balance_constraints = self.model.add_constraints(
+                (self.inventory_variables[period - 1] + self.production_variables[period]
+                 - self.inventory_variables[period] == value.demand,
+                 'inv_balance' + str(period))
+                for period, value in self.input_data.iloc[1:].iterrows())
+
+            # inv balance for first period
+            self.first_period_inv_balance_constraints = self.model.add_constraint(
+                ct=self.production_variables[0] - self.inventory_variables[0]
+                   == self.input_data.iloc[0].demand - self.input_params['initial_inventory'],
+                ctname='inv_balance0')
 
         # ================== Production capacity constraints ==================
-        self.production_capacity_constraints = self.model.add_constraints(
-            (value <= self.input_data.iloc[index].production_capacity,
-             'prod_cap_month_' + str(index))
-            for index, value in self.production_variables.items())
+        with phase('production_capacity_constraints'):
+            self.production_capacity_constraints = self.model.add_constraints(
+                (value <= self.input_data.iloc[index].production_capacity,
+                 'prod_cap_month_' + str(index))
+                for index, value in self.production_variables.items())
+
+        # ================== Setup constraints ==================
+        # There is production in a period only if there is a setup in it
+        if self.setup_variables is not None:
+            with phase('setup_constraints'):
+                self.setup_constraints = self.model.add_constraints(
+                    (value - self.input_data.iloc[index].production_capacity * self.setup_variables[index] <= 0,
+                     'setup_' + str(index))
+                    for index, value in self.production_variables.items())
 
     # ================== Costs and objective function ==================
+    @timed('objective')
     def _set_objective_function(self):
         # Similar to constraints, saving the costs expressions as attributes
         # can give you the chance to retrieve their values at the end of the optimization
@@ -72,9 +111,75 @@ class OptimizationModel(object):
                                                     for index, row in self.input_data.iterrows())
 
         objective = self.total_holding_cost + self.total_production_cost
+        if self.setup_variables is not None:
+            self.total_setup_cost = self.model.sum(row['setup_cost'] * self.setup_variables[index]
+                                                   for index, row in self.input_data.iterrows())
+            objective += self.total_setup_cost
         self.model.minimize(objective)
 
+    # ================== Construction from the model IR ==================
+    # The model is loaded from the arrays of model_ir.build_ir: the variables with one
+    # continuous_var_list and each family of constraints with one matrix_constraints
+    # (which takes a scipy sparse matrix), rather than an expression per constraint.
+    # As in the methods above, the constraints are kept in lists (by position).
+    def _load_ir(self, ir):
+        # The variables (self.variables, in the order of the columns) and the constraints of each row block
+        # (self.constraints) of any IR; _create_model_from_ir gives them the meaning of the model of input_data
+        import scipy.sparse as sp
+
+        with phase('variables'):
+            # The integer columns (the setup variables) are the last ones
+            n_continuous = len(ir['col_cost']) - len(ir['integers'])
+            upper = np.where(np.isinf(ir['col_upper']), self.model.infinity, ir['col_upper'])
+            self.variables = self.model.continuous_var_list(n_continuous, lb=ir['col_lower'][:n_continuous].tolist(),
+                                                            ub=upper[:n_continuous].tolist(),
+                                                            name=list(ir['col_names'][:n_continuous]))
+            if len(ir['integers']):
+                self.variables += self.model.binary_var_list(len(ir['integers']),
+                                                             name=list(ir['col_names'][n_continuous:]))
+
+        self.constraints = {}
+        senses = {'E': 'eq', 'L': 'le', 'G': 'ge'}
+        for block, rows in ir['row_blocks'].items():
+            with phase(block.replace('inv_balance', 'inventory_balance')):
+                indptr, indices, values, row_senses, rhs = get_rows(ir, rows)
+                # matrix_constraints takes one sense for all the rows, which is the case for each family here.
+                # It only creates the constraints; add_constraints adds them to the model with their names
+                matrix = sp.csr_matrix((values, indices, indptr), shape=(len(rhs), len(self.variables))).tocoo()
+                self.constraints[block] = self.model.add_constraints(
+                    self.model.matrix_constraints(matrix, self.variables, rhs.tolist(), sense=senses[row_senses[0]]),
+                    list(ir['row_names'][rows]))
+
+        with phase('objective'):
+            self.model.minimize(self.model.scal_prod(self.variables, ir['col_cost'].tolist()))
+
+    def _create_model_from_ir(self, ir):
+        start = int(ir['periods'][0])
+        n = len(ir['periods'])
+        self._load_ir(ir)
+        variables, constraints = self.variables, self.constraints
+        self.production_variables = Registry(start, variables[ir['col_blocks']['production_variables']])
+        self.inventory_variables = Registry(start, variables[ir['col_blocks']['inventory_variables']])
+        if 'setup_variables' in ir['col_blocks']:
+            self.setup_variables = Registry(start, variables[ir['col_blocks']['setup_variables']])
+
+        self.first_period_inv_balance_constraints = constraints['inv_balance_constraints'][0]
+        self.inv_balance_constraints = constraints['inv_balance_constraints'][1:]
+        self.production_capacity_constraints = constraints['production_capacity_constraints']
+        if self.setup_variables is not None:
+            self.setup_constraints = constraints['setup_constraints']
+
+        # The objective is already set by the costs of the columns
+        self.total_holding_cost = self.model.scal_prod(self.inventory_variables.values(),
+                                                       ir['col_cost'][n:2 * n].tolist())
+        self.total_production_cost = self.model.scal_prod(self.production_variables.values(),
+                                                          ir['col_cost'][:n].tolist())
+        if self.setup_variables is not None:
+            self.total_setup_cost = self.model.scal_prod(self.setup_variables.values(),
+                                                         ir['col_cost'][2 * n:].tolist())
+
     # ================== Optimization ==================
+    @timed('optimize')
     def optimize(self):
         """
         If CPLEX is installed locally, we can use that to solve the problem.
@@ -89,12 +194,16 @@ class OptimizationModel(object):
 
         if model_params['write_lp']:
             logger.info('Writing the lp file!')
-            self.model.export_as_lp('./{}.lp'.format(self.model.name))
+            with phase('lp_write'):
+                self.model.export_as_lp('./{}.lp'.format(self.model.name))
 
-        ctx = Context()
-        ctx.solver.docloud.url = model_params['url']
-        ctx.solver.docloud.key = model_params['api_key']
-        agent = 'docloud' if model_params['cplex_cloud'] else 'local'
+        ctx, agent = None, 'local'
+        if model_params['cplex_cloud']:
+            # The recent versions of docplex have no docloud settings in their default context
+            ctx = Context()
+            ctx.solver.docloud.url = model_params['url']
+            ctx.solver.docloud.key = model_params['api_key']
+            agent = 'docloud'
 
         # There are several ways to set the parameters. Here are two ways:
         # method 1:
@@ -102,6 +211,8 @@ class OptimizationModel(object):
             self.model.parameters.mip.tolerances.mipgap = model_params['mip_gap']
         if model_params['time_limit']:
             self.model.set_time_limit(model_params['time_limit'])
+        if self.setup_variables is not None and model_params['warm_start']:
+            self._set_mip_start()
 
         # # method 2:
         # cplex_parameters = {'mip.tolerances.mipgap': model_params['mip_gap'],
@@ -109,21 +220,117 @@ class OptimizationModel(object):
         # ctx.update(cplex_parameters, create_missing_nodes=True)
 
         logger.info('Optimization starts!')
-        if model_params['write_log']:
-            with open("cplex.log", "w") as outs:
-                # prints CPLEX output to file "cplex.log"
-                self.model.solve(context=ctx, agent=agent, log_output=outs)
-        else:
-            self.model.solve(context=ctx, agent=agent, log_output=model_params['display_log'])
+        with phase('solve'):
+            if model_params['write_log']:
+                with open("cplex.log", "w") as outs:
+                    # prints CPLEX output to file "cplex.log"
+                    self.model.solve(context=ctx, agent=agent, log_output=outs)
+            else:
+                self.model.solve(context=ctx, agent=agent, log_output=model_params['display_log'])
 
-        if self.model.solve_details.status == 'optimal':
+        self.status = STATUS.get(self.model.solve_status, 'Not Solved')
+        if self.status == 'Optimal':
+            self.objective_value = self.model.objective_value
             logger.info('The solution is optimal and the objective value '
                         'is ${:,.2f}!'.format(self.model.objective_value))
+        else:
+            self.objective_value = None
+            logger.warning(f'The solution is not optimal; the status is {self.status}!')
+
+    def _set_mip_start(self):
+        # The MIP starts from the plan of lot_sizing.get_mip_start, if there is one
+        from docplex.mp.solution import SolveSolution
+
+        from lot_sizing import get_mip_start
+
+        with phase('mip_start'):
+            mip_start = get_mip_start(self.input_data, self.input_params)
+            if mip_start is not None:
+                self.model.clear_mip_starts()
+                self.model.add_mip_start(SolveSolution(self.model, {
+                    var: value for name, values in mip_start.items()
+                    for var, value in zip(getattr(self, name).values(), values.tolist())}))
+
+    # ================== Data updates ==================
+    def update_data(self, new_input_data):
+        """
+        Changes the demand, production capacity and production cost of the model to those of
+        'new_input_data' and solves it again. Only the right-hand sides and objective coefficients
+        that have changed are modified. With a local CPLEX, the model is kept in the engine and the
+        new solve starts from the previous basis. The periods of 'new_input_data' should be the same.
+        Note that add_constraints returns lists, so the constraints are accessed by position here.
+        """
+        changes = get_data_changes(self.input_data, new_input_data)
+        index = new_input_data.index
+
+        for pos in changes['demand']:
+            if pos == 0:
+                self.first_period_inv_balance_constraints.set_right_expr(
+                    float(new_input_data['demand'].iat[0] - self.input_params['initial_inventory']))
+            else:
+                self.inv_balance_constraints[pos - 1].set_right_expr(float(new_input_data['demand'].iat[pos]))
+
+        for pos in changes['production_capacity']:
+            self.production_capacity_constraints[pos].set_right_expr(
+                float(new_input_data['production_capacity'].iat[pos]))
+
+        for pos in changes['production_cost']:
+            var = self.production_variables[index[pos]]
+            self.model.objective_expr.set_coefficient(var, float(new_input_data['production_cost'].iat[pos]))
+            self.total_production_cost.set_coefficient(var, float(new_input_data['production_cost'].iat[pos]))
+
+        if self.setup_variables is not None:
+            for pos in changes['production_capacity']:
+                self.setup_constraints[pos].left_expr.set_coefficient(
+                    self.setup_variables[index[pos]], -float(new_input_data['production_capacity'].iat[pos]))
+            for pos in changes['setup_cost']:
+                var = self.setup_variables[index[pos]]
+                self.model.objective_expr.set_coefficient(var, float(new_input_data['setup_cost'].iat[pos]))
+                self.total_setup_cost.set_coefficient(var, float(new_input_data['setup_cost'].iat[pos]))
+
+        logger.info('Model is updated with {} demand, {} capacity and {} cost changes!'.format(
+            *(len(pos) for pos in changes.values())))
+        self.input_data = new_input_data
+        self.optimize()
+
+    def update_params(self, new_input_params):
+        """
+        Changes the holding_cost and initial_inventory of the model to those of 'new_input_params'
+        and solves it again, like update_data: only the objective coefficients of the inventory
+        variables and the right-hand side of the first inventory balance constraint are modified.
+        """
+        holding_cost = new_input_params['holding_cost']
+        if holding_cost != self.input_params['holding_cost']:
+            for var in self.inventory_variables.values():
+                self.model.objective_expr.set_coefficient(var, float(holding_cost))
+            self.total_holding_cost = holding_cost * self.model.sum(self.inventory_variables.values())
+        if new_input_params['initial_inventory'] != self.input_params['initial_inventory']:
+            self.first_period_inv_balance_constraints.set_right_expr(
+                float(self.input_data['demand'].iat[0] - new_input_params['initial_inventory']))
+        self.input_params = new_input_params
+        self.optimize()
 
     # ================== Output ==================
-    def create_output(self):
+    def get_values(self):
+        # {name: (periods, values)} as numpy arrays; see process_data.extract_values
         dict_of_variables = {'production_variables': self.production_variables,
                              'inventory_variables': self.inventory_variables}
+        if self.setup_variables is not None:
+            dict_of_variables['setup_variables'] = self.setup_variables
 
-        output_df = write_outputs(dict_of_variables, attr='solution_value')
-        write_to_csv(output_df)
+        return extract_values(dict_of_variables, module='cplex', model=self.model)
+
+    def get_duals(self):
+        # Like the pulp module; dual values are only available for LPs
+        if not self.model.solution or self.model.number_of_integer_variables + self.model.number_of_binary_variables:
+            return None
+        inv_balance = [self.first_period_inv_balance_constraints] + list(self.inv_balance_constraints)
+        return {'inv_balance': np.array(self.model.dual_values(inv_balance)),
+                'production_capacity': np.array(self.model.dual_values(self.production_capacity_constraints))}
+
+    def get_output(self):
+        return create_output_df_dict(self.get_values())
+
+    @timed('create_output')
+    def create_output(self):
+        write_output(self.get_output())
@@ -1,10 +1,14 @@
 import logging
 
 import gurobipy as grb
+import numpy as np
 
-from helper import write_to_csv
+from helper import write_output
+from metrics import phase, timed
+from model_ir import build_ir, get_rows
 from parameters import model_params
-from process_data import write_outputs
+from process_data import create_output_df_dict, extract_values, get_data_changes, has_setup_costs
+from registry import Registry
 
 __author__ = 'Ehsan Khodabandeh'
 __version__ = '1.0'
@@ -12,20 +16,38 @@ __version__ = '1.0'
 
 logger = logging.getLogger(__name__ + ': ')
 
+# gurobi status codes in the same terms as pulp.LpStatus
+STATUS = {grb.GRB.OPTIMAL: 'Optimal', grb.GRB.INFEASIBLE: 'Infeasible',
+          grb.GRB.UNBOUNDED: 'Unbounded', grb.GRB.INF_OR_UNBD: 'Undefined'}
+
 
 class OptimizationModel(object):
-    def __init__(self, input_data, input_params):
+    @timed('build')
+    def __init__(self, input_data, input_params, ir=None):
         self.input_data = input_data
         self.input_params = input_params
         self.model = grb.Model('prod_planning')
-        self._create_decision_variables()
-        self._create_main_constraints()
-        self._set_objective_function()
+        self.status = None
+        self.objective_value = None
+        # The binary setup variables and their constraints, if input_data has setup costs (see has_setup_costs)
+        self.setup_variables = None
+        if ir is not None:
+            # The IR of another model (e.g. multi_product.build_multi_product_ir) is loaded as is (see _load_ir)
+            self._load_ir(ir)
+        elif model_params['build_mode'] == 'ir':
+            self._create_model_from_ir(build_ir(input_data, input_params))
+        else:
+            self._create_decision_variables()
+            self._create_main_constraints()
+            self._set_objective_function()
 
     # ================== Decision variables ==================
+    @timed('variables')
     def _create_decision_variables(self):
         self.production_variables = self.model.addVars(self.input_data.index, vtype=grb.GRB.CONTINUOUS, name="X")
         self.inventory_variables = self.model.addVars(self.input_data.index, vtype=grb.GRB.CONTINUOUS, name="I")
+        if has_setup_costs(self.input_data):
+            self.setup_variables = self.model.addVars(self.input_data.index, vtype=grb.GRB.BINARY, name="Y")
 
         # Alternative way of creating the variables
         # self.production_variables = {index: self.model.addVar(name='X_' + str(row['period']),
@@ -45,32 +67,47 @@ class OptimizationModel(object):
         # the slack variables of certain constraints, you know they already exists in your model
 
         # ================== Inventory balance constraints ==================
-        self.inv_balance_constraints = {
-            period: self.model.addConstr(
-                lhs=self.inventory_variables[period - 1] + self.production_variables[period]
-                    - self.inventory_variables[period],
-                sense=grb.GRB.EQUAL,
-                name='inv_balance' + str(period),
-                rhs=value.demand)
-            for period, value in self.input_data.iloc[1:].iterrows()}
+        with phase('inventory_balance_constraints'):
+            self.inv_balance_constraints = {
+                period: self.model.addLConstr(
+                    lhs=self.inventory_variables[period - 1] + self.production_variables[period]
+                        - self.inventory_variables[period],
+                    sense=grb.GRB.EQUAL,
+                    name='inv_balance' + str(period),
+                    rhs=value.demand)
+                for period, value in self.input_data.iloc[1:].iterrows()}
 
-        # inv balance for first period
-        self.first_period_inv_balance_constraints = self.model.addConstr(
-            lhs=self.production_variables[0] - self.inventory_variables[0],
-            sense=grb.GRB.EQUAL,
-            name='inv_balance0',
-            rhs=self.input_data.iloc[0].demand - self.input_params['initial_inventory'])
+            # inv balance for first period
+            self.first_period_inv_balance_constraints = self.model.addLConstr(
+                lhs=self.production_variables[0] - self.inventory_variables[0],
+                sense=grb.GRB.EQUAL,
+                name='inv_balance0',
+                rhs=self.input_data.iloc[0].demand - self.input_params['initial_inventory'])
 
         # ================== Production capacity constraints ==================
-        self.production_capacity_constraints = {
-            index: self.model.addConstr(
-                lhs=value,
-                sense=grb.GRB.LESS_EQUAL,
-                name='prod_cap_month_' + str(index),
-                rhs=self.input_data.iloc[index].production_capacity)
-            for index, value in self.production_variables.items()}
+        with phase('production_capacity_constraints'):
+            self.production_capacity_constraints = {
+                index: self.model.addLConstr(
+                    lhs=value,
+                    sense=grb.GRB.LESS_EQUAL,
+                    name='prod_cap_month_' + str(index),
+                    rhs=self.input_data.iloc[index].production_capacity)
+                for index, value in self.production_variables.items()}
+
+        # ================== Setup constraints ==================
+        # There is production in a period only if there is a setup in it
+        if self.setup_variables is not None:
+            with phase('setup_constraints'):
+                self.setup_constraints = {
+                    index: self.model.addLConstr(
+                        lhs=value - self.input_data.iloc[index].production_capacity * self.setup_variables[index],
+                        sense=grb.GRB.LESS_EQUAL,
+                        name='setup_' + str(index),
+                        rhs=0)
+                    for index, value in self.production_variables.items()}
 
     # ================== Costs and objective function ==================
+    @timed('objective')
     def _set_objective_function(self):
         # Similar to constraints, saving the costs expressions as attributes
         # can give you the chance to retrieve their values at the end of the optimization
@@ -80,13 +117,72 @@ class OptimizationModel(object):
                                                   for index, row in self.input_data.iterrows())
 
         objective = self.total_holding_cost + self.total_production_cost
+        if self.setup_variables is not None:
+            self.total_setup_cost = grb.quicksum(row['setup_cost'] * self.setup_variables[index]
+                                                 for index, row in self.input_data.iterrows())
+            objective += self.total_setup_cost
         self.model.setObjective(objective, grb.GRB.MINIMIZE)
 
+    # ================== Construction from the model IR ==================
+    # The model is loaded from the arrays of model_ir.build_ir with the matrix interface of gurobi:
+    # all the variables with one addMVar and each family of constraints with one addMConstr
+    # (which takes a scipy sparse matrix), rather than an expression per constraint.
+    def _load_ir(self, ir):
+        # The variables (self.variables, in the order of the columns) and the constraints of each row block
+        # (self.constraints) of any IR; _create_model_from_ir gives them the meaning of the model of input_data
+        import scipy.sparse as sp
+
+        with phase('variables'):
+            vtype = np.full(len(ir['col_cost']), grb.GRB.CONTINUOUS)
+            vtype[ir['integers']] = grb.GRB.BINARY
+            x = self.model.addMVar(len(ir['col_cost']), lb=ir['col_lower'], ub=ir['col_upper'], obj=ir['col_cost'],
+                                   vtype=vtype)
+            self.model.ModelSense = grb.GRB.MINIMIZE
+            self.model.update()
+            self.variables = x.tolist()
+            self.model.setAttr(grb.GRB.Attr.VarName, self.variables, list(ir['col_names']))
+
+        self.constraints = {}
+        senses = {'E': grb.GRB.EQUAL, 'L': grb.GRB.LESS_EQUAL, 'G': grb.GRB.GREATER_EQUAL}
+        for block, rows in ir['row_blocks'].items():
+            with phase(block.replace('inv_balance', 'inventory_balance')):
+                indptr, indices, values, row_senses, rhs = get_rows(ir, rows)
+                matrix = sp.csr_matrix((values, indices, indptr), shape=(len(rhs), len(self.variables)))
+                self.constraints[block] = self.model.addMConstr(
+                    matrix, x, np.vectorize(senses.get)(row_senses), rhs).tolist()
+        self.model.update()
+        self.model.setAttr(grb.GRB.Attr.ConstrName, [constr for block in self.constraints.values()
+                                                     for constr in block], list(ir['row_names']))
+
+    def _create_model_from_ir(self, ir):
+        start = int(ir['periods'][0])
+        n = len(ir['periods'])
+        self._load_ir(ir)
+        variables, constraints = self.variables, self.constraints
+        self.production_variables = Registry(start, variables[ir['col_blocks']['production_variables']])
+        self.inventory_variables = Registry(start, variables[ir['col_blocks']['inventory_variables']])
+        if 'setup_variables' in ir['col_blocks']:
+            self.setup_variables = Registry(start, variables[ir['col_blocks']['setup_variables']])
+
+        self.first_period_inv_balance_constraints = constraints['inv_balance_constraints'][0]
+        self.inv_balance_constraints = Registry(start + 1, constraints['inv_balance_constraints'][1:])
+        self.production_capacity_constraints = Registry(start, constraints['production_capacity_constraints'])
+        if self.setup_variables is not None:
+            self.setup_constraints = Registry(start, constraints['setup_constraints'])
+
+        # The objective is already set by the costs of the variables
+        self.total_holding_cost = grb.LinExpr(ir['col_cost'][n:2 * n].tolist(), self.inventory_variables.values())
+        self.total_production_cost = grb.LinExpr(ir['col_cost'][:n].tolist(), self.production_variables.values())
+        if self.setup_variables is not None:
+            self.total_setup_cost = grb.LinExpr(ir['col_cost'][2 * n:].tolist(), self.setup_variables.values())
+
     # ================== Optimization ==================
+    @timed('optimize')
     def optimize(self):
         if model_params['write_lp']:
             logger.info('Writing the lp file!')
-            self.model.write(self.model.ModelName + '.lp')
+            with phase('lp_write'):
+                self.model.write(self.model.ModelName + '.lp')
 
         if not model_params['write_log']:
             self.model.setParam('OutputFlag', 0)
@@ -99,16 +195,113 @@ class OptimizationModel(object):
             self.model.setParam(grb.GRB.Param.MIPGap, model_params['mip_gap'])
         if model_params['time_limit']:
             self.model.setParam(grb.GRB.Param.TimeLimit, model_params['time_limit'])
+        if self.setup_variables is not None and model_params['warm_start']:
+            self._set_mip_start()
 
-        self.model.optimize()
+        with phase('solve'):
+            self.model.optimize()
+        self.status = STATUS.get(self.model.Status, 'Not Solved')
         if self.model.Status == grb.GRB.OPTIMAL:
+            self.objective_value = self.model.objVal
             logger.info('The solution is optimal and the objective value '
                         'is ${:,.2f}!'.format(self.model.objVal))
+        else:
+            self.objective_value = None
+            logger.warning(f'The solution is not optimal; the status is {self.status}!')
+
+    def _set_mip_start(self):
+        # The MIP starts from the plan of lot_sizing.get_mip_start, if there is one
+        from lot_sizing import get_mip_start
+
+        with phase('mip_start'):
+            mip_start = get_mip_start(self.input_data, self.input_params)
+            if mip_start is not None:
+                for name, values in mip_start.items():
+                    self.model.setAttr(grb.GRB.Attr.Start, list(getattr(self, name).values()), values.tolist())
+
+    # ================== Data updates ==================
+    def update_data(self, new_input_data):
+        """
+        Changes the demand, production capacity and production cost of the model to those of
+        'new_input_data' and solves it again. Only the right-hand sides and objective coefficients
+        that have changed are modified. Gurobi keeps the last basis of the model, so the new solve
+        starts from the previous solution. The periods of 'new_input_data' should be the same.
+        """
+        changes = get_data_changes(self.input_data, new_input_data)
+        index = new_input_data.index
+        demand = new_input_data['demand']
+
+        constraints = [self.first_period_inv_balance_constraints if pos == 0
+                       else self.inv_balance_constraints[index[pos]] for pos in changes['demand']]
+        rhs = [demand.iat[pos] - (self.input_params['initial_inventory'] if pos == 0 else 0)
+               for pos in changes['demand']]
+        constraints += [self.production_capacity_constraints[index[pos]] for pos in changes['production_capacity']]
+        rhs += new_input_data['production_capacity'].iloc[changes['production_capacity']].tolist()
+        if constraints:
+            self.model.setAttr(grb.GRB.Attr.RHS, constraints, rhs)
+
+        if len(changes['production_cost']):
+            self.model.setAttr(grb.GRB.Attr.Obj,
+                               [self.production_variables[index[pos]] for pos in changes['production_cost']],
+                               new_input_data['production_cost'].iloc[changes['production_cost']].tolist())
+            self.total_production_cost = grb.LinExpr(new_input_data['production_cost'].tolist(),
+                                                     [self.production_variables[i] for i in index])
+
+        if self.setup_variables is not None:
+            for pos in changes['production_capacity']:
+                self.model.chgCoeff(self.setup_constraints[index[pos]], self.setup_variables[index[pos]],
+                                    -new_input_data['production_capacity'].iat[pos])
+            if len(changes['setup_cost']):
+                self.model.setAttr(grb.GRB.Attr.Obj,
+                                   [self.setup_variables[index[pos]] for pos in changes['setup_cost']],
+                                   new_input_data['setup_cost'].iloc[changes['setup_cost']].tolist())
+                self.total_setup_cost = grb.LinExpr(new_input_data['setup_cost'].tolist(),
+                                                    [self.setup_variables[i] for i in index])
+
+        logger.info('Model is updated with {} demand, {} capacity and {} cost changes!'.format(
+            *(len(pos) for pos in changes.values())))
+        self.input_data = new_input_data
+        self.optimize()
+
+    def update_params(self, new_input_params):
+        """
+        Changes the holding_cost and initial_inventory of the model to those of 'new_input_params'
+        and solves it again, like update_data: only the objective coefficients of the inventory
+        variables and the right-hand side of the first inventory balance constraint are modified.
+        """
+        holding_cost = new_input_params['holding_cost']
+        if holding_cost != self.input_params['holding_cost']:
+            inventory_variables = list(self.inventory_variables.values())
+            self.model.setAttr(grb.GRB.Attr.Obj, inventory_variables, [holding_cost] * len(inventory_variables))
+            self.total_holding_cost = holding_cost * grb.quicksum(inventory_variables)
+        if new_input_params['initial_inventory'] != self.input_params['initial_inventory']:
+            self.first_period_inv_balance_constraints.RHS = (self.input_data['demand'].iat[0]
+                                                             - new_input_params['initial_inventory'])
+        self.input_params = new_input_params
+        self.optimize()
 
     # ================== Output ==================
-    def create_output(self):
+    def get_values(self):
+        # {name: (periods, values)} as numpy arrays; see process_data.extract_values
         dict_of_variables = {'production_variables': self.production_variables,
                              'inventory_variables': self.inventory_variables}
+        if self.setup_variables is not None:
+            dict_of_variables['setup_variables'] = self.setup_variables
+
+        return extract_values(dict_of_variables, module='gurobi', model=self.model)
+
+    def get_duals(self):
+        # Like the pulp module; Pi is only available for LPs
+        if self.model.IsMIP:
+            return None
+        inv_balance = [self.first_period_inv_balance_constraints] + list(self.inv_balance_constraints.values())
+        return {'inv_balance': np.array(self.model.getAttr(grb.GRB.Attr.Pi, inv_balance)),
+                'production_capacity': np.array(self.model.getAttr(
+                    grb.GRB.Attr.Pi, list(self.production_capacity_constraints.values())))}
 
-        output_df = write_outputs(dict_of_variables, attr='x')
-        write_to_csv(output_df)
+    def get_output(self):
+        return create_output_df_dict(self.get_values())
+
+    @timed('create_output')
+    def create_output(self):
+        write_output(self.get_output())
@@ -0,0 +1,152 @@
+import heapq
+import logging
+
+import numpy as np
+
+from helper import write_output
+from metrics import phase, timed
+from process_data import create_output_df_dict, extract_values, has_setup_costs
+from registry import Registry
+
+# ====================================
+
+logger = logging.getLogger(__name__ + ': ')
+
+_EPS = 1e-9
+
+
+def solve_lot_sizing(demand, production_capacity, production_cost, holding_cost, initial_inventory):
+    """
+    Solves the production planning model of this repo without an LP solver.
+
+    A unit produced in period s and used for the demand of period t >= s costs
+    c_s + h * (t - s) = (c_s - h * s) + h * t. The h * t part only depends on the demand,
+    so every demand prefers the source with the smallest c_s - h * s, no matter which period it is.
+    Hence, serving the demands in chronological order, each from the cheapest earlier period
+    that still has capacity, is optimal. With a heap of the open periods, this is O(T log T).
+    The initial inventory has to be held anyway, so it is used for the earliest demands.
+    Production costs are assumed to be non-negative.
+
+    Returns the production and inventory arrays, or None for both if the instance is infeasible.
+    """
+    demand = np.asarray(demand, dtype=float)
+    production_capacity = np.asarray(production_capacity, dtype=float)
+    production_cost = np.asarray(production_cost, dtype=float)
+
+    from_initial_inventory = np.diff(np.minimum(np.cumsum(demand), initial_inventory), prepend=0.0)
+    net_demand = (demand - from_initial_inventory).tolist()
+    keys = (production_cost - holding_cost * np.arange(len(demand))).tolist()
+    capacity = production_capacity.tolist()
+
+    production = [0.0] * len(demand)
+    open_periods = []
+    for t, need in enumerate(net_demand):
+        if capacity[t] > 0:
+            heapq.heappush(open_periods, (keys[t], t))
+        while need > _EPS:
+            if not open_periods:
+                return None, None
+            s = open_periods[0][1]
+            amount = min(capacity[s] - production[s], need)
+            production[s] += amount
+            need -= amount
+            if capacity[s] - production[s] <= _EPS:
+                heapq.heappop(open_periods)
+
+    production = np.array(production)
+    inventory = initial_inventory + np.cumsum(production - demand)
+    return production, np.maximum(inventory, 0.0)
+
+
+class OptimizationModel(object):
+    """
+    Same interface as the OptimizationModel of the other modules, but the model is solved
+    by solve_lot_sizing rather than by a solver, so nothing is written to or read from disk.
+    The solver related parameters (e.g. 'solver', 'write_lp', 'mip_gap') have no effect here.
+    With setup costs (see process_data.has_setup_costs), the plan comes from lot_sizing.solve_setup_lot_sizing.
+    If that plan isn't proven optimal (i.e. it's from capacitated_heuristic), the status is 'Feasible'.
+    """
+
+    @timed('build')
+    def __init__(self, input_data, input_params):
+        self.input_data = input_data
+        self.input_params = input_params
+        self.production_variables = {}
+        self.inventory_variables = {}
+        self.setup_variables = None
+        self.status = None
+        self.objective_value = None
+
+    # ================== Optimization ==================
+    @timed('optimize')
+    def optimize(self):
+        logger.info('Optimization starts!')
+        setups, optimal = None, True
+        with phase('solve'):
+            if has_setup_costs(self.input_data):
+                from lot_sizing import solve_setup_lot_sizing
+                production, inventory, setups, optimal = solve_setup_lot_sizing(self.input_data, self.input_params)
+            else:
+                production, inventory = solve_lot_sizing(self.input_data['demand'].to_numpy(),
+                                                         self.input_data['production_capacity'].to_numpy(),
+                                                         self.input_data['production_cost'].to_numpy(),
+                                                         self.input_params['holding_cost'],
+                                                         self.input_params['initial_inventory'])
+        if production is None:
+            self.status = 'Infeasible'
+            self.objective_value = None
+            logger.warning('The problem is infeasible!')
+            return
+
+        self.status = 'Optimal' if optimal else 'Feasible'
+        self.total_holding_cost = self.input_params['holding_cost'] * inventory.sum()
+        self.total_production_cost = self.input_data['production_cost'].to_numpy() @ production
+        self.objective_value = float(self.total_holding_cost + self.total_production_cost)
+
+        # The values are kept in their arrays, by the periods of input_data (which should be consecutive)
+        start = self.input_data.index[0]
+        self.production_variables = Registry(start, production)
+        self.inventory_variables = Registry(start, inventory)
+        if setups is not None:
+            self.total_setup_cost = self.input_data['setup_cost'].to_numpy()[setups].sum()
+            self.objective_value += float(self.total_setup_cost)
+            self.setup_variables = Registry(start, setups.astype(float))
+        if optimal:
+            logger.info(f'The solution is optimal and the objective value '
+                        f'is ${self.objective_value:,.2f}')
+        else:
+            logger.info(f'The solution is from the capacitated heuristic and its objective value '
+                        f'is ${self.objective_value:,.2f}')
+
+    # ================== Data updates ==================
+    def update_data(self, new_input_data):
+        # There is no model to patch here; it's only for having the same interface as the other modules
+        if not self.input_data.index.equals(new_input_data.index):
+            raise ValueError('The new input_data should have the same periods as the current one!')
+        self.input_data = new_input_data
+        self.optimize()
+
+    def update_params(self, new_input_params):
+        self.input_params = new_input_params
+        self.optimize()
+
+    # ================== Output ==================
+    def get_values(self):
+        # {name: (periods, values)} as numpy arrays; see process_data.extract_values
+        dict_of_variables = {'production_variables': self.production_variables,
+                             'inventory_variables': self.inventory_variables}
+        if self.setup_variables is not None:
+            dict_of_variables['setup_variables'] = self.setup_variables
+
+        return extract_values(dict_of_variables, module='native')
+
+    def get_duals(self):
+        # The greedy engine has no dual values
+        return None
+
+    def get_output(self):
+        return create_output_df_dict(self.get_values())
+
+    @timed('create_output')
+    def create_output(self):
+        write_output(self.get_output())
@@ -1,10 +1,15 @@
 import logging
 
+import numpy as np
+import pandas as pd
 import pulp
 
-from helper import write_to_csv
+from helper import write_output
+from metrics import phase, timed
+from model_ir import build_ir, get_highs_arrays, get_rows, update_ir
 from parameters import model_params
-from process_data import write_outputs
+from process_data import create_output_df_dict, extract_values, get_data_changes, has_setup_costs
+from registry import Registry
 
 __author__ = 'Ehsan Khodabandeh'
 __version__ = '1.1'
@@ -21,16 +26,71 @@ def add_constr(model, constraint):
     return constraint
 
 
+def get_solver(s_name, warm_start=False):
+    """
+    The pulp solver of s_name ('cbc', 'gurobi', 'cplex', 'glpk' or 'xpress') with the options in model_params.
+    Default solver is 'cbc' unless solver is set to something else.
+    You may need to provide a path for any of the solvers using 'path' argument.
+    With warm_start, the MIP starts from the initial values of the variables (cbc, cplex and xpress).
+    """
+    _solver = None
+    w_log = model_params['write_log']
+    disp_log = model_params['display_log']
+    mip_gap = model_params['mip_gap']
+    tl = model_params['time_limit']
+
+    if not s_name or s_name == 'cbc':
+        _solver = pulp.PULP_CBC_CMD(keepFiles=w_log, msg=disp_log, gapRel=mip_gap, timeLimit=tl,
+                                   warmStart=warm_start)
+    elif s_name == 'gurobi':
+        # One can use GUROBI_CMD like CPLEX_CMD and pass mip_gap and time_limit as options
+        _solver = pulp.GUROBI(msg=w_log, gapRel=mip_gap, timeLimit=tl)
+    elif s_name == 'cplex':
+        _solver = pulp.CPLEX_CMD(keepFiles=w_log, msg=disp_log, gapRel=mip_gap, timelimit=tl, warmStart=warm_start)
+    elif s_name == 'glpk':
+        # Read more about glpk options: https://en.wikibooks.org/wiki/GLPK/Using_GLPSOL
+        options = []
+        if mip_gap:
+            set_mip_gap = f'--mipgap {mip_gap}'
+            options.append(set_mip_gap)
+        _solver = pulp.GLPK_CMD(keepFiles=w_log, msg=disp_log, options=options, timeLimit=tl)
+    elif s_name == 'xpress':
+        _solver = pulp.XPRESS(keepFiles=w_log, msg=disp_log, gapRel=mip_gap, timeLimit=tl, warmStart=warm_start)
+    return _solver
+
+
 class OptimizationModel(object):
-    def __init__(self, input_data, input_params):
+    @timed('build')
+    def __init__(self, input_data, input_params, ir=None):
         self.input_data = input_data
         self.input_params = input_params
         self.model = pulp.LpProblem(name='prod_planning', sense=pulp.LpMinimize)
-        self._create_decision_variables()
-        self._create_main_constraints()
-        self._set_objective_function()
+        self.status = None
+        self.objective_value = None
+        self.ir = None
+        # The binary setup variables and their constraints, if input_data has setup costs (see has_setup_costs)
+        self.setup_variables = None
+        if ir is not None:
+            # The IR of another model (e.g. multi_product.build_multi_product_ir) is loaded as is (see _load_ir)
+            self.ir = ir
+            self._load_ir(ir)
+        elif not isinstance(input_data, pd.DataFrame):
+            # An iterable of consecutive chunks of input_data (see helper.read_csv_chunks).
+            # The chunks are not kept, so update_data can't be used for such a model.
+            self.input_data = None
+            self._create_model_vectorized(input_data)
+        elif model_params['build_mode'] == 'vectorized':
+            self._create_model_vectorized([input_data])
+        elif model_params['build_mode'] == 'ir':
+            self.ir = build_ir(input_data, input_params)
+            self._create_model_from_ir(self.ir)
+        else:
+            self._create_decision_variables()
+            self._create_main_constraints()
+            self._set_objective_function()
 
     # ================== Decision variables ==================
+    @timed('variables')
     def _create_decision_variables(self):
         self.production_variables = pulp.LpVariable.dicts(name='X', indexs=self.input_data.index,
                                                           lowBound=0, cat=pulp.LpContinuous)
@@ -38,6 +98,9 @@ class OptimizationModel(object):
         self.inventory_variables = pulp.LpVariable.dicts(name='I', indexs=self.input_data.index,
                                                          lowBound=0, cat=pulp.LpContinuous)
 
+        if has_setup_costs(self.input_data):
+            self.setup_variables = pulp.LpVariable.dicts(name='Y', indexs=self.input_data.index, cat=pulp.LpBinary)
+
         # Alternative way of creating the variables:
         # self.production_variables = {
         #     index: pulp.LpVariable(name='X_' + str(row['period']),
@@ -58,32 +121,47 @@ class OptimizationModel(object):
         # the slack variables of certain constraints, you know they already exists in your model
 
         # ================== Inventory balance constraints ==================
-        self.inv_balance_constraints = {
-            period: add_constr(self.model, pulp.LpConstraint(
-                e=self.inventory_variables[period - 1] + self.production_variables[period]
-                  - self.inventory_variables[period],
-                sense=pulp.LpConstraintEQ,
-                name='inv_balance' + str(period),
-                rhs=value.demand))
-            for period, value in self.input_data.iloc[1:].iterrows()}
+        with phase('inventory_balance_constraints'):
+            self.inv_balance_constraints = {
+                period: add_constr(self.model, pulp.LpConstraint(
+                    e=self.inventory_variables[period - 1] + self.production_variables[period]
+                      - self.inventory_variables[period],
+                    sense=pulp.LpConstraintEQ,
+                    name='inv_balance' + str(period),
+                    rhs=value.demand))
+                for period, value in self.input_data.iloc[1:].iterrows()}
 
-        # inv balance for first period
-        self.first_period_inv_balance_constraints = add_constr(self.model, pulp.LpConstraint(
-            e=self.production_variables[0] - self.inventory_variables[0],
-            sense=pulp.LpConstraintEQ,
-            name='inv_balance0',
-            rhs=self.input_data.iloc[0].demand - self.input_params['initial_inventory']))
+            # inv balance for first period
+            self.first_period_inv_balance_constraints = add_constr(self.model, pulp.LpConstraint(
+                e=self.production_variables[0] - self.inventory_variables[0],
+                sense=pulp.LpConstraintEQ,
+                name='inv_balance0',
+                rhs=self.input_data.iloc[0].demand - self.input_params['initial_inventory']))
 
         # ================== Production capacity constraints ==================
-        self.production_capacity_constraints = {
-            index: add_constr(self.model, pulp.LpConstraint(
-                e=value,
-                sense=pulp.LpConstraintLE,
-                name='prod_cap_month_' + str(index),
-                rhs=self.input_data.iloc[index].production_capacity))
-            for index, value in self.production_variables.items()}
+        with phase('production_capacity_constraints'):
+            self.production_capacity_constraints = {
+                index: add_constr(self.model, pulp.LpConstraint(
+                    e=value,
+                    sense=pulp.LpConstraintLE,
+                    name='prod_cap_month_' + str(index),
+                    rhs=self.input_data.iloc[index].production_capacity))
+                for index, value in self.production_variables.items()}
+
+        # ================== Setup constraints ==================
+        # There is production in a period only if there is a setup in it
+        if self.setup_variables is not None:
+            with phase('setup_constraints'):
+                self.setup_constraints = {
+                    index: add_constr(self.model, pulp.LpConstraint(
+                        e=value - self.input_data.iloc[index].production_capacity * self.setup_variables[index],
+                        sense=pulp.LpConstraintLE,
+                        name='setup_' + str(index),
+                        rhs=0))
+                    for index, value in self.production_variables.items()}
 
     # ================== Costs and objective function ==================
+    @timed('objective')
     def _set_objective_function(self):
         # Similar to constraints, saving the costs expressions as attributes
         # can give you the chance to retrieve their values at the end of the optimization
@@ -92,53 +170,325 @@ class OptimizationModel(object):
                                                 for index, row in self.input_data.iterrows())
 
         objective = self.total_holding_cost + self.total_production_cost
+        if self.setup_variables is not None:
+            self.total_setup_cost = pulp.lpSum(row['setup_cost'] * self.setup_variables[index]
+                                               for index, row in self.input_data.iterrows())
+            objective += self.total_setup_cost
         self.model.setObjective(objective)
 
+    # ================== Vectorized construction ==================
+    # The methods below build the same model as the ones above, but they read each
+    # column of input_data once as a numpy array (or a list) and never touch the
+    # DataFrame row by row. The expressions are also created directly from
+    # (variable, coefficient) pairs rather than through the overloaded operators.
+    # For a 12-month plan it makes no difference, but for long horizons
+    # iterrows() and iloc are what dominate the model creation time.
+    # Run `python benchmark.py build` to compare the two on generated instances.
+    # The model is built from consecutive chunks of periods, so input_data can also be
+    # streamed into it (e.g. from helper.read_csv_chunks). A DataFrame is only one chunk.
+    # The variables and constraints are kept in registries rather than dicts, which take
+    # a fraction of the memory for long horizons (see registry.py); the periods should be consecutive.
+    def _create_model_vectorized(self, chunks):
+        self.production_variables, self.inventory_variables = Registry(), Registry()
+        self.inv_balance_constraints, self.production_capacity_constraints = Registry(), Registry()
+        production_cost, setup_cost = [], []
+        last_inventory = None
+        for chunk in chunks:
+            if last_inventory is None and has_setup_costs(chunk):
+                self.setup_variables, self.setup_constraints = Registry(), Registry()
+            self._create_decision_variables_vectorized(chunk)
+            self._create_main_constraints_vectorized(chunk, last_inventory)
+            production_cost += chunk['production_cost'].tolist()
+            if self.setup_variables is not None:
+                setup_cost += chunk['setup_cost'].tolist()
+            last_inventory = self.inventory_variables[chunk.index[-1]]
+        self._set_objective_function_vectorized(production_cost, setup_cost)
+
+    @timed('variables')
+    def _create_decision_variables_vectorized(self, chunk):
+        index = chunk.index.tolist()
+        self.production_variables.extend(index[0], [pulp.LpVariable(name='X_' + str(i), lowBound=0)
+                                                    for i in index])
+        self.inventory_variables.extend(index[0], [pulp.LpVariable(name='I_' + str(i), lowBound=0)
+                                                   for i in index])
+        if self.setup_variables is not None:
+            self.setup_variables.extend(index[0], [pulp.LpVariable(name='Y_' + str(i), cat=pulp.LpBinary)
+                                                   for i in index])
+
+    def _create_main_constraints_vectorized(self, chunk, last_inventory):
+        periods = chunk.index.tolist()
+        production = self.production_variables.get_range(periods[0], periods[-1] + 1)
+        inventory = self.inventory_variables.get_range(periods[0], periods[-1] + 1)
+        rhs = chunk['demand'].to_numpy(dtype=float, copy=True)
+
+        if last_inventory is not None:
+            # the first period of the chunk follows the last period of the previous chunk
+            prev_inventory = [last_inventory] + inventory[:-1]
+        else:
+            # inv balance for first period
+            rhs[0] -= self.input_params['initial_inventory']
+            self.first_period_inv_balance_constraints = add_constr(self.model, pulp.LpConstraint(
+                e=[(production[0], 1), (inventory[0], -1)],
+                sense=pulp.LpConstraintEQ,
+                name='inv_balance0',
+                rhs=rhs[0]))
+            prev_inventory = [None] + inventory[:-1]
+        rhs = rhs.tolist()
+
+        # ================== Inventory balance constraints ==================
+        with phase('inventory_balance_constraints'):
+            first = 0 if last_inventory is not None else 1
+            self.inv_balance_constraints.extend(periods[0] + first, [
+                add_constr(self.model, pulp.LpConstraint(
+                    e=[(prev_inv, 1), (prod, 1), (inv, -1)],
+                    sense=pulp.LpConstraintEQ,
+                    name='inv_balance' + str(period),
+                    rhs=demand))
+                for period, prev_inv, prod, inv, demand in zip(periods[first:], prev_inventory[first:],
+                                                                production[first:], inventory[first:], rhs[first:])])
+
+        # ================== Production capacity constraints ==================
+        with phase('production_capacity_constraints'):
+            capacity = chunk['production_capacity'].tolist()
+            self.production_capacity_constraints.extend(periods[0], [
+                add_constr(self.model, pulp.LpConstraint(
+                    e=[(prod, 1)],
+                    sense=pulp.LpConstraintLE,
+                    name='prod_cap_month_' + str(index),
+                    rhs=cap))
+                for index, prod, cap in zip(periods, production, capacity)])
+
+        # ================== Setup constraints ==================
+        if self.setup_variables is not None:
+            with phase('setup_constraints'):
+                setup = self.setup_variables.get_range(periods[0], periods[-1] + 1)
+                self.setup_constraints.extend(periods[0], [
+                    add_constr(self.model, pulp.LpConstraint(
+                        e=[(prod, 1), (y, -cap)],
+                        sense=pulp.LpConstraintLE,
+                        name='setup_' + str(index),
+                        rhs=0))
+                    for index, prod, y, cap in zip(periods, production, setup, capacity)])
+
+    @timed('objective')
+    def _set_objective_function_vectorized(self, production_cost, setup_cost=()):
+        holding_cost = self.input_params['holding_cost']
+        self.total_holding_cost = pulp.LpAffineExpression(
+            [(inv, holding_cost) for inv in self.inventory_variables.values()])
+        self.total_production_cost = pulp.LpAffineExpression(
+            list(zip(self.production_variables.values(), production_cost)))
+
+        terms = list(self.total_holding_cost.items()) + list(self.total_production_cost.items())
+        if self.setup_variables is not None:
+            self.total_setup_cost = pulp.LpAffineExpression(list(zip(self.setup_variables.values(), setup_cost)))
+            terms += list(self.total_setup_cost.items())
+        self.model.setObjective(pulp.LpAffineExpression(terms))
+
+    # ================== Construction from the model IR ==================
+    # The model is loaded from the arrays of model_ir.build_ir, which are built once from the columns
+    # of input_data and are the same for every module. pulp has no matrix interface, so each variable
+    # and constraint is still a Python object, but each constraint is created from its slice of the
+    # sparse rows rather than through the overloaded operators. The IR is kept (self.ir), so solving
+    # with 'highs' passes it to HiGHS as is, without reading the model back into arrays.
+    def _load_ir(self, ir):
+        # The variables (self.variables, in the order of the columns) and the constraints of each row block
+        # (self.constraints) of any IR; _create_model_from_ir gives them the meaning of the model of input_data
+        with phase('variables'):
+            self.variables = [pulp.LpVariable(name, lowBound=lb, upBound=ub if ub < np.inf else None)
+                              for name, lb, ub in zip(ir['col_names'], ir['col_lower'].tolist(),
+                                                      ir['col_upper'].tolist())]
+            for i in ir['integers'].tolist():
+                self.variables[i].cat = pulp.LpInteger
+
+        senses = {'E': pulp.LpConstraintEQ, 'L': pulp.LpConstraintLE, 'G': pulp.LpConstraintGE}
+        self.constraints = {}
+        for block, rows in ir['row_blocks'].items():
+            with phase(block.replace('inv_balance', 'inventory_balance')):
+                indptr, indices, values, row_senses, rhs = get_rows(ir, rows)
+                terms = list(zip(map(self.variables.__getitem__, indices.tolist()), values.tolist()))
+                indptr = indptr.tolist()
+                self.constraints[block] = [
+                    add_constr(self.model, pulp.LpConstraint(
+                        e=terms[begin:end],
+                        sense=senses[sense],
+                        name=name,
+                        rhs=b))
+                    for begin, end, sense, name, b in zip(indptr[:-1], indptr[1:], row_senses.tolist(),
+                                                          ir['row_names'][rows], rhs.tolist())]
+
+        with phase('objective'):
+            self.model.setObjective(pulp.LpAffineExpression(list(zip(self.variables, ir['col_cost'].tolist()))))
+
+    def _create_model_from_ir(self, ir):
+        start = int(ir['periods'][0])
+        n = len(ir['periods'])
+        self._load_ir(ir)
+        variables, constraints = self.variables, self.constraints
+        self.production_variables = Registry(start, variables[ir['col_blocks']['production_variables']])
+        self.inventory_variables = Registry(start, variables[ir['col_blocks']['inventory_variables']])
+        if 'setup_variables' in ir['col_blocks']:
+            self.setup_variables = Registry(start, variables[ir['col_blocks']['setup_variables']])
+
+        self.first_period_inv_balance_constraints = constraints['inv_balance_constraints'][0]
+        self.inv_balance_constraints = Registry(start + 1, constraints['inv_balance_constraints'][1:])
+        self.production_capacity_constraints = Registry(start, constraints['production_capacity_constraints'])
+        if self.setup_variables is not None:
+            self.setup_constraints = Registry(start, constraints['setup_constraints'])
+
+        # The objective is already set by the costs of the columns
+        cost = ir['col_cost'].tolist()
+        self.total_holding_cost = pulp.LpAffineExpression(list(zip(self.inventory_variables.values(), cost[n:2 * n])))
+        self.total_production_cost = pulp.LpAffineExpression(list(zip(self.production_variables.values(), cost[:n])))
+        if self.setup_variables is not None:
+            self.total_setup_cost = pulp.LpAffineExpression(list(zip(self.setup_variables.values(), cost[2 * n:])))
+
     # ================== Optimization ==================
+    @timed('optimize')
     def optimize(self):
         """
-        Default solver is 'cbc' unless solver is set to something else.
-        You may need to provide a path for any of the solvers using 'path' argument.
+        The model is solved by the solver in model_params (see get_solver), in memory by HiGHS
+        for 'highs' or by several solvers at once for 'race'. With setup costs and warm_start,
+        the MIP starts from the plan of lot_sizing.get_mip_start (except for 'race' and 'glpk').
         """
-        _solver = None
         s_name = model_params['solver']
-        w_log = model_params['write_log']
-        disp_log = model_params['display_log']
-        mip_gap = model_params['mip_gap']
-        tl = model_params['time_limit']
+        warm_start = self.setup_variables is not None and model_params['warm_start'] and self._set_mip_start()
 
         if model_params['write_lp']:
             logger.info('Writing the lp file!')
-            self.model.writeLP(self.model.name + '.lp')
-
-        if not s_name or s_name == 'cbc':
-            _solver = pulp.PULP_CBC_CMD(keepFiles=w_log, msg=disp_log, gapRel=mip_gap, timeLimit=tl)
-        elif s_name == 'gurobi':
-            # One can use GUROBI_CMD like CPLEX_CMD and pass mip_gap and time_limit as options
-            _solver = pulp.GUROBI(msg=w_log, gapRel=mip_gap, timeLimit=tl)
-        elif s_name == 'cplex':
-            _solver = pulp.CPLEX_CMD(keepFiles=w_log, msg=disp_log, gapRel=mip_gap, timelimit=tl)
-        elif s_name == 'glpk':
-            # Read more about glpk options: https://en.wikibooks.org/wiki/GLPK/Using_GLPSOL
-            options = []
-            if mip_gap:
-                set_mip_gap = f'--mipgap {mip_gap}'
-                options.append(set_mip_gap)
-            _solver = pulp.GLPK_CMD(keepFiles=w_log, msg=disp_log, options=options, timeLimit=tl)
-        elif s_name == 'xpress':
-            _solver = pulp.XPRESS(keepFiles=w_log, msg=disp_log, gapRel=mip_gap, timeLimit=tl)
+            with phase('lp_write'):
+                self.model.writeLP(self.model.name + '.lp')
 
         logger.info('Optimization starts!')
-        self.model.solve(solver=_solver)
+        with phase('solve'):
+            if s_name == 'highs':
+                # Solved in this process from the arrays of the model; no file is written or read
+                from highs_solver import solve_highs
+                arrays = None
+                if self.ir is not None:
+                    arrays = get_highs_arrays(self.ir, self.variables,
+                                              [constr for block in self.constraints.values() for constr in block])
+                solve_highs(self.model, msg=model_params['display_log'], mip_gap=model_params['mip_gap'],
+                            time_limit=model_params['time_limit'], arrays=arrays, warm_start=warm_start)
+            elif s_name == 'race':
+                # Several solvers at once, and the first one to finish wins (see solver_race.py)
+                from solver_race import race
+                race(self.model)
+            else:
+                self.model.solve(solver=get_solver(s_name, warm_start=warm_start))
 
+        self.status = pulp.LpStatus[self.model.status]
         if self.model.status == pulp.LpStatusOptimal:
+            self.objective_value = self.model.objective.value()
             logger.info(f'The solution is optimal and the objective value '
-                        f'is ${self.model.objective.value():,.2f}')
+                        f'is ${self.objective_value:,.2f}')
+        else:
+            self.objective_value = None
+            logger.warning(f'The solution is not optimal; the status is {self.status}!')
+
+    def _set_mip_start(self):
+        # Sets the initial values of the variables to the plan of get_mip_start; False if there is none
+        from lot_sizing import get_mip_start
+
+        if self.input_data is None:
+            return False
+        with phase('mip_start'):
+            mip_start = get_mip_start(self.input_data, self.input_params)
+            if mip_start is None:
+                return False
+            for name, values in mip_start.items():
+                for var, value in zip(getattr(self, name).values(), values.tolist()):
+                    var.setInitialValue(value)
+        return True
+
+    # ================== Data updates ==================
+    def update_data(self, new_input_data):
+        """
+        Changes the demand, production capacity and production cost of the model to those of
+        'new_input_data' and solves it again. Only the right-hand sides and objective coefficients
+        that have changed are modified, so the variables and constraints aren't built again.
+        The periods of 'new_input_data' should be the same as the current ones.
+        Note that the pulp solvers (cbc, glpk, ...) start from scratch, as they are called
+        through files. Still, we save the model creation time.
+        """
+        changes = get_data_changes(self.input_data, new_input_data)
+        index = new_input_data.index
+
+        for pos in changes['demand']:
+            if pos == 0:
+                self.first_period_inv_balance_constraints.changeRHS(
+                    new_input_data['demand'].iat[0] - self.input_params['initial_inventory'])
+            else:
+                self.inv_balance_constraints[index[pos]].changeRHS(new_input_data['demand'].iat[pos])
+
+        for pos in changes['production_capacity']:
+            self.production_capacity_constraints[index[pos]].changeRHS(
+                new_input_data['production_capacity'].iat[pos])
+
+        for pos in changes['production_cost']:
+            var = self.production_variables[index[pos]]
+            self.total_production_cost[var] = self.model.objective[var] = new_input_data['production_cost'].iat[pos]
+
+        if self.setup_variables is not None:
+            for pos in changes['production_capacity']:
+                self.setup_constraints[index[pos]][self.setup_variables[index[pos]]] = \
+                    -new_input_data['production_capacity'].iat[pos]
+            for pos in changes['setup_cost']:
+                var = self.setup_variables[index[pos]]
+                self.total_setup_cost[var] = self.model.objective[var] = new_input_data['setup_cost'].iat[pos]
+
+        logger.info('Model is updated with {} demand, {} capacity and {} cost changes!'.format(
+            *(len(pos) for pos in changes.values())))
+        self.input_data = new_input_data
+        if self.ir is not None:
+            update_ir(self.ir, self.input_data, self.input_params)
+        self.optimize()
+
+    def update_params(self, new_input_params):
+        """
+        Changes the holding_cost and initial_inventory of the model to those of 'new_input_params'
+        and solves it again, like update_data: only the objective coefficients of the inventory
+        variables and the right-hand side of the first inventory balance constraint are modified.
+        """
+        holding_cost = new_input_params['holding_cost']
+        if holding_cost != self.input_params['holding_cost']:
+            for var in self.inventory_variables.values():
+                self.total_holding_cost[var] = self.model.objective[var] = holding_cost
+        if new_input_params['initial_inventory'] != self.input_params['initial_inventory']:
+            self.first_period_inv_balance_constraints.changeRHS(
+                self.input_data['demand'].iat[0] - new_input_params['initial_inventory'])
+        self.input_params = new_input_params
+        if self.ir is not None:
+            update_ir(self.ir, self.input_data, self.input_params)
+        self.optimize()
 
     # ================== Output ==================
-    def create_output(self):
+    def get_values(self):
+        # {name: (periods, values)} as numpy arrays; see process_data.extract_values
         dict_of_variables = {'production_variables': self.production_variables,
                              'inventory_variables': self.inventory_variables}
+        if self.setup_variables is not None:
+            dict_of_variables['setup_variables'] = self.setup_variables
+
+        return extract_values(dict_of_variables)
 
-        output_df = write_outputs(dict_of_variables)
-        write_to_csv(output_df)
+    def get_duals(self):
+        """
+        The dual values of the inventory balance constraints (by position, the first period first) and
+        the production capacity constraints as numpy arrays, or None if the solver didn't give them
+        (e.g. glpk, or any solver for a MIP, such as the model with setup costs).
+        """
+        if self.setup_variables is not None:
+            return None
+        inv_balance = [self.first_period_inv_balance_constraints] + list(self.inv_balance_constraints.values())
+        duals = {'inv_balance': [constr.pi for constr in inv_balance],
+                 'production_capacity': [constr.pi for constr in self.production_capacity_constraints.values()]}
+        if any(pi is None for values in duals.values() for pi in values):
+            return None
+        return {name: np.array(values, dtype=float) for name, values in duals.items()}
+
+    def get_output(self):
+        return create_output_df_dict(self.get_values())
+
+    @timed('create_output')
+    def create_output(self):
+        write_output(self.get_output())
@@ -1,10 +1,14 @@
 import logging
 
+import numpy as np
 import xpress as xp
 
-from helper import write_to_csv
+from helper import write_output
+from metrics import phase, timed
+from model_ir import build_ir, get_csc
 from parameters import model_params
-from process_data import write_outputs_xpress
+from process_data import create_output_df_dict, extract_values, get_data_changes, has_setup_costs
+from registry import Registry
 
 __author__ = 'Ehsan Khodabandeh'
 __version__ = '1.0'
@@ -12,17 +16,34 @@ __version__ = '1.0'
 
 logger = logging.getLogger(__name__ + ': ')
 
+# xpress LP status codes in the same terms as pulp.LpStatus
+STATUS = {1: 'Optimal', 2: 'Infeasible', 5: 'Unbounded'}
+# and the MIP ones, e.g. for the model with setup costs
+MIP_STATUS = {6: 'Optimal', 5: 'Infeasible', 7: 'Unbounded'}
+
 
 class OptimizationModel:
-    def __init__(self, input_data, input_params):
+    @timed('build')
+    def __init__(self, input_data, input_params, ir=None):
         self.input_data = input_data
         self.input_params = input_params
         self.model = xp.problem('prod_planning')
-        self._create_decision_variables()
-        self._create_main_constraints()
-        self._set_objective_function()
+        self.status = None
+        self.objective_value = None
+        # The binary setup variables and their constraints, if input_data has setup costs (see has_setup_costs)
+        self.setup_variables = None
+        if ir is not None:
+            # The IR of another model (e.g. multi_product.build_multi_product_ir) is loaded as is (see _load_ir)
+            self._load_ir(ir)
+        elif model_params['build_mode'] == 'ir':
+            self._create_model_from_ir(build_ir(input_data, input_params))
+        else:
+            self._create_decision_variables()
+            self._create_main_constraints()
+            self._set_objective_function()
 
     # ================== Decision variables ==================
+    @timed('variables')
     def _create_decision_variables(self):
         self.production_variables = xp.vars(self.input_data.index, name='X', vartype=xp.continuous)
         self.inventory_variables = xp.vars(self.input_data.index, name='I', vartype=xp.continuous)
@@ -33,6 +54,9 @@ class OptimizationModel:
         # self.inventory_variables = {index: xp.var(name=f'I{row["period"]}', vartype=xp.continuous)
         #                             for index, row in self.input_data.iterrows()}
         self.model.addVariable(self.production_variables, self.inventory_variables)
+        if has_setup_costs(self.input_data):
+            self.setup_variables = xp.vars(self.input_data.index, name='Y', vartype=xp.binary)
+            self.model.addVariable(self.setup_variables)
 
     # ================== Constraints ==================
     def _create_main_constraints(self):
@@ -43,33 +67,52 @@ class OptimizationModel:
         # the slack variables of certain constraints, you know they already exists in your model
 
         # ================== Inventory balance constraints ==================
-        self.inv_balance_constraints = self.model.addConstraint(
-            xp.constraint(
-                body=self.inventory_variables[period - 1] + self.production_variables[period] -
-                     self.inventory_variables[period],
-                sense=xp.eq,
-                name='inv_balance' + str(period),
-                rhs=value.demand)
-            for period, value in self.input_data.iloc[1:].iterrows())
+        # addConstraint doesn't return the constraints, so they are kept for update_data and get_duals
+        with phase('inventory_balance_constraints'):
+            self.inv_balance_constraints = {
+                period: xp.constraint(
+                    body=self.inventory_variables[period - 1] + self.production_variables[period] -
+                         self.inventory_variables[period],
+                    sense=xp.eq,
+                    name='inv_balance' + str(period),
+                    rhs=value.demand)
+                for period, value in self.input_data.iloc[1:].iterrows()}
+            self.model.addConstraint(list(self.inv_balance_constraints.values()))
 
-        # inv balance for first period
-        self.first_period_inv_balance_constraints = self.model.addConstraint(
-            xp.constraint(
+            # inv balance for first period
+            self.first_period_inv_balance_constraints = xp.constraint(
                 body=self.production_variables[0] - self.inventory_variables[0],
                 sense=xp.eq,
                 name='inv_balance0',
-                rhs=self.input_data.iloc[0].demand - self.input_params['initial_inventory']))
+                rhs=self.input_data.iloc[0].demand - self.input_params['initial_inventory'])
+            self.model.addConstraint(self.first_period_inv_balance_constraints)
 
         # ================== Production capacity constraints ==================
-        self.production_capacity_constraints = self.model.addConstraint(
-            xp.constraint(
-                body=value,
-                sense=xp.leq,
-                name='prod_cap_month_' + str(index),
-                rhs=self.input_data.iloc[index].production_capacity)
-            for index, value in self.production_variables.items())
+        with phase('production_capacity_constraints'):
+            self.production_capacity_constraints = {
+                index: xp.constraint(
+                    body=value,
+                    sense=xp.leq,
+                    name='prod_cap_month_' + str(index),
+                    rhs=self.input_data.iloc[index].production_capacity)
+                for index, value in self.production_variables.items()}
+            self.model.addConstraint(list(self.production_capacity_constraints.values()))
+
+        # ================== Setup constraints ==================
+        # There is production in a period only if there is a setup in it
+        if self.setup_variables is not None:
+            with phase('setup_constraints'):
+                self.setup_constraints = {
+                    index: xp.constraint(
+                        body=value - self.input_data.iloc[index].production_capacity * self.setup_variables[index],
+                        sense=xp.leq,
+                        name='setup_' + str(index),
+                        rhs=0)
+                    for index, value in self.production_variables.items()}
+                self.model.addConstraint(list(self.setup_constraints.values()))
 
     # ================== Costs and objective function ==================
+    @timed('objective')
     def _set_objective_function(self):
         # Similar to constraints, saving the costs expressions as attributes
         # can give you the chance to retrieve their values at the end of the optimization
@@ -78,9 +121,57 @@ class OptimizationModel:
                                             for index, row in self.input_data.iterrows())
 
         objective = self.total_holding_cost + self.total_production_cost
+        if self.setup_variables is not None:
+            self.total_setup_cost = xp.Sum(row['setup_cost'] * self.setup_variables[index]
+                                           for index, row in self.input_data.iterrows())
+            objective += self.total_setup_cost
         self.model.setObjective(objective, sense=xp.minimize)
 
+    # ================== Construction from the model IR ==================
+    # The whole model is loaded from the arrays of model_ir.build_ir with one loadproblem call,
+    # which takes the coefficients column by column. The rows keep the names of the methods above.
+    def _load_ir(self, ir):
+        # The variables (self.variables, in the order of the columns) and the constraints of each row block
+        # (self.constraints) of any IR; _create_model_from_ir gives them the meaning of the model of input_data
+        with phase('loadproblem'):
+            col_start, row_indices, values = get_csc(ir)
+            upper = np.where(np.isinf(ir['col_upper']), xp.infinity, ir['col_upper'])
+            # The integer columns (the setup variables) are binaries
+            self.model.loadproblem(self.model.name(), ir['row_senses'].tolist(), ir['rhs'], None, ir['col_cost'],
+                                   col_start, None, row_indices, values, ir['col_lower'], upper,
+                                   coltype=['B'] * len(ir['integers']), entind=ir['integers'],
+                                   colnames=list(ir['col_names']), rownames=list(ir['row_names']))
+        self.variables = self.model.getVariable()
+        constraints = self.model.getConstraint()
+        self.constraints = {block: constraints[rows] for block, rows in ir['row_blocks'].items()}
+
+    def _create_model_from_ir(self, ir):
+        start = int(ir['periods'][0])
+        n = len(ir['periods'])
+        self._load_ir(ir)
+        variables, constraints = self.variables, self.constraints
+        self.production_variables = Registry(start, variables[ir['col_blocks']['production_variables']])
+        self.inventory_variables = Registry(start, variables[ir['col_blocks']['inventory_variables']])
+        if 'setup_variables' in ir['col_blocks']:
+            self.setup_variables = Registry(start, variables[ir['col_blocks']['setup_variables']])
+
+        self.first_period_inv_balance_constraints = constraints['inv_balance_constraints'][0]
+        self.inv_balance_constraints = Registry(start + 1, constraints['inv_balance_constraints'][1:])
+        self.production_capacity_constraints = Registry(start, constraints['production_capacity_constraints'])
+        if self.setup_variables is not None:
+            self.setup_constraints = Registry(start, constraints['setup_constraints'])
+
+        # The objective is already set by the costs of the columns
+        self.total_holding_cost = xp.Sum(cost * var for cost, var in zip(ir['col_cost'][n:2 * n].tolist(),
+                                                                       self.inventory_variables.values()))
+        self.total_production_cost = xp.Sum(cost * var for cost, var in zip(ir['col_cost'][:n].tolist(),
+                                                                          self.production_variables.values()))
+        if self.setup_variables is not None:
+            self.total_setup_cost = xp.Sum(cost * var for cost, var in zip(ir['col_cost'][2 * n:].tolist(),
+                                                                         self.setup_variables.values()))
+
     # ================== Optimization ==================
+    @timed('optimize')
     def optimize(self):
         """
         XPRESS has a community license that comes with your python installation.
@@ -88,7 +179,8 @@ class OptimizationModel:
         """
         if model_params['write_lp']:
             logger.info('Writing the lp file!')
-            self.model.write(self.model.name(), 'lp')
+            with phase('lp_write'):
+                self.model.write(self.model.name(), 'lp')
 
         # In xpress, parameters to control the model are added by setControl(ctrl, value)
         # or setControl ({ctrl1: value1, ctrl2: value2, ..., ctrlk: valuek}).
@@ -99,19 +191,128 @@ class OptimizationModel:
             self.model.setControl('maxtime', model_params['time_limit'])
         if model_params['display_log']:  # {0: no message, 1: all, 3: error and warning, 4: error only}
             self.model.setControl('outputlog', 0)
+        if self.setup_variables is not None and model_params['warm_start']:
+            self._set_mip_start()
 
-        self.model.solve()
+        with phase('solve'):
+            self.model.solve()
         # xpress's status (currently on version 8.11) is not as user-friendly as other packages.
         # The status is different depending on the problem type.
         # For LP: {1: optimal, 2: infeasible, 5: unbounded}
         # For MIP: {5: infeasible, 6: optimal, 7: unbounded}
-        if self.model.getProbStatus() == 1:  # because this is an LP problem
+        status = MIP_STATUS if self.setup_variables is not None else STATUS
+        self.status = status.get(self.model.getProbStatus(), 'Not Solved')
+        if self.status == 'Optimal':
+            self.objective_value = self.model.getObjVal()
             logger.info(f'The solution is optimal and the objective value is ${self.model.getObjVal():,.2f}!')
+        else:
+            self.objective_value = None
+            logger.warning(f'The solution is not optimal; the status is {self.status}!')
+
+    def _set_mip_start(self):
+        # The MIP starts from the plan of lot_sizing.get_mip_start, if there is one
+        from lot_sizing import get_mip_start
+
+        with phase('mip_start'):
+            mip_start = get_mip_start(self.input_data, self.input_params)
+            if mip_start is not None:
+                variables = [var for name in mip_start for var in getattr(self, name).values()]
+                self.model.addmipsol(np.concatenate(list(mip_start.values())).tolist(), variables, 'lot_sizing')
+
+    # ================== Data updates ==================
+    def update_data(self, new_input_data):
+        """
+        Changes the demand, production capacity and production cost of the model to those of
+        'new_input_data' and solves it again. Only the right-hand sides and objective coefficients
+        that have changed are modified. XPRESS keeps the last basis of the problem, so the new solve
+        starts from the previous solution. The periods of 'new_input_data' should be the same.
+        The rows are changed by their indices in the problem (see _get_rows).
+        """
+        changes = get_data_changes(self.input_data, new_input_data)
+        index = new_input_data.index
+        demand = new_input_data['demand']
+
+        rows = self._get_rows([self._get_inv_balance_constraint(index[pos]) for pos in changes['demand']])
+        rhs = [demand.iat[pos] - (self.input_params['initial_inventory'] if pos == 0 else 0)
+               for pos in changes['demand']]
+        rows += self._get_rows([self.production_capacity_constraints[index[pos]]
+                                for pos in changes['production_capacity']])
+        rhs += new_input_data['production_capacity'].iloc[changes['production_capacity']].tolist()
+        if rows:
+            self.model.chgrhs(rows, rhs)
+
+        if len(changes['production_cost']):
+            self.model.chgobj([self.production_variables[index[pos]] for pos in changes['production_cost']],
+                              new_input_data['production_cost'].iloc[changes['production_cost']].tolist())
+            self.total_production_cost = xp.Sum(cost * self.production_variables[i] for i, cost
+                                                in new_input_data['production_cost'].items())
+
+        if self.setup_variables is not None:
+            positions = changes['production_capacity']
+            if len(positions):
+                self.model.chgmcoef(self._get_rows([self.setup_constraints[index[pos]] for pos in positions]),
+                                    [self.setup_variables[index[pos]] for pos in positions],
+                                    (-new_input_data['production_capacity'].iloc[positions]).tolist())
+            if len(changes['setup_cost']):
+                self.model.chgobj([self.setup_variables[index[pos]] for pos in changes['setup_cost']],
+                                  new_input_data['setup_cost'].iloc[changes['setup_cost']].tolist())
+                self.total_setup_cost = xp.Sum(cost * self.setup_variables[i] for i, cost
+                                               in new_input_data['setup_cost'].items())
+
+        logger.info('Model is updated with {} demand, {} capacity and {} cost changes!'.format(
+            *(len(pos) for pos in changes.values())))
+        self.input_data = new_input_data
+        self.optimize()
+
+    def update_params(self, new_input_params):
+        """
+        Changes the holding_cost and initial_inventory of the model to those of 'new_input_params'
+        and solves it again, like update_data: only the objective coefficients of the inventory
+        variables and the right-hand side of the first inventory balance constraint are modified.
+        """
+        holding_cost = new_input_params['holding_cost']
+        if holding_cost != self.input_params['holding_cost']:
+            inventory_variables = list(self.inventory_variables.values())
+            self.model.chgobj(inventory_variables, [holding_cost] * len(inventory_variables))
+            self.total_holding_cost = holding_cost * xp.Sum(inventory_variables)
+        if new_input_params['initial_inventory'] != self.input_params['initial_inventory']:
+            self.model.chgrhs(self._get_rows([self.first_period_inv_balance_constraints]),
+                              [self.input_data['demand'].iat[0] - new_input_params['initial_inventory']])
+        self.input_params = new_input_params
+        self.optimize()
+
+    def _get_inv_balance_constraint(self, period):
+        if period == self.input_data.index[0]:
+            return self.first_period_inv_balance_constraints
+        return self.inv_balance_constraints[period]
+
+    def _get_rows(self, constraints):
+        # The indices of the constraints in the problem, which chgrhs, chgmcoef and getDual take
+        return [self.model.getIndex(constraint) for constraint in constraints]
 
     # ================== Output ==================
-    def create_output(self):
+    def get_values(self):
+        # {name: (periods, values)} as numpy arrays; see process_data.extract_values
         dict_of_variables = {'production_variables': self.production_variables,
                              'inventory_variables': self.inventory_variables}
+        if self.setup_variables is not None:
+            dict_of_variables['setup_variables'] = self.setup_variables
+
+        return extract_values(dict_of_variables, module='xpress', model=self.model)
 
-        output_df = write_outputs_xpress(dict_of_variables, self.model)
-        write_to_csv(output_df)
+    def get_duals(self):
+        # Like the pulp module. The rows are found by their indices, as in update_data
+        if self.model.attributes.mipents:
+            return None
+        index = self.input_data.index
+        inv_balance = self._get_rows([self._get_inv_balance_constraint(i) for i in index])
+        production_capacity = self._get_rows([self.production_capacity_constraints[i] for i in index])
+        return {'inv_balance': np.array(self.model.getDual(inv_balance)),
+                'production_capacity': np.array(self.model.getDual(production_capacity))}
+
+    def get_output(self):
+        return create_output_df_dict(self.get_values())
+
+    @timed('create_output')
+    def create_output(self):
+        write_output(self.get_output())
@@ -1,14 +1,34 @@
 # Ensure to have gurobi or cplex license if you intend to use either one
 
 model_params = {
-    'input_type': 'excel',  # 'csv' for csv files, 'excel' for excel sheets
-    'solver': None,  # used for pulp. Default is None for 'cbc'; can also be 'cbc', 'gurobi', 'cplex', 'glpk', 'xpress'
-    'module': None,  # default is None for pulp; can also be 'gurobi', 'cplex', and 'xpress'
+    'input_type': 'excel',  # 'csv' for csv files, 'excel' for excel sheets; also 'parquet', 'feather', 'npz'
+    'solver': None,  # used for pulp. Default is None for 'cbc'; can also be 'cbc', 'gurobi', 'cplex', 'glpk', 'xpress',
+    # and 'highs' to solve in memory with highspy (no files or subprocesses), or 'race' (see solver_race.py)
+    'race_solvers': None,  # the solvers of 'race', e.g. ['cbc', 'highs']. None races all the available ones
+    'race_log': 'output/solver_race.csv',  # the winner of each race is appended here; None to not record them
+    'module': None,  # default is None for pulp; can also be 'gurobi', 'cplex', 'xpress', and 'native' (no LP solver)
+    'build_mode': None,  # default None builds the model row by row; 'vectorized' builds it from numpy arrays (pulp)
+    # 'ir' loads it from one sparse matrix (see model_ir.py) through the bulk interface of each module
+    'chunk_size': None,  # if set, input_data.csv is streamed into the model in chunks of this many rows (pulp)
+    'output_type': 'csv',  # 'csv' (as before); also 'csv.gz', 'csv.zst', 'parquet', 'feather' (need 'pyarrow')
+    'wide_output': False,  # if True, all the outputs are written to one table with one column per variable
+    'metrics_file': None,  # e.g. 'output/metrics.jsonl' to append the time of each phase as json lines,
+    # or 'output/metrics.prom' for the Prometheus text format (see metrics.py)
+    'profile_phases': None,  # e.g. ['build', 'optimize', 'create_output'] to profile these phases (see metrics.py)
+    'profiler': 'cprofile',  # 'cprofile' (.pstats files), 'tracemalloc' (top allocations) or 'both'
+    'profile_dir': 'output',  # where the profiles are written
     'write_lp': True,  # whether to write the model .lp file
+    'presolve': False,  # if True, periods with the same cost are solved as blocks and disaggregated (see presolve.py)
+    'presolve_max_rounds': 5,  # the blocks are split at most this many times before the full model is solved
+    'presolve_compare': False,  # if True, presolve also builds and solves the full model to report the time saved
+    'check_feasibility': True,  # whether to reject an infeasible input before building the model (see process_data)
     'write_log': False,  # whether to keep the output files such as .sol or .mps (or .log for cplex or gurobi)
     'display_log': False,  # displays information from the solver to stdout
     'mip_gap': None,  # default is None to use the solver's default value. Can be any float less than 1.0
     'time_limit': None,  # in seconds
+    'warm_start': True,  # with setup costs, the MIP starts from the plan of lot_sizing.py (if the solver supports it)
+    'cache_dir': None,  # directory to cache the parsed inputs and the solutions, e.g. 'cache'. None disables caching
+    'cache_max_mb': 256,  # the least recently used cache entries are removed beyond this size
     'cplex_cloud': False,  # control whether cplex solve runs locally or on cloud
     # Check here to learn how to get url and api for docloud:
     # https://developer.ibm.com/docloud/documentation/decision-optimization-on-cloud/api-key/
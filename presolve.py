@@ -0,0 +1,240 @@
+import logging
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from helper import write_output
+from metrics import phase, timed
+from parameters import model_params
+from process_data import create_output_df_dict, has_setup_costs
+
+# ====================================
+
+logger = logging.getLogger(__name__ + ': ')
+
+# Relative to the largest demand, below which an inventory or a production is taken as zero
+PRESOLVE_TOL = 1e-7
+
+
+# ================== Aggregation ==================
+# A block is a run of consecutive periods that are solved as one period of the reduced model, with the
+# total demand and capacity of its periods. A run of periods can be a block if their production costs
+# are the same and each of them has the capacity to produce its own demand. A period with no capacity
+# has its production fixed at zero, so its cost doesn't matter and it can join the run it is in if it
+# has no demand either (e.g. a day that the plant is closed).
+#
+# The reduced model doesn't charge the holding cost of the inventory inside the blocks, so its
+# objective value is a lower bound of the one of the full model (it's a relaxation). Its solution is
+# disaggregated just in time (see disaggregate); if that leaves no inventory inside the blocks, its
+# cost is the same as the lower bound and it is optimal. Otherwise, the blocks are split where the
+# inventory is left and the reduced model is solved again.
+def get_block_ends(input_data):
+    # Whether each period is the last period of its block, before any split
+    demand = input_data['demand'].to_numpy(dtype=float)
+    capacity = input_data['production_capacity'].to_numpy(dtype=float)
+    cost = get_block_costs(input_data)
+    eligible = capacity >= demand
+    same_block = eligible[1:] & eligible[:-1] & (cost[1:] == cost[:-1])
+    return np.append(~same_block, True)
+
+
+def get_block_costs(input_data):
+    # The production cost of each period, where that of a period with no capacity is the one before it
+    cost = input_data['production_cost'].astype(float).where(input_data['production_capacity'] > 0)
+    return cost.ffill().bfill().fillna(0.0).to_numpy()
+
+
+def reduce_data(input_data, block_ends):
+    # The input_data of the reduced model, with one period per block
+    starts = np.flatnonzero(np.concatenate(([True], block_ends[:-1])))
+    return pd.DataFrame({
+        'period': np.arange(1, len(starts) + 1),
+        'demand': np.add.reduceat(input_data['demand'].to_numpy(dtype=float), starts),
+        'production_cost': get_block_costs(input_data)[starts],
+        'production_capacity': np.add.reduceat(input_data['production_capacity'].to_numpy(dtype=float), starts)})
+
+
+def disaggregate(input_data, input_params, block_ends, block_production, block_inventory):
+    """
+    The production and inventory of each period from those of the blocks. In each block, the inventory
+    that comes in is used for the first demands, the rest of the demands are produced in their own periods,
+    and what is left over for the next blocks is produced as late as possible with the spare capacity.
+    This is the cheapest way, as the production costs of a block are the same.
+    """
+    demand = input_data['demand'].to_numpy(dtype=float)
+    capacity = input_data['production_capacity'].to_numpy(dtype=float)
+    starts = np.flatnonzero(np.concatenate(([True], block_ends[:-1])))
+    block = np.cumsum(np.concatenate(([0], block_ends[:-1])))
+
+    incoming = np.concatenate(([input_params['initial_inventory']], block_inventory[:-1]))[block]
+    demand_before = np.cumsum(demand) - demand
+    demand_before -= demand_before[starts][block]
+    just_in_time = demand - np.clip(incoming - demand_before, 0, demand)
+
+    extra = np.maximum(block_production - np.add.reduceat(just_in_time, starts), 0)[block]
+    spare = np.maximum(capacity - just_in_time, 0)
+    # The spare capacity of the periods after each period in its block
+    spare_through = np.cumsum(spare)
+    spare_through -= (spare_through - spare)[starts][block]
+    spare_after = np.add.reduceat(spare, starts)[block] - spare_through
+    production = just_in_time + np.clip(extra - spare_after, 0, spare)
+    inventory = input_params['initial_inventory'] + np.cumsum(production - demand)
+    return production, inventory
+
+
+# ================== Presolved model ==================
+class PresolvedModel(object):
+    """
+    Same interface as the OptimizationModel of the other modules, but the model of 'optimization_model'
+    (e.g. helper.get_optimization_model(None)) is built and solved for the blocks of periods (see
+    get_block_ends) rather than for every period, and its solution is disaggregated to the periods.
+    If the solution of the blocks can't be disaggregated without holding inventory inside a block, the
+    blocks are split there and solved again, at most model_params['presolve_max_rounds'] times; after
+    that, the full model is solved. The reduced model has no dual values of the periods, so get_duals
+    returns None. The size of the reduction and the time it took are in 'report'.
+    With setup costs, each period has its own setup, so no periods are merged and the full model is solved.
+
+    Each round builds and solves the reduced model from scratch, so presolve only pays off when most periods
+    are merged (a 'reduction' close to 1) and one or two rounds are enough: long runs of the same cost with
+    loose capacities. With tight capacities or short cost runs, few periods are merged and the blocks are split
+    in several rounds, so it's slower than the full solve. With model_params['presolve_compare'], the full
+    model is also built and solved to report the time saved ('time_saved' is negative if presolve was slower).
+    """
+
+    @timed('build')
+    def __init__(self, input_data, input_params, optimization_model):
+        self.input_data = input_data
+        self.input_params = input_params
+        self.optimization_model = optimization_model
+        self.status = None
+        self.objective_value = None
+        self.report = {}
+        self._values = {}
+
+    # ================== Optimization ==================
+    @timed('optimize')
+    def optimize(self):
+        if has_setup_costs(self.input_data):
+            start = perf_counter()
+            optimizer, build_time, solve_time = self._build_and_solve(self.input_data)
+            self.status, self.objective_value, self._values = optimizer.status, optimizer.objective_value, \
+                optimizer.get_values()
+            n_periods = len(self.input_data)
+            self.report = {'n_periods': n_periods, 'n_blocks': n_periods, 'reduction': 0.0,
+                           'n_no_capacity': int((self.input_data['production_capacity'] <= 0).sum()),
+                           'n_rounds': 0, 'presolve_time': 0.0, 'build_time': build_time, 'solve_time': solve_time,
+                           'total_time': perf_counter() - start, 'full_build_time': build_time,
+                           'full_solve_time': solve_time, 'time_saved': 0.0}
+            logger.info('The model has setup costs, so it is solved without presolve!')
+            return
+
+        start = perf_counter()
+        with phase('presolve'):
+            block_ends = get_block_ends(self.input_data)
+        tol = PRESOLVE_TOL * max(1.0, float(self.input_data['demand'].max()))
+        presolve_time = perf_counter() - start
+        # Of all the models that are built and solved, reduced or full
+        build_time = solve_time = 0.0
+        values = None
+        n_rounds = 0
+        for n_rounds in range(1, model_params['presolve_max_rounds'] + 1):
+            presolve_start = perf_counter()
+            with phase('presolve'):
+                reduced_data = reduce_data(self.input_data, block_ends)
+            presolve_time += perf_counter() - presolve_start
+            self.status, reduced_values, times = self._solve(reduced_data)
+            build_time, solve_time = build_time + times[0], solve_time + times[1]
+            if reduced_values is None:
+                # The reduced model is a relaxation, so if it's infeasible, so is the full model
+                break
+
+            presolve_start = perf_counter()
+            with phase('presolve'):
+                production, inventory = disaggregate(self.input_data, self.input_params, block_ends,
+                                                     reduced_values['production_variables'][1],
+                                                     reduced_values['inventory_variables'][1])
+                held = ~block_ends & (inventory > tol)
+                block_ends = block_ends | held
+            presolve_time += perf_counter() - presolve_start
+            if not held.any():
+                values = production, np.maximum(inventory, 0)
+                break
+        else:
+            logger.info(f'The blocks still hold inventory after {n_rounds} rounds; the full model is solved!')
+            block_ends = np.ones(len(self.input_data), dtype=bool)
+            self.status, full_values, times = self._solve(self.input_data)
+            build_time, solve_time = build_time + times[0], solve_time + times[1]
+            if full_values is not None:
+                values = full_values['production_variables'][1], full_values['inventory_variables'][1]
+
+        periods = self.input_data.index.to_numpy() + 1
+        if values is None:
+            self.objective_value = None
+            periods, values = periods[:0], (np.array([]), np.array([]))
+        else:
+            self.objective_value = float(self.input_data['production_cost'].to_numpy(dtype=float) @ values[0]
+                                         + self.input_params['holding_cost'] * values[1].sum())
+        self._values = {'production_variables': (periods, values[0]), 'inventory_variables': (periods, values[1])}
+
+        n_periods, n_blocks = len(self.input_data), int(block_ends.sum())
+        total_time = perf_counter() - start
+        self.report = {'n_periods': n_periods, 'n_blocks': n_blocks, 'reduction': 1 - n_blocks / n_periods,
+                       # Their production is zero (X_t <= 0); with no demand either, they join the block they are in
+                       'n_no_capacity': int((self.input_data['production_capacity'] <= 0).sum()),
+                       'n_rounds': n_rounds, 'presolve_time': presolve_time, 'build_time': build_time,
+                       'solve_time': solve_time, 'total_time': total_time,
+                       'full_build_time': None, 'full_solve_time': None, 'time_saved': None}
+        message = (f"Presolve reduced {n_periods} periods to {n_blocks} blocks ({self.report['reduction']:.1%}) "
+                   f"in {n_rounds} rounds: presolve {presolve_time:.4f} sec, build {build_time:.4f} sec and "
+                   f"solve {solve_time:.4f} sec")
+        if model_params['presolve_compare']:
+            _, full_build_time, full_solve_time = self._build_and_solve(self.input_data)
+            self.report.update({'full_build_time': full_build_time, 'full_solve_time': full_solve_time,
+                                'time_saved': 1 - total_time / (full_build_time + full_solve_time)})
+            message += (f", against {full_build_time:.4f} and {full_solve_time:.4f} sec of the full model "
+                        f"({self.report['time_saved']:.1%} saved)")
+        logger.info(message + '!')
+
+    def _build_and_solve(self, input_data):
+        # The optimizer of input_data after it's solved, and the time of building and solving it
+        start = perf_counter()
+        optimizer = self.optimization_model(input_data, self.input_params)
+        build_time = perf_counter() - start
+        start = perf_counter()
+        optimizer.optimize()
+        return optimizer, build_time, perf_counter() - start
+
+    def _solve(self, input_data):
+        # The status of the model of input_data, its values (see get_values), which are None if it's not optimal,
+        # and the time of building and solving it
+        optimizer, build_time, solve_time = self._build_and_solve(input_data)
+        values = optimizer.get_values() if optimizer.status == 'Optimal' else None
+        return optimizer.status, values, (build_time, solve_time)
+
+    # ================== Data updates ==================
+    def update_data(self, new_input_data):
+        # The blocks depend on the data, so the reduced model is built again
+        if not self.input_data.index.equals(new_input_data.index):
+            raise ValueError('The new input_data should have the same periods as the current one!')
+        self.input_data = new_input_data
+        self.optimize()
+
+    def update_params(self, new_input_params):
+        self.input_params = new_input_params
+        self.optimize()
+
+    # ================== Output ==================
+    def get_values(self):
+        # {name: (periods, values)} as numpy arrays for every period, like process_data.extract_values
+        return self._values
+
+    def get_duals(self):
+        return None
+
+    def get_output(self):
+        return create_output_df_dict(self.get_values())
+
+    @timed('create_output')
+    def create_output(self):
+        write_output(self.get_output())
@@ -1,12 +1,26 @@
+import os
+
+import numpy as np
 import pandas as pd
 
-from helper import load_raw_data
+from helper import get_input_files, load_raw_data, read_csv_chunks, read_csv_files
+from metrics import timed
+from registry import Registry
 
 
 def load_data():
     return get_modified_data(load_raw_data())
 
 
+def load_data_chunks(chunk_size):
+    # Like load_data, but input_data.csv is returned as an iterator of chunks (see read_csv_chunks)
+    input_files = {os.path.basename(_file)[:-4]: _file for _file in get_input_files('csv')}
+    input_df_dict = read_csv_files([_file for name, _file in input_files.items() if name != 'input_data'])
+    _, input_param_dict = get_modified_data(input_df_dict)
+    return read_csv_chunks(input_files['input_data'], chunk_size), input_param_dict
+
+
+@timed('preprocess')
 def get_modified_data(input_df_dict):
     # Our "parameters" table is very simple here. So, we can create a new dictionary
     # for our parameters as follows or just modify our df a little in place.
@@ -19,6 +33,79 @@ def get_modified_data(input_df_dict):
     return input_df_dict, input_param_dict
 
 
+# Relative to the cumulative demand, so that a shortfall within the tolerances of the solvers is not reported
+FEASIBILITY_TOL = 1e-6
+
+
+def get_first_shortfall(demand, production_capacity, initial_inventory):
+    """
+    With no shortages allowed, the demand up to a period can only be met by the initial inventory and
+    the production up to that period. So the model is infeasible exactly when the cumulative demand
+    minus the initial inventory exceeds the cumulative production capacity at some period
+    (the capacities are assumed to be non-negative, as in the native module).
+    Returns the position of the first such period and its shortfall, or None if there is none.
+    """
+    cumulative_demand = np.cumsum(np.asarray(demand, dtype=float))
+    shortfall = cumulative_demand - initial_inventory - np.cumsum(np.asarray(production_capacity, dtype=float))
+    violated = shortfall > FEASIBILITY_TOL * np.maximum(1.0, cumulative_demand)
+    if not violated.any():
+        return None
+    position = int(violated.argmax())
+    return position, float(shortfall[position])
+
+
+def get_required_inventory(demand, production_capacity):
+    """
+    The least inventory at the end of each period with which the demand of the later periods can still
+    be met: the largest cumulative shortfall of demand over production capacity from the next period on
+    (see get_first_shortfall), or zero if there is none. E.g. it's the ending inventory that a model
+    solved for the first periods only should keep (see rolling_horizon.py).
+    """
+    net_demand = np.cumsum(np.asarray(demand, dtype=float) - np.asarray(production_capacity, dtype=float))
+    # The largest cumulative net demand of the periods after each period
+    later_max = np.append(np.maximum.accumulate(net_demand[::-1])[::-1][1:], -np.inf)
+    return np.maximum(later_max - net_demand, 0.0)
+
+
+@timed('feasibility_check')
+def check_feasibility(input_data, input_params, demand=None):
+    """
+    Checks whether the model of input_data is feasible without building it (see get_first_shortfall).
+    'demand' replaces the demand column of input_data if given, e.g. for a demand scenario.
+    Returns None if it is, and otherwise the first period whose cumulative demand can't be met
+    (its 'period' column, or its index plus one like the outputs) and the shortfall at that period.
+    """
+    first_shortfall = get_first_shortfall(input_data['demand'].to_numpy() if demand is None else demand,
+                                          input_data['production_capacity'].to_numpy(),
+                                          input_params['initial_inventory'])
+    if first_shortfall is None:
+        return None
+    position, shortfall = first_shortfall
+    period = input_data['period'].iat[position] if 'period' in input_data else input_data.index[position] + 1
+    return {'period': int(period), 'shortfall': shortfall}
+
+
+def has_setup_costs(input_data):
+    # An input_data with a setup_cost column has a fixed cost for each period it produces in, which
+    # makes the model a MIP with a binary setup variable per period (see lot_sizing.py for the non-MIP engines)
+    return 'setup_cost' in input_data.columns
+
+
+def get_data_changes(input_data, new_input_data, columns=None):
+    # Positions (not index labels) of the rows whose value has changed, for each of the columns
+    # (default is demand, production_capacity, production_cost, and setup_cost if there is one).
+    # It's used to patch an existing model rather than building it again.
+    if not input_data.index.equals(new_input_data.index):
+        raise ValueError('The new input_data should have the same periods as the current one!')
+    if has_setup_costs(input_data) != has_setup_costs(new_input_data):
+        raise ValueError('The new input_data should have setup costs if and only if the current one has!')
+    if columns is None:
+        columns = ('demand', 'production_capacity', 'production_cost') \
+                  + (('setup_cost',) if has_setup_costs(input_data) else ())
+    return {col: np.flatnonzero(input_data[col].to_numpy() != new_input_data[col].to_numpy())
+            for col in columns}
+
+
 # To not overkill, I only created one module here for processing the data, either input or output
 def _create_outputs_df(opt_series, cols, name, output_df_dict):
     df = pd.DataFrame(data=opt_series, index=opt_series.index.values).reset_index()
@@ -34,6 +121,7 @@ def write_outputs(dict_of_variables, attr='varValue'):
     In gurobi you get it by 'your_dv.x',
     in pulp by 'your_dv.varValue',
     in cplex by 'your_dv.solution_value'.
+    For large models, extract_values and create_output_df_dict are much faster.
     """
     output_df_dict = {}
     cols = ['period', 'value']
@@ -43,10 +131,73 @@ def write_outputs(dict_of_variables, attr='varValue'):
     return output_df_dict
 
 
+def get_plan_cost(input_data, input_params, output_df_dict):
+    # The objective value of a plan in the shape of write_outputs, e.g. one that is put together from several models
+    production = output_df_dict['production_variables']['value'].to_numpy()
+    inventory = output_df_dict['inventory_variables']['value'].to_numpy()
+    cost = input_data['production_cost'].to_numpy() @ production + input_params['holding_cost'] * inventory.sum()
+    if has_setup_costs(input_data):
+        cost += input_data['setup_cost'].to_numpy()[production > 1e-9].sum()
+    return float(cost)
+
+
 def write_outputs_xpress(dict_of_variables, model):
-    output_df_dict = {}
-    cols = ['period', 'value']
+    return create_output_df_dict(extract_values(dict_of_variables, module='xpress', model=model))
+
+
+@timed('extraction')
+def extract_values(dict_of_variables, module=None, model=None):
+    """
+    Rather than asking for the value of one variable at a time, we get the values of all the
+    variables of a family in one call to the package and keep them in a numpy array:
+    gurobi by model.getAttr('X', variables),
+    cplex by model.solution.get_values(variables),
+    xpress by model.getSolution(variables).
+    pulp keeps the values on the variables themselves, so they are read in one pass.
+    For the 'native' module, the dictionaries (or registries) already hold the values.
+    Returns a dictionary of name: (periods, values), where periods are the keys of the variables plus one.
+    """
+    values_dict = {}
     for name, var in dict_of_variables.items():
-        opt_series = pd.Series({k + 1: model.getSolution(v) for k, v in var.items()})
-        _create_outputs_df(opt_series, cols, name, output_df_dict)
-    return output_df_dict
+        if isinstance(var, Registry):
+            periods, variables = var.periods + 1, var.values()
+        else:
+            periods = np.fromiter(var.keys(), dtype=np.int64, count=len(var)) + 1
+            variables = list(var.values())
+        if module == 'gurobi':
+            values = model.getAttr('X', variables)
+        elif module == 'cplex':
+            values = model.solution.get_values(variables)
+        elif module == 'xpress':
+            values = model.getSolution(variables)
+        elif module == 'native':
+            values = variables
+        else:
+            values = [v.varValue for v in variables]
+        values_dict[name] = periods, np.array(values, dtype=float)
+    return values_dict
+
+
+def create_output_df_dict(values_dict):
+    # The same output as write_outputs from the result of extract_values
+    return {name: pd.DataFrame({'period': periods, 'value': values})
+            for name, (periods, values) in values_dict.items()}
+
+
+def iter_output_chunks(values_dict, chunk_size=1000000, wide_output=False):
+    """
+    The output tables of extract_values as iterators of DataFrames of at most 'chunk_size' rows,
+    to be streamed to disk by helper.write_output_chunks. If 'wide_output' is True, all the
+    variables are in one 'solution' table (the variables should have the same periods).
+    """
+    def _iter_chunks(periods, columns):
+        for start in range(0, len(periods), chunk_size):
+            chunk = {'period': periods[start:start + chunk_size]}
+            chunk.update({col: values[start:start + chunk_size] for col, values in columns.items()})
+            yield pd.DataFrame(chunk)
+
+    if wide_output:
+        periods = next(iter(values_dict.values()))[0]
+        columns = {name.replace('_variables', ''): values for name, (_, values) in values_dict.items()}
+        return {'solution': _iter_chunks(periods, columns)}
+    return {name: _iter_chunks(periods, {'value': values}) for name, (periods, values) in values_dict.items()}
@@ -0,0 +1,86 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+# ====================================
+
+
+class Registry(Mapping):
+    """
+    A read-only dictionary of consecutive integer keys (e.g. the periods of input_data) to the
+    objects of a model, such as its variables or constraints, that takes much less memory than a dict.
+    Rather than a hash table with one entry per key, it keeps the first key and the objects in a list
+    (or any sequence, e.g. a numpy array of values), and finds the object of a key by its offset from the first key.
+
+    Objects can only be added at the end (see extend), so the keys stay consecutive.
+    """
+    __slots__ = ('start', 'objects')
+
+    def __init__(self, start=0, objects=None):
+        self.start = int(start)
+        self.objects = [] if objects is None else objects
+
+    def extend(self, start, objects):
+        # Adds the objects of the keys start, start + 1, ... The first key should follow the last one
+        if not len(self.objects):
+            self.start = int(start)
+        elif start != self.start + len(self.objects):
+            raise ValueError(f'The keys should be consecutive, but {start} comes after '
+                             f'{self.start + len(self.objects) - 1}!')
+        if isinstance(self.objects, list):
+            self.objects.extend(objects)
+        else:
+            self.objects = np.concatenate((self.objects, objects))
+
+    def get_range(self, start, stop):
+        # The objects of the keys start, ..., stop - 1 as a list (or an array), without looking up each key
+        offset = self._offset(start)
+        if stop - start > len(self.objects) - offset:
+            raise KeyError(stop - 1)
+        return self.objects[offset:offset + stop - start]
+
+    def _offset(self, key):
+        offset = key - self.start
+        if not 0 <= offset < len(self.objects) or offset != int(offset):
+            raise KeyError(key)
+        return int(offset)
+
+    def __getitem__(self, key):
+        try:
+            offset = key - self.start
+            if offset >= 0:
+                return self.objects[offset]
+        except (IndexError, TypeError):
+            pass
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self._offset(key)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __iter__(self):
+        return iter(range(self.start, self.start + len(self.objects)))
+
+    # The views of Mapping look up every key; these don't
+    def keys(self):
+        return range(self.start, self.start + len(self.objects))
+
+    def values(self):
+        return self.objects
+
+    def items(self):
+        return zip(self.keys(), self.objects)
+
+    @property
+    def periods(self):
+        # The keys as a numpy array
+        return np.arange(self.start, self.start + len(self.objects))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({len(self)} objects for keys {self.start}..{self.start + len(self) - 1})'
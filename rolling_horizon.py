@@ -0,0 +1,108 @@
+import logging
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from helper import get_optimization_model
+from parameters import model_params
+from process_data import get_plan_cost, get_required_inventory
+
+# ====================================
+
+logger = logging.getLogger(__name__ + ': ')
+
+# The statuses of a window whose plan can be used; the native module's plans with setup costs may be 'Feasible'
+SOLVED_STATUSES = ('Optimal', 'Feasible')
+
+
+def solve_rolling_horizon(input_data, input_params, window_length, overlap=0, module=None):
+    """
+    Solves the model over windows of 'window_length' periods rather than the whole horizon at once.
+    From each window, only the first 'window_length - overlap' periods are kept (frozen), and the
+    next window starts right after them with the frozen ending inventory as its initial_inventory.
+    The last window keeps all of its periods. 'module' is as in model_params (default is model_params['module']).
+    Each window ends with at least the inventory that the demand after it needs (see
+    process_data.get_required_inventory), so a window can't leave too little for the later ones. It's added
+    to the demand of its last period, and then added back to the inventory of that period.
+
+    Returns the stitched plan in the shape of write_outputs and a DataFrame with one row per window.
+    If a window is not solved (see SOLVED_STATUSES), the plan only covers the periods frozen before it.
+    """
+    if not 0 <= overlap < window_length:
+        raise ValueError('overlap should be non-negative and less than window_length!')
+
+    optimization_model = get_optimization_model(model_params['module'] if module is None else module)
+    step = window_length - overlap
+    n_periods = len(input_data)
+    required_inventory = get_required_inventory(input_data['demand'].to_numpy(),
+                                                input_data['production_capacity'].to_numpy())
+    window_params = dict(input_params)
+    frozen = {'production_variables': [], 'inventory_variables': []}
+    windows = []
+
+    start = 0
+    while start < n_periods:
+        # the models expect the index to be 0, 1, ..., so each window is re-indexed
+        window_data = input_data.iloc[start:start + window_length].reset_index(drop=True)
+        n_frozen = len(window_data) if start + window_length >= n_periods else step
+        ending_inventory = required_inventory[start + len(window_data) - 1]
+        if ending_inventory > 0:
+            demand = window_data['demand'].to_numpy(dtype=float, copy=True)
+            demand[-1] += ending_inventory
+            window_data['demand'] = demand
+
+        solve_start = perf_counter()
+        optimizer = optimization_model(window_data, window_params)
+        optimizer.optimize()
+        objective_value = optimizer.objective_value
+        if objective_value is not None:
+            objective_value += window_params['holding_cost'] * ending_inventory
+        windows.append({'window': len(windows), 'first_period': start + 1, 'n_periods': len(window_data),
+                        'n_frozen': n_frozen, 'ending_inventory': ending_inventory, 'status': optimizer.status,
+                        'objective_value': objective_value, 'solve_time': perf_counter() - solve_start})
+        if optimizer.status not in SOLVED_STATUSES:
+            logger.warning(f'Window {len(windows) - 1} starting at period {start + 1} is {optimizer.status}!')
+            break
+
+        output = optimizer.get_output()
+        inventory = output['inventory_variables']['value'].to_numpy(dtype=float, copy=True)
+        inventory[-1] += ending_inventory
+        frozen['production_variables'].append(output['production_variables']['value'].to_numpy()[:n_frozen])
+        frozen['inventory_variables'].append(inventory[:n_frozen])
+        window_params['initial_inventory'] = frozen['inventory_variables'][-1][-1]
+        start += n_frozen
+
+    output_df_dict = {}
+    for name, values in frozen.items():
+        values = np.concatenate(values) if values else np.empty(0)
+        output_df_dict[name] = pd.DataFrame({'period': np.arange(1, len(values) + 1), 'value': values})
+
+    windows = pd.DataFrame(windows).set_index('window')
+    logger.info(f'{len(windows)} windows are solved in {windows["solve_time"].sum():.4f} sec!')
+    return output_df_dict, windows
+
+
+def compare_with_full_solve(input_data, input_params, window_length, overlap=0, module=None):
+    """
+    Solves the whole horizon and the rolling horizon for the same data and returns
+    their objective values, solve times and the optimality loss of the rolling horizon
+    (relative to the full solve).
+    """
+    optimization_model = get_optimization_model(model_params['module'] if module is None else module)
+    start = perf_counter()
+    optimizer = optimization_model(input_data, input_params)
+    optimizer.optimize()
+    full_time = perf_counter() - start
+
+    output_df_dict, windows = solve_rolling_horizon(input_data, input_params, window_length, overlap, module)
+    solved = windows['status'].isin(SOLVED_STATUSES).all()
+    rolling_objective = get_plan_cost(input_data, input_params, output_df_dict) if solved else None
+    loss = None
+    if solved and optimizer.objective_value:
+        loss = (rolling_objective - optimizer.objective_value) / optimizer.objective_value
+
+    return {'n_periods': len(input_data), 'window_length': window_length, 'overlap': overlap,
+            'n_windows': len(windows), 'full_objective': optimizer.objective_value,
+            'rolling_objective': rolling_objective, 'optimality_loss': loss, 'full_time': full_time,
+            'rolling_time': windows['solve_time'].sum(), 'max_window_time': windows['solve_time'].max()}
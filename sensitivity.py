@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+import argparse
+import logging
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from helper import get_optimization_model
+from parameters import model_params
+
+# ====================================
+
+LOG_FORMAT = '%(asctime)s  %(name)-12s %(levelname)s : %(message)s'
+logger = logging.getLogger(__name__ + ': ')
+
+# 'capacity_scale' multiplies the production capacity of every period
+PARAMETERS = ('holding_cost', 'initial_inventory', 'capacity_scale')
+REL_TOL = 1e-6
+
+
+# ================== Model updates ==================
+def _set_parameter(optimizer, input_data, input_params, parameter, value):
+    # The model is patched and solved again (see update_data and update_params), rather than built again
+    if parameter == 'capacity_scale':
+        new_input_data = input_data.copy()
+        new_input_data['production_capacity'] = input_data['production_capacity'] * value
+        optimizer.update_data(new_input_data)
+    else:
+        optimizer.update_params({**input_params, parameter: value})
+
+
+def _get_slope(optimizer, input_data, parameter):
+    """
+    The derivative of the objective value by the parameter at the current solution (a subgradient at a breakpoint):
+    - holding_cost: the total inventory of the plan, as the plan stays feasible when the holding cost changes,
+    - initial_inventory: minus the dual value of the first inventory balance constraint,
+    - capacity_scale: the sum of the dual values of the capacity constraints times the (unscaled) capacities.
+    None if the model is not solved to optimality or, for the last two, if the dual values are not available.
+    """
+    if optimizer.status != 'Optimal':
+        return None
+    if parameter == 'holding_cost':
+        return float(optimizer.get_values()['inventory_variables'][1].sum())
+    duals = optimizer.get_duals()
+    if duals is None:
+        return None
+    if parameter == 'initial_inventory':
+        return -float(duals['inv_balance'][0])
+    return float(duals['production_capacity'] @ input_data['production_capacity'].to_numpy(dtype=float))
+
+
+def _on_line(point, line_point):
+    # Whether the objective value of 'point' is on the line through 'line_point' with its slope
+    expected = line_point['objective'] + line_point['slope'] * (point['value'] - line_point['value'])
+    return abs(point['objective'] - expected) <= REL_TOL * max(1.0, abs(point['objective']))
+
+
+def _from_line(value, line_point):
+    return {'value': value, 'status': 'Optimal', 'solved': False, 'slope': line_point['slope'],
+            'objective': line_point['objective'] + line_point['slope'] * (value - line_point['value'])}
+
+
+# ================== Sensitivity analysis ==================
+def sensitivity_analysis(input_data, input_params, parameter, values, module=None, max_solves=None):
+    """
+    The objective value of the model for each of 'values' of 'parameter' (see PARAMETERS), and the
+    breakpoints of the objective value, i.e. where the optimal plan (or basis) changes, within their range.
+
+    The model is built once and patched for each solve. The objective value is piecewise linear in each
+    of the parameters (concave in holding_cost, convex in the other two) and its slope at a solution is
+    known from the plan or the dual values (see _get_slope). If the objective values at two solved points
+    are both on the line of one of them, it's linear in between, so the values in between are not solved.
+    Otherwise, the model is solved where the lines of the two points meet: either that's a breakpoint,
+    or the two halves are checked in the same way. Where the slope is not available (e.g. at an infeasible
+    point or with a solver without dual values), the middle value is solved and the two halves are checked.
+    At most 'max_solves' solves are done for the breakpoints (default is twice the number of values).
+
+    Returns a DataFrame of the values with their status, objective value, slope and whether they were
+    solved or found from a line, and a DataFrame of the breakpoints with the slopes on their two sides.
+    """
+    if parameter not in PARAMETERS:
+        raise ValueError(f'parameter should be one of {PARAMETERS}!')
+    values = np.unique(np.asarray(values, dtype=float))
+    max_solves = 2 * len(values) if max_solves is None else max_solves
+    start = perf_counter()
+    optimizer = get_optimization_model(model_params['module'] if module is None else module)(input_data, input_params)
+    n_solves = 0
+
+    def solve(value):
+        nonlocal n_solves
+        n_solves += 1
+        _set_parameter(optimizer, input_data, input_params, parameter, float(value))
+        optimal = optimizer.status == 'Optimal'
+        return {'value': float(value), 'status': optimizer.status, 'solved': True,
+                'objective': optimizer.objective_value if optimal else None,
+                'slope': _get_slope(optimizer, input_data, parameter)}
+
+    points = {values[0]: solve(values[0])}
+    if len(values) > 1:
+        points[values[-1]] = solve(values[-1])
+    breakpoints = []
+    # Intervals between two solved points, with the values in between
+    intervals = [(points[values[0]], points[values[-1]], values[1:-1])] if len(values) > 1 else []
+    while intervals:
+        a, b, between = intervals.pop()
+        if not len(between) and (a['slope'] is None or b['slope'] is None):
+            continue
+        if n_solves >= max_solves:
+            points.update((value, solve(value)) for value in between)
+            continue
+        if a['slope'] is None or b['slope'] is None:
+            # e.g. one of them is infeasible; the middle value is solved and each half is checked on its own
+            middle = between[len(between) // 2]
+            points[middle] = solve(middle)
+            intervals.append((a, points[middle], between[between < middle]))
+            intervals.append((points[middle], b, between[between > middle]))
+            continue
+        if _on_line(b, a) or _on_line(a, b):
+            line_point = a if _on_line(b, a) else b
+            points.update((value, _from_line(value, line_point)) for value in between)
+            continue
+
+        # Where the lines of a and b meet. Their slopes differ, as neither point is on the line of the other
+        x = ((b['objective'] - b['slope'] * b['value']) - (a['objective'] - a['slope'] * a['value'])) \
+            / (a['slope'] - b['slope'])
+        if not a['value'] < x < b['value']:
+            x = (a['value'] + b['value']) / 2
+        point = solve(x)
+        if x in between:
+            points[x] = point
+        if point['slope'] is not None and _on_line(point, a) and _on_line(point, b):
+            breakpoints.append({'value': x, 'objective': point['objective'],
+                                'left_slope': a['slope'], 'right_slope': b['slope']})
+            points.update((value, _from_line(value, a if value < x else b)) for value in between if value != x)
+            continue
+        intervals.append((a, point, between[between < x]))
+        intervals.append((point, b, between[between > x]))
+
+    logger.info(f'{len(values)} values of {parameter} with {n_solves} solves and {len(breakpoints)} breakpoints '
+                f'in {perf_counter() - start:.4f} sec!')
+    sweep_df = pd.DataFrame([points[value] for value in values],
+                            columns=['value', 'status', 'objective', 'slope', 'solved'])
+    breakpoints_df = pd.DataFrame(breakpoints, columns=['value', 'objective', 'left_slope', 'right_slope'])
+    return sweep_df, breakpoints_df.sort_values('value', ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sensitivity of the objective value to a parameter.')
+    parser.add_argument('parameter', choices=PARAMETERS)
+    parser.add_argument('start', type=float)
+    parser.add_argument('stop', type=float)
+    parser.add_argument('--points', type=int, default=21)
+    parser.add_argument('--module', choices=['pulp', 'gurobi', 'cplex', 'xpress', 'native'])
+    args = parser.parse_args(argv)
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+
+    from process_data import load_data
+
+    model_params['write_lp'] = False
+    input_df_dict, input_param_dict = load_data()
+    sweep_df, breakpoints_df = sensitivity_analysis(
+        input_df_dict['input_data'], input_param_dict, args.parameter,
+        np.linspace(args.start, args.stop, args.points), None if args.module == 'pulp' else args.module)
+    logger.info('\n' + sweep_df.to_string())
+    logger.info('Breakpoints:\n' + breakpoints_df.to_string())
+
+
+if __name__ == '__main__':
+    main()
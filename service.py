@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from batch import BATCH_MODEL_PARAMS
+from helper import get_optimization_model
+from parameters import model_params
+from process_data import get_first_shortfall
+
+# ====================================
+
+LOG_FORMAT = '%(asctime)s  %(name)-12s %(levelname)s : %(message)s'
+logger = logging.getLogger(__name__ + ': ')
+
+# A small HTTP service that solves the model for many planners at once, e.g. run it by
+# 'python service.py --port 8080 --workers 4' and then
+#
+#     POST /jobs               {"input_data": {"period": [...], "demand": [...], "production_cost": [...],
+#                                              "production_capacity": [...]},
+#                               "parameters": {"holding_cost": 8, "initial_inventory": 500},
+#                               "module": "pulp", "time_limit": 10}
+#                              queues a job and returns its id (202), or 429 if the queue is full
+#     GET  /jobs/<id>          the status of the job and, once it's done, its result
+#     GET  /jobs/<id>/events   streams the status of the job, one json object per line, until it's finished
+#
+# "input_data" can also be a list of rows, and "module" and "time_limit" are optional.
+# The result has the outputs in the shape of write_outputs as {name: {"period": [...], "value": [...]}}.
+# The models are built and solved on a pool of processes, so the event loop is never blocked.
+
+INPUT_DATA_COLUMNS = ('period', 'demand', 'production_cost', 'production_capacity')
+NUMERIC_COLUMNS = ('demand', 'production_cost', 'production_capacity')
+NUMERIC_PARAMS = ('holding_cost', 'initial_inventory')
+MODULES = (None, 'pulp', 'gurobi', 'cplex', 'xpress', 'native')
+FINISHED = ('done', 'failed')
+
+
+# ================== Worker ==================
+def _solve_job(input_data, input_params, module, params):
+    # Runs in a worker process. Each process solves one job at a time, so model_params can be changed per job
+    model_params.update(params)
+    start = perf_counter()
+    optimizer = get_optimization_model(module)(pd.DataFrame(input_data), input_params)
+    build_time = perf_counter() - start
+
+    start = perf_counter()
+    optimizer.optimize()
+    solve_time = perf_counter() - start
+
+    output = None
+    if optimizer.status == 'Optimal':
+        output = {name: df.to_dict(orient='list') for name, df in optimizer.get_output().items()}
+    return {'status': optimizer.status, 'objective_value': optimizer.objective_value,
+            'build_time': build_time, 'solve_time': solve_time, 'output': output}
+
+
+# ================== Jobs ==================
+class Job(object):
+    def __init__(self, job_id, input_data, input_params, module, time_limit):
+        self.job_id = job_id
+        self.input_data = input_data
+        self.input_params = input_params
+        self.module = module
+        self.time_limit = time_limit
+        self.state = 'queued'
+        self.result = None
+        self.error = None
+        self.changed = asyncio.Event()
+
+    def set_state(self, state):
+        self.state = state
+        # Wakes up everyone who streams the status of the job
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def to_dict(self):
+        job_dict = {'job_id': self.job_id, 'state': self.state, 'time_limit': self.time_limit}
+        if self.result is not None:
+            job_dict['result'] = self.result
+        if self.error is not None:
+            job_dict['error'] = self.error
+        return job_dict
+
+
+def parse_job_request(payload, max_time_limit=None):
+    """
+    Checks a POST /jobs payload and returns input_data (as a dictionary of columns), input_params,
+    module and time_limit. The numeric columns and parameters are converted to floats, so a job that is
+    queued can be built. The time_limit of the job is capped by max_time_limit.
+    Raises ValueError if the payload is not valid.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('The payload should be a json object!')
+    input_data = pd.DataFrame(payload.get('input_data') or {})
+    missing = [col for col in INPUT_DATA_COLUMNS if col not in input_data.columns]
+    if missing:
+        raise ValueError(f'input_data misses the columns {missing}!')
+    input_data = input_data[list(INPUT_DATA_COLUMNS)]
+    for col in NUMERIC_COLUMNS:
+        values = pd.to_numeric(input_data[col], errors='coerce')
+        if not np.isfinite(values.to_numpy(dtype=float)).all():
+            raise ValueError(f'{col} should only have numbers!')
+        input_data = input_data.assign(**{col: values.astype(float)})
+    input_params = payload.get('parameters') or {}
+    if not isinstance(input_params, dict) or not set(NUMERIC_PARAMS) <= set(input_params):
+        raise ValueError('parameters should have holding_cost and initial_inventory!')
+    input_params = dict(input_params)
+    for name in NUMERIC_PARAMS:
+        if isinstance(input_params[name], bool) or not isinstance(input_params[name], (int, float)) \
+                or not np.isfinite(input_params[name]):
+            raise ValueError(f'{name} should be a number, not {input_params[name]!r}!')
+        input_params[name] = float(input_params[name])
+    module = payload.get('module')
+    if module not in MODULES:
+        raise ValueError(f'module should be one of {MODULES}!')
+    # A time_limit of None (e.g. null in the json) is the same as none at all, so it's still capped
+    time_limit = payload.get('time_limit')
+    if time_limit is None:
+        time_limit = max_time_limit
+    if time_limit is not None:
+        if isinstance(time_limit, bool) or not isinstance(time_limit, (int, float)):
+            raise ValueError(f'time_limit should be a number, not {time_limit!r}!')
+        time_limit = float(time_limit)
+        if time_limit <= 0:
+            raise ValueError('time_limit should be positive!')
+        if max_time_limit is not None:
+            time_limit = min(time_limit, max_time_limit)
+    input_data = input_data.to_dict(orient='list')
+    return input_data, input_params, None if module == 'pulp' else module, time_limit
+
+
+class SolveService(object):
+    """
+    Keeps the jobs and runs at most 'max_workers' of them at a time on a process pool.
+    Beyond 'max_queue' jobs that are queued or running, new jobs are refused (admission control).
+    'max_time_limit' (in seconds) caps the time_limit of each job, which is set as model_params['time_limit']
+    in the worker. Only the last 'max_finished' finished jobs are kept.
+    """
+
+    def __init__(self, max_workers=2, max_queue=100, max_time_limit=None, max_finished=1000):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_time_limit = max_time_limit
+        self.max_finished = max_finished
+        self.jobs = OrderedDict()
+        self.n_active = 0
+        self._job_ids = itertools.count(1)
+        self._executor = None
+        self._slots = None
+        self._tasks = set()
+
+    def start(self):
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        # The workers are started now, before any connection is open: a worker forked while handling a request
+        # would keep its socket open, so the client would never see the end of the response
+        self._executor.submit(int).result()
+        self._slots = asyncio.Semaphore(self.max_workers)
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+
+    def submit(self, payload):
+        # Returns the new job, or None if the queue is full
+        input_data, input_params, module, time_limit = parse_job_request(payload, self.max_time_limit)
+        if self.n_active >= self.max_queue:
+            return None
+        job = Job(str(next(self._job_ids)), input_data, input_params, module, time_limit)
+        self.jobs[job.job_id] = job
+        self.n_active += 1
+        # The event loop only keeps a weak reference to its tasks
+        task = asyncio.get_running_loop().create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.info(f'Job {job.job_id} is queued ({len(input_data["period"])} periods)!')
+        return job
+
+    def _reject_infeasible(self, job):
+        # An infeasible job is finished right away, without a worker (see process_data.check_feasibility)
+        first_shortfall = get_first_shortfall(job.input_data['demand'], job.input_data['production_capacity'],
+                                              job.input_params['initial_inventory'])
+        if first_shortfall is None:
+            return False
+        position, shortfall = first_shortfall
+        job.result = {'status': 'Infeasible', 'objective_value': None, 'build_time': 0.0, 'solve_time': 0.0,
+                      'output': None, 'shortfall_period': job.input_data['period'][position], 'shortfall': shortfall}
+        job.set_state('done')
+        logger.info(f'Job {job.job_id} is infeasible at period {job.result["shortfall_period"]}!')
+        return True
+
+    async def _run(self, job):
+        params = {**model_params, **BATCH_MODEL_PARAMS}
+        if job.time_limit is not None:
+            params['time_limit'] = job.time_limit
+        try:
+            if params['check_feasibility'] and self._reject_infeasible(job):
+                return
+            async with self._slots:
+                job.set_state('running')
+                loop = asyncio.get_running_loop()
+                job.result = await loop.run_in_executor(self._executor, _solve_job, job.input_data,
+                                                        job.input_params, job.module, params)
+            job.set_state('done')
+            logger.info(f"Job {job.job_id} is done ({job.result['status']})!")
+        except Exception as e:
+            job.error = repr(e)
+            job.set_state('failed')
+            logger.warning(f'Job {job.job_id} failed: {job.error}')
+        finally:
+            # The input is not needed anymore
+            job.input_data = None
+            self.n_active -= 1
+            self._forget_finished_jobs()
+
+    def _forget_finished_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.state in FINISHED]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self.jobs[job_id]
+
+    async def iter_states(self, job):
+        # Yields the job (as a dictionary) now and after every change, until it's finished
+        while True:
+            changed = job.changed
+            yield job.to_dict()
+            if job.state in FINISHED:
+                return
+            await changed.wait()
+
+
+# ================== HTTP ==================
+REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           429: 'Too Many Requests', 500: 'Internal Server Error'}
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return method, path.split('?', 1)[0].rstrip('/'), body
+
+
+def _response(code, body, headers=()):
+    head = [f'HTTP/1.1 {code} {REASONS[code]}', 'Content-Type: application/json', 'Connection: close', *headers]
+    if body is None:
+        return '\r\n'.join(head + ['Transfer-Encoding: chunked', '', '']).encode()
+    data = json.dumps(body).encode()
+    return '\r\n'.join(head + [f'Content-Length: {len(data)}', '', '']).encode() + data
+
+
+def _chunk(obj):
+    data = (json.dumps(obj) + '\n').encode()
+    return f'{len(data):x}\r\n'.encode() + data + b'\r\n'
+
+
+async def handle_connection(service, reader, writer):
+    try:
+        request = await _read_request(reader)
+        if request is None:
+            return
+        method, path, body = request
+        parts = path.strip('/').split('/')
+
+        if parts == ['jobs']:
+            if method != 'POST':
+                writer.write(_response(405, {'error': 'Use POST to submit a job!'}))
+                return
+            try:
+                job = service.submit(json.loads(body or b'{}'))
+            except ValueError as e:
+                writer.write(_response(400, {'error': str(e)}))
+                return
+            if job is None:
+                writer.write(_response(429, {'error': 'Too many jobs, try again later!'}, ['Retry-After: 1']))
+            else:
+                writer.write(_response(202, job.to_dict(), [f'Location: /jobs/{job.job_id}']))
+
+        elif len(parts) in (2, 3) and parts[0] == 'jobs' and method == 'GET':
+            job = service.jobs.get(parts[1])
+            if job is None:
+                writer.write(_response(404, {'error': f'There is no job {parts[1]}!'}))
+            elif len(parts) == 2:
+                writer.write(_response(200, job.to_dict()))
+            elif parts[2] == 'events':
+                # Chunked transfer encoding, so the client gets each status as soon as it changes
+                writer.write(_response(200, None))
+                async for job_dict in service.iter_states(job):
+                    writer.write(_chunk(job_dict))
+                    await writer.drain()
+                writer.write(b'0\r\n\r\n')
+            else:
+                writer.write(_response(404, {'error': f'Unknown path {path}!'}))
+
+        else:
+            writer.write(_response(404, {'error': f'Unknown path {path}!'}))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    except Exception as e:
+        logger.exception(e)
+        writer.write(_response(500, {'error': repr(e)}))
+    finally:
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def start_server(service, host='127.0.0.1', port=8080):
+    # The server of the started service; port 0 picks a free port (see server.sockets)
+    service.start()
+    return await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port)
+
+
+async def serve(host='127.0.0.1', port=8080, service=None):
+    service = service or SolveService()
+    server = await start_server(service, host, port)
+    logger.info(f"Serving on {', '.join(str(sock.getsockname()) for sock in server.sockets)}!")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serves the production planning model over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=2, help='number of models solved at a time')
+    parser.add_argument('--max-queue', type=int, default=100, help='number of queued and running jobs')
+    parser.add_argument('--max-time-limit', type=float, help='in seconds; caps the time_limit of each job')
+    args = parser.parse_args(argv)
+    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+    service = SolveService(args.workers, args.max_queue, args.max_time_limit)
+    try:
+        asyncio.run(serve(args.host, args.port, service))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
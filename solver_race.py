@@ -0,0 +1,186 @@
+import csv
+import importlib.util
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import signal
+import tempfile
+from time import perf_counter, time
+
+import pulp
+
+from parameters import model_params
+
+# ====================================
+
+logger = logging.getLogger(__name__ + ': ')
+
+# The solvers of a race, if model_params['race_solvers'] is None; the ones that are not available are left out
+RACE_SOLVERS = ('cbc', 'glpk', 'highs', 'gurobi', 'cplex', 'xpress')
+# A race ends as soon as one of the solvers proves one of these. 'Not Solved' (e.g. the time limit is
+# reached) or 'Undefined' results are only used if none of the solvers proves anything
+CONCLUSIVE = (pulp.LpStatusOptimal, pulp.LpStatusInfeasible, pulp.LpStatusUnbounded)
+RACE_LOG_FIELDS = ['timestamp', 'model', 'n_variables', 'n_constraints', 'n_integers', 'winner', 'status',
+                   'objective', 'wall_time', 'solvers', 'finished']
+
+
+def get_available_solvers(names=None):
+    # The solvers of 'names' (default is RACE_SOLVERS) that can be used here, e.g. that are installed and licensed
+    from optimization_model_pulp import get_solver
+
+    available = []
+    for name in RACE_SOLVERS if names is None else names:
+        if name == 'highs':
+            if importlib.util.find_spec('highspy') is not None:
+                available.append(name)
+        elif get_solver(name) is not None and get_solver(name).available():
+            available.append(name)
+    return available
+
+
+# ================== Workers ==================
+def _solve(name, model, params, tmp_dir, results):
+    """
+    Solves a copy of the model with one solver, in a process of its own, and puts the result on 'results'.
+    With the 'fork' start method, 'model' is the copy of the model in this process; otherwise it's
+    the model as a dict (see LpProblem.to_dict), as the model itself can't be pickled efficiently.
+    The values are sent back as lists in the order of the variables and constraints of the original model.
+    The process starts a new session, so its process group includes the solver executable it calls
+    and both can be killed at once. The solver runs in 'tmp_dir', so its files, including the ones pulp keeps
+    in the current directory with write_log, don't clash with the files of the other solvers.
+    """
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    if isinstance(model, dict):
+        # parameters.py is imported again in this process
+        model_params.update(params)
+        variables_by_name, model = pulp.LpProblem.from_dict(model)
+        variables = [variables_by_name[name] for name in params['_variable_names']]
+    else:
+        variables = model.variables()
+    start = perf_counter()
+    if name == 'highs':
+        from highs_solver import solve_highs
+        solve_highs(model, msg=params['display_log'], mip_gap=params['mip_gap'], time_limit=params['time_limit'])
+    else:
+        from optimization_model_pulp import get_solver
+        solver = get_solver(name)
+        solver.tmpDir = tmp_dir
+        os.chdir(tmp_dir)
+        model.solve(solver=solver)
+    results.put((name, model.status, perf_counter() - start, [var.varValue for var in variables],
+                 [var.dj for var in variables], [constr.pi for constr in model.constraints.values()]))
+
+
+def _kill(process):
+    # Kills the worker and the solver it started (see _solve)
+    if process.is_alive():
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            process.kill()
+    process.join()
+
+
+# ================== Race ==================
+def race(model, solvers=None):
+    """
+    Solves the pulp model with several solvers at once (default is model_params['race_solvers'], or all
+    the available ones) and keeps the first result that is proven optimal, infeasible or unbounded.
+    Each solver runs in its own process on a copy of the model. As soon as one of them is done, the
+    others are killed along with the solver executables they started, and the temp directories of all
+    of them are removed. If write_log is True, the winner's temp directory is kept with the files of its
+    solver (see _solve), and its path is logged.
+    Like pulp's own solvers, it sets model.status and the values (and dual values) of the model.
+    The winner is appended to model_params['race_log'] (see _log_race). Returns model.status.
+    """
+    solvers = get_available_solvers(model_params['race_solvers'] if solvers is None else solvers)
+    if not solvers:
+        raise ValueError('None of the solvers of the race is available!')
+    logger.info(f'Racing {", ".join(solvers)}!')
+
+    variables = model.variables()
+    params = dict(model_params)
+    if multiprocessing.get_start_method() == 'fork':
+        # The workers get a copy of the model (and model_params) as they start, without pickling it
+        model_arg = model
+    else:
+        model_arg = model.to_dict()
+        params['_variable_names'] = [var.name for var in variables]
+    results = multiprocessing.Queue()
+    tmp_dirs = {name: tempfile.mkdtemp(prefix=f'race_{name}_') for name in solvers}
+    processes = {name: multiprocessing.Process(target=_solve, daemon=True,
+                                               args=(name, model_arg, params, tmp_dirs[name], results))
+                 for name in solvers}
+    start = perf_counter()
+    finished = {}
+    winner = None
+    try:
+        for process in processes.values():
+            process.start()
+        while len(finished) < len(processes):
+            try:
+                result = results.get(timeout=0.1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes.values()) and results.empty():
+                    break  # e.g. a solver crashed without a result
+                continue
+            finished[result[0]] = result
+            logger.info(f'{result[0]} finished in {result[2]:.4f} sec with {pulp.LpStatus[result[1]]} status!')
+            if result[1] in CONCLUSIVE:
+                winner = result
+                break
+    finally:
+        for process in processes.values():
+            _kill(process)
+        results.close()
+        for name, tmp_dir in tmp_dirs.items():
+            if model_params['write_log'] and winner is not None and name == winner[0]:
+                logger.info(f'The files of {name} are kept in {tmp_dir}!')
+            else:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+    wall_time = perf_counter() - start
+
+    if winner is None:
+        if not finished:
+            raise RuntimeError('None of the solvers of the race returned a result!')
+        # None of them proved anything, e.g. they all reached the time limit; the first one is used
+        winner = next(iter(finished.values()))
+    name, status, _, values, djs, pis = winner
+    for var, value, dj in zip(variables, values, djs):
+        var.varValue = value
+        var.dj = dj
+    for constr, pi in zip(model.constraints.values(), pis):
+        constr.pi = pi
+    model.status = status
+    logger.info(f'{name} won the race in {wall_time:.4f} sec!')
+
+    if model_params['race_log']:
+        _log_race(model, name, wall_time, solvers, finished)
+    return model.status
+
+
+def _log_race(model, winner, wall_time, solvers, finished):
+    """
+    Appends a row to the csv file of model_params['race_log'] with the size of the model and the winner,
+    so the solver that is usually the fastest for a class of models can be chosen later on.
+    'finished' are the solvers that returned a result before the race ended, with their times.
+    """
+    from helper import ensure_directory_exists, get_file_directory
+
+    path = get_file_directory(model_params['race_log'])
+    ensure_directory_exists(os.path.dirname(path))
+    new_file = not os.path.exists(path)
+    objective = model.objective.value() if model.status == pulp.LpStatusOptimal else None
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RACE_LOG_FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerow({'timestamp': time(), 'model': model.name, 'n_variables': model.numVariables(),
+                         'n_constraints': model.numConstraints(),
+                         'n_integers': sum(var.cat == pulp.LpInteger for var in model.variables()),
+                         'winner': winner, 'status': pulp.LpStatus[model.status], 'objective': objective,
+                         'wall_time': wall_time, 'solvers': ';'.join(solvers),
+                         'finished': ';'.join(f'{name}:{result[2]:.4f}' for name, result in finished.items())})
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The modules are at the top of the repo, e.g. 'import helper'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parameters import model_params  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def restore_model_params():
+    # The tests change model_params as execute_oo.py does; they don't write the .lp file
+    saved = dict(model_params)
+    model_params['write_lp'] = False
+    yield
+    model_params.clear()
+    model_params.update(saved)
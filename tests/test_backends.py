@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from generate_data import generate_input_data
+from helper import get_optimization_model
+from parameters import model_params
+from process_data import get_plan_cost
+
+# The modules with a commercial solver, and the package each one needs; their tests are skipped without it.
+# The instances are small enough for the community editions of the solvers
+BACKENDS = {'gurobi': 'gurobipy', 'cplex': 'docplex', 'xpress': 'xpress'}
+PARAMS = {'holding_cost': 8, 'initial_inventory': 500}
+
+
+def solve(module, input_data, input_params=PARAMS):
+    optimizer = get_optimization_model(module)(input_data, input_params)
+    optimizer.optimize()
+    return optimizer
+
+
+def get_input_data(setup_costs, seed=0):
+    input_data = generate_input_data(30, seed=seed, initial_inventory=PARAMS['initial_inventory'])
+    if setup_costs:
+        input_data['setup_cost'] = 20000.0
+    return input_data
+
+
+def get_changed_data(input_data):
+    new_input_data = input_data.copy()
+    new_input_data.loc[3, 'demand'] -= 100
+    new_input_data.loc[5, 'production_capacity'] += 500
+    new_input_data.loc[7, 'production_cost'] -= 5
+    if 'setup_cost' in new_input_data:
+        new_input_data.loc[9, 'setup_cost'] = 1000.0
+    return new_input_data
+
+
+@pytest.fixture(params=list(BACKENDS))
+def module(request):
+    pytest.importorskip(BACKENDS[request.param])
+    model_params['build_mode'] = 'ir'
+    return request.param
+
+
+@pytest.mark.parametrize('setup_costs', [False, True], ids=['lp', 'setup'])
+def test_ir_matches_pulp(module, setup_costs):
+    input_data = get_input_data(setup_costs)
+    optimizer = solve(module, input_data)
+    assert optimizer.status == 'Optimal'
+    assert optimizer.objective_value == pytest.approx(solve(None, input_data).objective_value)
+    output = optimizer.get_output()
+    assert get_plan_cost(input_data, PARAMS, output) == pytest.approx(optimizer.objective_value)
+    if setup_costs:
+        assert set(output['setup_variables']['value'].round(6)) <= {0, 1}
+
+
+@pytest.mark.parametrize('setup_costs', [False, True], ids=['lp', 'setup'])
+def test_ir_update_data_and_params(module, setup_costs):
+    input_data = get_input_data(setup_costs)
+    optimizer = solve(module, input_data)
+    new_input_data = get_changed_data(input_data)
+    optimizer.update_data(new_input_data)
+    assert optimizer.objective_value == pytest.approx(solve(None, new_input_data).objective_value)
+    new_params = {'holding_cost': 9, 'initial_inventory': 800}
+    optimizer.update_params(new_params)
+    assert optimizer.objective_value == pytest.approx(solve(None, new_input_data, new_params).objective_value)
+
+
+def test_ir_duals(module):
+    # By strong duality, the objective value is the dual values times the right-hand sides (the bounds are 0 and inf)
+    input_data = get_input_data(False)
+    optimizer = solve(module, input_data)
+    duals = optimizer.get_duals()
+    rhs = input_data['demand'].to_numpy(dtype=float)
+    rhs[0] -= PARAMS['initial_inventory']
+    assert duals['inv_balance'] @ rhs + duals['production_capacity'] @ input_data['production_capacity'] \
+        == pytest.approx(optimizer.objective_value)
+    assert solve(module, get_input_data(True)).get_duals() is None
+
+
+def test_ir_warm_start(module):
+    input_data = get_input_data(True, seed=1)
+    model_params['warm_start'] = False
+    expected = solve(module, input_data).objective_value
+    model_params['warm_start'] = True
+    assert solve(module, input_data).objective_value == pytest.approx(expected)
+
+
+def test_ir_names(module):
+    # The variables and constraints keep the names of model_ir.build_ir, e.g. in the .lp file
+    input_data = get_input_data(True)
+    optimizer = get_optimization_model(module)(input_data, PARAMS)
+    model = optimizer.model
+    if module == 'gurobi':
+        model.update()
+        names = [var.VarName for var in model.getVars()], [constr.ConstrName for constr in model.getConstrs()]
+    elif module == 'cplex':
+        names = [var.name for var in model.iter_variables()], [ct.name for ct in model.iter_linear_constraints()]
+    else:
+        names = ([var.name for var in model.getVariable()], [constr.name for constr in model.getConstraint()])
+    n = len(input_data)
+    assert names[0] == [f'{prefix}_{i}' for prefix in 'XIY' for i in range(n)]
+    assert names[1] == ([f'inv_balance{i}' for i in range(n)] + [f'prod_cap_month_{i}' for i in range(n)]
+                        + [f'setup_{i}' for i in range(n)])
+
+
+@pytest.mark.parametrize('setup_costs', [False, True], ids=['lp', 'setup'])
+@pytest.mark.parametrize('module', list(BACKENDS))
+def test_update_data_by_rows(module, setup_costs):
+    # The models built constraint by constraint are updated like the ones from the IR
+    pytest.importorskip(BACKENDS[module])
+    input_data = get_input_data(setup_costs)
+    optimizer = solve(module, input_data)
+    new_input_data = get_changed_data(input_data)
+    optimizer.update_data(new_input_data)
+    assert optimizer.objective_value == pytest.approx(solve(None, new_input_data).objective_value)
+    new_params = {'holding_cost': 9, 'initial_inventory': 800}
+    optimizer.update_params(new_params)
+    assert optimizer.objective_value == pytest.approx(solve(None, new_input_data, new_params).objective_value)
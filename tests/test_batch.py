@@ -0,0 +1,39 @@
+import pytest
+
+from batch import RESULT_COLUMNS, solve_scenarios
+from generate_data import generate_input_data
+from helper import get_optimization_model
+
+PARAMS = {'holding_cost': 8, 'initial_inventory': 500}
+
+
+def get_objective_value(input_data):
+    optimizer = get_optimization_model()(input_data, PARAMS)
+    optimizer.optimize()
+    return optimizer.objective_value
+
+
+def test_demand_scenarios_match_single_solves():
+    input_data = generate_input_data(10, seed=0, initial_inventory=PARAMS['initial_inventory'])
+    scenarios = {'low': input_data['demand'] * 0.5, 'base': input_data['demand']}
+    results = solve_scenarios(PARAMS, scenarios, input_data, max_workers=2)
+    assert list(results.index) == ['low', 'base']
+    assert (results['status'] == 'Optimal').all()
+    for scenario_id, demand in scenarios.items():
+        expected = get_objective_value(input_data.assign(demand=demand))
+        assert results.loc[scenario_id, 'objective_value'] == pytest.approx(expected)
+
+
+def test_empty_scenarios():
+    results = solve_scenarios(PARAMS, [])
+    assert results.empty
+    assert list(results.columns) == RESULT_COLUMNS
+
+
+def test_failed_scenario_is_recorded():
+    # A demand vector needs input_data, so its worker raises, but the other scenario is still solved
+    input_data = generate_input_data(10, seed=0, initial_inventory=PARAMS['initial_inventory'])
+    results = solve_scenarios(PARAMS, [input_data, list(input_data['demand'])], max_workers=2)
+    assert list(results['status']) == ['Optimal', 'Error']
+    assert results.loc[0, 'objective_value'] == pytest.approx(get_objective_value(input_data))
+    assert 'input_data is needed' in results.loc[1, 'error']
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+import benchmark
+from parameters import model_params
+
+
+def test_scaling_records_a_failing_module_and_goes_on(monkeypatch, tmp_path):
+    run_phases = benchmark._run_phases
+
+    def _run_phases(module, optimization_model, n_periods, directory):
+        if module == 'native':
+            raise TypeError('not supported')
+        return run_phases(module, optimization_model, n_periods, directory)
+
+    monkeypatch.setattr(benchmark, '_run_phases', _run_phases)
+    report_file = tmp_path / 'report.json'
+    report = benchmark.benchmark_scaling([10, 20], modules=('native', 'pulp'), report_file=str(report_file))
+    rows = [(row['module'], row['n_periods'], row['status']) for row in report['results']]
+    # The longer horizons of the failing module are skipped, and the other modules still run
+    assert rows == [('native', 10, 'Error'), ('pulp', 10, 'Optimal'), ('pulp', 20, 'Optimal')]
+    assert 'not supported' in report['results'][0]['error']
+    assert json.loads(report_file.read_text())['results'] == report['results']
+    assert benchmark.compare_reports(str(report_file), str(report_file)).index.tolist() == [('pulp', 10), ('pulp', 20)]
+
+
+def test_race_restores_race_log(monkeypatch, tmp_path):
+    import solver_race
+
+    def race(model, solvers):
+        raise RuntimeError('no solver')
+
+    monkeypatch.setattr(solver_race, 'race', race)
+    race_log = str(tmp_path / 'race.jsonl')
+    model_params['race_log'] = race_log
+    with pytest.raises(RuntimeError):
+        benchmark.benchmark_race([10], ['cbc'])
+    assert model_params['race_log'] == race_log
+
+    monkeypatch.undo()
+    benchmark.benchmark_race([10], ['cbc'])
+    assert model_params['race_log'] == race_log
+    assert not (tmp_path / 'race.jsonl').exists()
@@ -0,0 +1,68 @@
+import pytest
+
+from generate_data import generate_input_data
+from optimization_model_pulp import OptimizationModel
+from parameters import model_params
+
+PARAMS = {'holding_cost': 8, 'initial_inventory': 500}
+BUILD_MODES = [None, 'vectorized', 'ir']
+
+
+def get_input_data(setup_costs):
+    input_data = generate_input_data(60, seed=0, initial_inventory=PARAMS['initial_inventory'])
+    if setup_costs:
+        input_data['setup_cost'] = 20000.0
+    return input_data
+
+
+def solve(input_data, input_params=PARAMS, build_mode=None):
+    model_params['build_mode'] = build_mode
+    optimizer = OptimizationModel(input_data, input_params)
+    optimizer.optimize()
+    return optimizer
+
+
+@pytest.mark.parametrize('setup_costs', [False, True], ids=['lp', 'setup'])
+@pytest.mark.parametrize('build_mode', BUILD_MODES[1:] + ['chunks'])
+def test_build_modes_have_the_same_objective(build_mode, setup_costs):
+    input_data = get_input_data(setup_costs)
+    expected = solve(input_data)
+    if build_mode == 'chunks':
+        # As helper.read_csv_chunks yields them, with the index continuing from one chunk to the next
+        optimizer = solve((input_data.iloc[start:start + 25] for start in range(0, len(input_data), 25)))
+    else:
+        optimizer = solve(input_data, build_mode=build_mode)
+    assert optimizer.status == 'Optimal'
+    assert optimizer.objective_value == pytest.approx(expected.objective_value)
+    if not setup_costs:
+        # The LP has one optimal plan here; the MIP may have ties
+        output, expected_output = optimizer.get_output(), expected.get_output()
+        for name in expected_output:
+            assert output[name]['value'].to_numpy() == pytest.approx(expected_output[name]['value'].to_numpy(),
+                                                                     abs=1e-6)
+
+
+@pytest.mark.parametrize('setup_costs', [False, True], ids=['lp', 'setup'])
+@pytest.mark.parametrize('build_mode', BUILD_MODES)
+def test_update_data_matches_a_new_model(build_mode, setup_costs):
+    input_data = get_input_data(setup_costs)
+    optimizer = solve(input_data, build_mode=build_mode)
+    new_input_data = input_data.copy()
+    new_input_data.loc[3, 'demand'] += 100
+    new_input_data.loc[5, 'production_capacity'] -= 500
+    new_input_data.loc[7, 'production_cost'] += 5
+    optimizer.update_data(new_input_data)
+    assert optimizer.objective_value == pytest.approx(solve(new_input_data).objective_value)
+
+    new_params = {'holding_cost': 9, 'initial_inventory': 800}
+    optimizer.update_params(new_params)
+    assert optimizer.objective_value == pytest.approx(solve(new_input_data, new_params).objective_value)
+
+
+def test_duals_are_the_same_in_each_build_mode():
+    input_data = get_input_data(False)
+    expected = solve(input_data).get_duals()
+    for build_mode in BUILD_MODES[1:]:
+        duals = solve(input_data, build_mode=build_mode).get_duals()
+        for name in expected:
+            assert duals[name] == pytest.approx(expected[name])
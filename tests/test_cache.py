@@ -0,0 +1,64 @@
+import os
+import pickle
+
+import pytest
+
+from cache import DiskCache
+
+VALUE = b'x' * 10000
+
+
+def get_entry_size():
+    return len(pickle.dumps(VALUE, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def test_hit_and_miss(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    assert cache.get('a') is None
+    cache.set('a', {'value': 1})
+    assert cache.get('a') == {'value': 1}
+    assert DiskCache(str(tmp_path)).get('a') == {'value': 1}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    # Room for three entries
+    cache = DiskCache(str(tmp_path), max_mb=3.5 * get_entry_size() / 1024 ** 2)
+    for i, key in enumerate('abc'):
+        cache.set(key, VALUE)
+        os.utime(cache._path(key), ns=(i * 10 ** 9, i * 10 ** 9))
+    # 'a' is used, so 'b' is now the least recently used one
+    assert cache.get('a') == VALUE
+    cache.set('d', VALUE)
+    assert [key for key in 'abcd' if cache.get(key) is not None] == ['a', 'c', 'd']
+
+
+@pytest.mark.parametrize('content', [b'', b'not a pickle'])
+def test_corrupted_entry_is_a_miss(tmp_path, content):
+    cache = DiskCache(str(tmp_path))
+    cache.set('a', VALUE)
+    with open(cache._path('a'), 'wb') as f:
+        f.write(content)
+    assert cache.get('a') is None
+    cache.set('a', VALUE)
+    assert cache.get('a') == VALUE
+
+
+def test_entry_removed_by_another_run_is_a_miss(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.set('a', VALUE)
+    os.remove(cache._path('a'))
+    assert cache.get('a') is None
+
+
+def test_set_is_atomic(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.set('a', VALUE)
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(cache._path('a')).st_mode & 0o777 == 0o666 & ~umask
+
+    # A value that can't be pickled leaves the previous entry and no temporary file
+    with pytest.raises((pickle.PicklingError, AttributeError)):
+        cache.set('a', lambda: None)
+    assert cache.get('a') == VALUE
+    assert os.listdir(tmp_path) == ['a.pkl']
@@ -0,0 +1,39 @@
+import pytest
+
+import benchmark
+import construction_variants
+from construction_variants import VARIANTS, build_variant, get_variant_names
+from generate_data import generate_input_data
+from optimization_model_pulp import OptimizationModel
+
+PARAMS = {'holding_cost': 8, 'initial_inventory': 500}
+ALL_VARIANTS = [(backend, *names) for backend in VARIANTS for names in get_variant_names(backend)]
+
+
+@pytest.mark.parametrize('backend, variables, constraints', ALL_VARIANTS)
+def test_every_variant_builds(backend, variables, constraints):
+    build_variant(backend, variables, constraints, generate_input_data(20), PARAMS)
+
+
+@pytest.mark.skipif('gurobi' not in VARIANTS, reason='gurobipy is not installed')
+@pytest.mark.parametrize('variables', list(VARIANTS.get('gurobi', {}).get('variables', [])))
+def test_gurobi_variants_solve_like_pulp(variables):
+    input_data = generate_input_data(20)
+    model = build_variant('gurobi', variables, 'addLConstr_dict', input_data, PARAMS)
+    model.setParam('OutputFlag', 0)
+    model.optimize()
+    expected = OptimizationModel(input_data, PARAMS)
+    expected.optimize()
+    assert model.objVal == pytest.approx(expected.objective_value)
+
+
+def test_a_failing_variant_does_not_stop_the_others(monkeypatch):
+    def fail(*args):
+        raise TypeError('not supported')
+
+    constraints = dict(VARIANTS['pulp']['constraints'], version_1=fail)
+    monkeypatch.setitem(construction_variants.VARIANTS, 'pulp', {**VARIANTS['pulp'], 'constraints': constraints})
+    results = benchmark.benchmark_variants([10], backends=['pulp'], repeat=1)
+    failed = results['constraints'] == 'version_1'
+    assert results.loc[failed, 'error'].str.contains('not supported').all()
+    assert results.loc[~failed, 'build_time'].notna().all() and (~failed).any()
@@ -0,0 +1,109 @@
+import gzip
+import os
+import stat
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from generate_data import generate_input_data
+from helper import (INPUT_DATA_DTYPES, load_raw_data, read_csv_chunks, read_csv_files, read_feather_files,
+                    read_npz_files, read_parquet_files, write_output_chunks, write_to_csv)
+from parameters import model_params
+
+INPUT_DATA_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'csv',
+                              'input_data.csv')
+
+
+def test_typed_chunked_read_is_the_same_as_read_csv():
+    chunks = list(read_csv_chunks(INPUT_DATA_CSV, chunk_size=5))
+    assert len(chunks) > 1
+    input_data = pd.concat(chunks)
+    assert input_data.dtypes.to_dict() == INPUT_DATA_DTYPES
+    pdt.assert_frame_equal(input_data, pd.read_csv(INPUT_DATA_CSV), check_dtype=False, check_exact=True)
+
+
+@pytest.mark.parametrize('periods', [[1, 2, 3, 3, 4], [1, 2, 3, 5, 4], [3, 2, 1, 4, 5]])
+def test_unordered_periods_are_rejected(tmp_path, periods):
+    # With chunk_size=2, the repeated or decreasing period is within a chunk or across two of them
+    path = tmp_path / 'input_data.csv'
+    pd.DataFrame({'period': periods, 'demand': 1.0, 'production_cost': 1.0, 'production_capacity': 1.0}).to_csv(
+        path, index=False)
+    with pytest.raises(ValueError, match='Periods should be increasing'):
+        list(read_csv_chunks(str(path), chunk_size=2))
+
+
+@pytest.mark.parametrize('input_type', ['parquet', 'feather', 'npz'])
+def test_data_files_are_the_same_as_the_csv(input_type):
+    if input_type != 'npz':
+        pytest.importorskip('pyarrow')
+    model_params['cache_dir'] = None
+    expected = load_raw_data('csv')
+    input_df_dict = load_raw_data(input_type)
+    assert sorted(input_df_dict) == sorted(expected)
+    for name, df in expected.items():
+        pdt.assert_frame_equal(input_df_dict[name], df, check_dtype=False)
+
+
+# input_type: (extension, writer, reader)
+ROUND_TRIP_TYPES = {
+    'csv': ('.csv', lambda df, path: df.to_csv(path, index=False), read_csv_files),
+    'parquet': ('.parquet', lambda df, path: df.to_parquet(path, index=False), read_parquet_files),
+    'feather': ('.feather', lambda df, path: df.to_feather(path), read_feather_files),
+    'npz': ('.npz', lambda df, path: np.savez(path, **{col: df[col].to_numpy() for col in df}), read_npz_files),
+}
+
+
+@pytest.mark.parametrize('input_type', list(ROUND_TRIP_TYPES) + ['csv_chunks'])
+def test_loaders_round_trip(tmp_path, input_type):
+    if input_type in ('parquet', 'feather'):
+        pytest.importorskip('pyarrow')
+    input_data = generate_input_data(50, seed=0)
+    extension, write, read = ROUND_TRIP_TYPES['csv' if input_type == 'csv_chunks' else input_type]
+    path = str(tmp_path / ('input_data' + extension))
+    write(input_data, path)
+    if input_type == 'csv_chunks':
+        loaded = pd.concat(read_csv_chunks(path, chunk_size=7))
+    else:
+        loaded = read([path])['input_data']
+    pdt.assert_frame_equal(loaded, input_data, check_dtype=False, check_exact=True)
+
+
+def get_output_df_dict(n_periods=25):
+    rng = np.random.default_rng(0)
+    periods = np.arange(1, n_periods + 1)
+    return {'production_variables': pd.DataFrame({'period': periods, 'value': rng.uniform(0, 1000, n_periods)}),
+            'inventory_variables': pd.DataFrame({'period': periods, 'value': rng.integers(0, 100, n_periods)})}
+
+
+def split(df, chunk_size):
+    # As process_data.iter_output_chunks, each chunk's index starts at 0
+    return [df.iloc[start:start + chunk_size].reset_index(drop=True) for start in range(0, len(df), chunk_size)]
+
+
+@pytest.mark.parametrize('output_type', ['csv', 'csv.gz'])
+def test_chunked_csv_is_the_same_as_write_to_csv(tmp_path, output_type):
+    pytest.importorskip('pyarrow')
+    output_df_dict = get_output_df_dict()
+    write_to_csv(output_df_dict, str(tmp_path / 'full'))
+    write_output_chunks({key: split(df, 10) for key, df in output_df_dict.items()}, str(tmp_path / 'chunks'),
+                        output_type)
+    for key in output_df_dict:
+        expected = (tmp_path / 'full' / f'optimal_{key}.csv').read_bytes()
+        path = tmp_path / 'chunks' / f'optimal_{key}.{output_type}'
+        assert (gzip.decompress(path.read_bytes()) if output_type == 'csv.gz' else path.read_bytes()) == expected
+
+
+@pytest.mark.parametrize('output_type', ['csv', 'parquet'])
+def test_output_files_have_the_umask_mode(tmp_path, output_type):
+    pytest.importorskip('pyarrow')
+    umask = os.umask(0o022)
+    try:
+        write_output_chunks({key: [df] for key, df in get_output_df_dict().items()}, str(tmp_path), output_type)
+        write_to_csv(get_output_df_dict(), str(tmp_path / 'csv'))
+    finally:
+        os.umask(umask)
+    paths = [p for p in tmp_path.rglob('optimal_*')]
+    assert len(paths) == 4
+    assert all(stat.S_IMODE(os.stat(path).st_mode) == 0o644 for path in paths)
@@ -0,0 +1,31 @@
+import pytest
+
+from generate_data import generate_input_data
+from optimization_model_pulp import OptimizationModel
+from parameters import model_params
+
+PARAMS = {'holding_cost': 8, 'initial_inventory': 500}
+
+
+def solve(input_data, solver, build_mode=None):
+    model_params['solver'] = solver
+    model_params['build_mode'] = build_mode
+    optimizer = OptimizationModel(input_data, PARAMS)
+    optimizer.optimize()
+    return optimizer
+
+
+# With the 'ir' build mode, HiGHS gets the arrays of the model IR, and otherwise those read from the pulp model
+@pytest.mark.parametrize('setup_costs', [False, True], ids=['lp', 'setup'])
+@pytest.mark.parametrize('build_mode', [None, 'ir'])
+def test_highs_matches_cbc(build_mode, setup_costs):
+    pytest.importorskip('highspy')
+    input_data = generate_input_data(60, seed=0, initial_inventory=PARAMS['initial_inventory'])
+    if setup_costs:
+        input_data['setup_cost'] = 20000.0
+    expected = solve(input_data, None)
+    optimizer = solve(input_data, 'highs', build_mode)
+    assert optimizer.status == 'Optimal'
+    assert optimizer.objective_value == pytest.approx(expected.objective_value, rel=1e-6)
+    production = optimizer.get_output()['production_variables']['value'].to_numpy()
+    assert (production <= input_data['production_capacity'].to_numpy() + 1e-6).all()
@@ -0,0 +1,14 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('module', ['helper', 'cache', 'metrics', 'execute_oo'])
+def test_import_does_not_load_parameters(module):
+    # execute_oo.main sets model_params from the command line before anything reads them (see helper.load_raw_data)
+    code = f'import sys, {module}; sys.exit("parameters" in sys.modules)'
+    assert subprocess.run([sys.executable, '-c', code], cwd=REPO).returncode == 0
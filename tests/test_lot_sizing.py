@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from generate_data import generate_input_data, get_input_params
+from lot_sizing import solve_setup_lot_sizing
+from optimization_model_pulp import OptimizationModel
+from process_data import create_output_df_dict, get_plan_cost
+
+
+def get_output_df_dict(production, inventory):
+    # The plan of solve_setup_lot_sizing as the output of a model, for process_data.get_plan_cost
+    periods = np.arange(1, len(production) + 1)
+    return create_output_df_dict({'production_variables': (periods, production),
+                                  'inventory_variables': (periods, inventory)})
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_wagner_whitin_matches_the_mip_without_binding_capacities(seed):
+    input_data = generate_input_data(40, seed=seed)
+    input_data['setup_cost'] = 100000.0
+    input_data['production_capacity'] = input_data['demand'].sum()
+    production, inventory, _, optimal = solve_setup_lot_sizing(input_data, get_input_params())
+    assert optimal
+    mip = OptimizationModel(input_data, get_input_params())
+    mip.optimize()
+    assert get_plan_cost(input_data, get_input_params(), get_output_df_dict(production, inventory)) \
+        == pytest.approx(mip.objective_value, rel=1e-6)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_capacitated_heuristic_is_feasible_and_bounded_by_the_mip(seed):
+    input_data = generate_input_data(40, seed=seed, capacity_tightness=0.6)
+    input_data['setup_cost'] = 100000.0
+    production, inventory, setups, _ = solve_setup_lot_sizing(input_data, get_input_params())
+    if setups is None:
+        pytest.skip('the heuristic found no plan')
+    capacity = input_data['production_capacity'].to_numpy()
+    assert (production <= capacity * setups + 1e-6).all()
+    assert inventory.min() >= -1e-6
+    assert np.allclose(get_input_params()['initial_inventory'] + np.cumsum(production - input_data['demand']),
+                       inventory)
+    mip = OptimizationModel(input_data, get_input_params())
+    mip.optimize()
+    assert get_plan_cost(input_data, get_input_params(), get_output_df_dict(production, inventory)) \
+        >= mip.objective_value * (1 - 1e-6)
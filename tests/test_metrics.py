@@ -0,0 +1,84 @@
+import json
+import pstats
+
+import numpy as np
+import pytest
+
+import metrics
+from parameters import model_params
+
+
+@pytest.fixture(autouse=True)
+def clean_records():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_phase_records_its_own_rss_increase():
+    if metrics.get_peak_rss() is None:
+        pytest.skip('the peak RSS is not available on this platform')
+    with metrics.phase('small'):
+        pass
+    with metrics.phase('large'):
+        # Above any earlier peak of the process, so the peak RSS has to grow
+        array = np.ones(metrics.get_peak_rss() // 8 + (64 << 17))
+        del array
+    with metrics.phase('after'):
+        pass
+    small, large, after = metrics.get_records()
+    assert small['rss_increase'] == 0
+    assert large['rss_increase'] >= 64 << 20
+    assert after['rss_increase'] == 0
+
+
+def test_phase_is_recorded_when_it_raises():
+    with pytest.raises(ZeroDivisionError):
+        with metrics.phase('failing', module='pulp'):
+            1 / 0
+    record, = metrics.get_records()
+    assert record['phase'] == 'failing' and record['module'] == 'pulp'
+
+
+def test_prometheus_types_and_escaped_labels():
+    for _ in range(3):
+        with metrics.phase('solve', solver='a "quoted" \\ name\n'):
+            pass
+    text = metrics.to_prometheus()
+    assert f'# TYPE {metrics.PROMETHEUS_PREFIX}_runs_total counter' in text
+    assert f'# TYPE {metrics.PROMETHEUS_PREFIX}_wall_seconds gauge' in text
+    assert (f'{metrics.PROMETHEUS_PREFIX}_runs_total{{phase="solve",solver="a \\"quoted\\" \\\\ name\\n"}} 3'
+            in text.splitlines())
+
+
+def test_write_metrics(tmp_path):
+    with metrics.phase('build'):
+        pass
+    metrics.write_metrics(str(tmp_path / 'metrics.jsonl'))
+    metrics.write_metrics(str(tmp_path / 'metrics.jsonl'))
+    lines = (tmp_path / 'metrics.jsonl').read_text().splitlines()
+    assert [json.loads(line)['phase'] for line in lines] == ['build', 'build']
+    metrics.write_metrics(str(tmp_path / 'metrics.prom'))
+    assert (tmp_path / 'metrics.prom').read_text() == metrics.to_prometheus()
+    # The same mode as the .jsonl file, not the 0600 of a temporary file
+    assert (tmp_path / 'metrics.prom').stat().st_mode == (tmp_path / 'metrics.jsonl').stat().st_mode
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def profiled_work():
+    return sum(np.arange(1000).tolist())
+
+
+def test_profiled_phase_writes_its_profile(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, '_profile_counts', {})
+    model_params.update({'profile_phases': ['build'], 'profiler': 'both', 'profile_dir': str(tmp_path)})
+    for _ in range(2):
+        with metrics.phase('build'):
+            with metrics.phase('solve'):
+                profiled_work()
+    # Only 'build' is profiled, and its second run doesn't overwrite the first one
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'profile_build.pstats', 'profile_build_2.pstats', 'profile_build_2_memory.txt', 'profile_build_memory.txt']
+    stats = pstats.Stats(str(tmp_path / 'profile_build.pstats'))
+    assert any(name == 'profiled_work' for _, _, name in stats.stats)
+    assert (tmp_path / 'profile_build_memory.txt').read_text().startswith('Peak traced memory of build')
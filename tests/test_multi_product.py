@@ -0,0 +1,77 @@
+import pandas as pd
+import pytest
+
+from generate_data import generate_input_data, generate_multi_product_instance
+from helper import get_optimization_model
+from multi_product import MultiProductModel, build_multi_product_ir
+from parameters import model_params
+
+PARAMS = {'holding_cost': 8, 'initial_inventory': 500}
+
+
+def get_single_product_tables(input_data, product='p', plant='a'):
+    # The single-product model as the tables of multi_product.load_multi_product_data
+    product_data = input_data[['period', 'demand', 'production_cost']].assign(product=product, plant=plant)
+    plant_capacity = input_data[['period', 'production_capacity']].assign(plant=plant)
+    initial_inventory = pd.DataFrame({'product': [product], 'plant': [plant],
+                                      'initial_inventory': [PARAMS['initial_inventory']]})
+    return {'product_data': product_data, 'plant_capacity': plant_capacity, 'initial_inventory': initial_inventory}
+
+
+def solve(input_df_dict, module=None):
+    optimizer = MultiProductModel(input_df_dict, PARAMS, module)
+    optimizer.optimize()
+    return optimizer
+
+
+@pytest.mark.parametrize('solver', [None, 'highs'])
+def test_one_product_matches_single_product_model(solver):
+    model_params['solver'] = solver
+    input_data = generate_input_data(30, seed=0, initial_inventory=PARAMS['initial_inventory'])
+    single = get_optimization_model()(input_data, PARAMS)
+    single.optimize()
+
+    optimizer = solve(get_single_product_tables(input_data))
+    assert optimizer.status == 'Optimal'
+    assert optimizer.objective_value == pytest.approx(single.objective_value)
+    plan = optimizer.get_output()['multi_product_plan']
+    assert plan['production'].to_numpy() == pytest.approx(single.get_output()['production_variables']['value'])
+
+
+@pytest.mark.parametrize('module', ['gurobi', 'cplex', 'xpress'])
+def test_modules_match_pulp(module):
+    pytest.importorskip({'gurobi': 'gurobipy', 'cplex': 'docplex', 'xpress': 'xpress'}[module])
+    input_df_dict = generate_multi_product_instance(20, 4, 12)
+    expected = solve(input_df_dict).objective_value
+    optimizer = solve(input_df_dict, module)
+    assert optimizer.objective_value == pytest.approx(expected)
+    plan = optimizer.get_output()['multi_product_plan']
+    assert len(plan) == len(input_df_dict['product_data'])
+    assert (plan[['production', 'inventory']] >= -1e-6).all().all()
+
+
+def test_native_module_is_rejected():
+    with pytest.raises(ValueError, match='native'):
+        MultiProductModel(generate_multi_product_instance(2, 2, 4), PARAMS, 'native')
+
+
+def test_names_are_unique_for_any_product_and_plant():
+    # 'a b' and 'a_b' would be the same name once pulp replaces the space
+    input_data = generate_input_data(5, seed=0, initial_inventory=PARAMS['initial_inventory'])
+    tables = [get_single_product_tables(input_data, product, plant) for product, plant in [('a b', 'x'), ('a_b', 'x')]]
+    input_df_dict = {name: pd.concat([table[name] for table in tables], ignore_index=True) for name in tables[0]}
+    input_df_dict['plant_capacity'] = input_df_dict['plant_capacity'].groupby(['plant', 'period'], as_index=False).sum()
+
+    ir = build_multi_product_ir(input_df_dict, PARAMS)
+    assert len(set(ir['col_names'])) == len(ir['col_names'])
+    assert len(set(ir['row_names'])) == len(ir['row_names'])
+    assert solve(input_df_dict).status == 'Optimal'
+
+
+@pytest.mark.parametrize('table', ['initial_inventory', 'plant_capacity'])
+def test_duplicate_keys_are_rejected(table):
+    input_data = generate_input_data(5, seed=0, initial_inventory=PARAMS['initial_inventory'])
+    input_df_dict = get_single_product_tables(input_data)
+    input_df_dict[table] = pd.concat([input_df_dict[table], input_df_dict[table].iloc[:1]], ignore_index=True)
+    with pytest.raises(ValueError, match='many-to-one'):
+        build_multi_product_ir(input_df_dict, PARAMS)
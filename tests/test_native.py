@@ -0,0 +1,19 @@
+import pytest
+
+from generate_data import get_native_instance
+from optimization_model_native import OptimizationModel as NativeModel
+from optimization_model_pulp import OptimizationModel as PulpModel
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_native_matches_pulp(seed):
+    # Some of the instances are infeasible (see get_native_instance); then both should say so
+    input_data, input_params = get_native_instance(seed, 200)
+    native = NativeModel(input_data, input_params)
+    native.optimize()
+    lp = PulpModel(input_data, input_params)
+    lp.optimize()
+    assert native.status == lp.status
+    if lp.status == 'Optimal':
+        assert native.objective_value == pytest.approx(lp.objective_value, rel=1e-6)
+        assert native.get_output()['inventory_variables']['value'].min() >= -1e-6
@@ -0,0 +1,54 @@
+import pytest
+
+import metrics
+from generate_data import get_input_params, get_presolve_input_data
+from helper import get_optimization_model
+from parameters import model_params
+from presolve import PresolvedModel
+
+
+@pytest.mark.parametrize('capacity_tightness', [0.85, 0.98])
+def test_presolve_matches_full_solve(capacity_tightness):
+    input_data = get_presolve_input_data(300, 30, capacity_tightness=capacity_tightness)
+    OptimizationModel = get_optimization_model()
+    full = OptimizationModel(input_data, get_input_params())
+    full.optimize()
+
+    presolved = PresolvedModel(input_data, get_input_params(), OptimizationModel)
+    presolved.optimize()
+    assert presolved.status == 'Optimal'
+    assert presolved.objective_value == pytest.approx(full.objective_value)
+    assert presolved.report['n_blocks'] <= len(input_data)
+    values = presolved.get_values()
+    assert len(values['production_variables'][1]) == len(input_data)
+    assert (values['production_variables'][1] <= input_data['production_capacity'].to_numpy() + 1e-6).all()
+
+
+def test_presolve_phases_are_timed():
+    metrics.reset()
+    input_data = get_presolve_input_data(60, 30)
+    presolved = PresolvedModel(input_data, get_input_params(), get_optimization_model())
+    presolved.optimize()
+    phases = [record['phase'] for record in metrics.get_records()]
+    # The outer build and optimize are the last ones, after those of the reduced models
+    assert phases[0] == 'build' and phases[-1] == 'optimize' and 'presolve' in phases
+
+
+def test_presolve_report():
+    model_params['presolve_compare'] = True
+    input_data = get_presolve_input_data(120, 30)
+    # Two closed periods, with no capacity and no demand
+    input_data.loc[[10, 11], ['demand', 'production_capacity']] = 0
+    presolved = PresolvedModel(input_data, get_input_params(), get_optimization_model())
+    presolved.optimize()
+    report = presolved.report
+    assert report['n_no_capacity'] == 2
+    assert report['reduction'] == pytest.approx(1 - report['n_blocks'] / 120)
+    assert report['build_time'] > 0 and report['solve_time'] > 0
+    assert report['total_time'] >= report['presolve_time'] + report['build_time'] + report['solve_time']
+    full_time = report['full_build_time'] + report['full_solve_time']
+    assert report['time_saved'] == pytest.approx(1 - report['total_time'] / full_time)
+
+    model_params['presolve_compare'] = False
+    presolved.optimize()
+    assert presolved.report['time_saved'] is None
@@ -0,0 +1,28 @@
+import pytest
+
+from generate_data import generate_input_data
+from helper import get_optimization_model
+from process_data import check_feasibility
+
+PARAMS = {'holding_cost': 8, 'initial_inventory': 500}
+
+
+def test_infeasible_instance_is_reported():
+    input_data = generate_input_data(10, seed=0, initial_inventory=PARAMS['initial_inventory'])
+    assert check_feasibility(input_data, PARAMS) is None
+
+    # The demand of period 6 is more than its capacity plus what the earlier periods can still produce
+    spare = (input_data['production_capacity'] - input_data['demand']).iloc[:6].sum() + PARAMS['initial_inventory']
+    input_data.loc[5, 'demand'] += spare + 100
+    infeasibility = check_feasibility(input_data, PARAMS)
+    assert infeasibility == {'period': int(input_data.loc[5, 'period']), 'shortfall': pytest.approx(100)}
+
+    optimizer = get_optimization_model()(input_data, PARAMS)
+    optimizer.optimize()
+    assert optimizer.status == 'Infeasible'
+
+
+def test_demand_scenario_is_checked():
+    input_data = generate_input_data(10, seed=0, initial_inventory=PARAMS['initial_inventory'])
+    demand = input_data['production_capacity'].to_numpy() * 2
+    assert check_feasibility(input_data, PARAMS, demand=demand)['period'] == int(input_data['period'].iat[0])
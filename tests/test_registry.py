@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from registry import Registry
+
+
+def test_registry_is_a_mapping_of_consecutive_keys():
+    registry = Registry(3, ['a', 'b', 'c'])
+    assert registry[3] == 'a' and registry[5] == 'c'
+    assert dict(registry) == {3: 'a', 4: 'b', 5: 'c'}
+    assert list(registry.keys()) == [3, 4, 5] and list(registry.values()) == ['a', 'b', 'c']
+    assert registry.periods.tolist() == [3, 4, 5]
+    assert 4 in registry and 6 not in registry and 'a' not in registry and 3.5 not in registry
+    for key in (2, 6, 'a'):
+        with pytest.raises(KeyError):
+            registry[key]
+    assert registry.get(6) is None
+
+
+def test_registry_extend_and_get_range():
+    registry = Registry()
+    registry.extend(10, ['a', 'b'])
+    registry.extend(12, ['c'])
+    assert registry.get_range(11, 13) == ['b', 'c']
+    with pytest.raises(ValueError):
+        registry.extend(14, ['e'])
+    with pytest.raises(KeyError):
+        registry.get_range(11, 14)
+
+
+def test_registry_of_an_array():
+    registry = Registry(0, np.array([1.0, 2.0]))
+    registry.extend(2, np.array([3.0]))
+    assert registry.values().tolist() == [1.0, 2.0, 3.0]
+    assert registry[2] == 3.0
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from parameters import model_params
+from process_data import get_required_inventory, load_data
+from rolling_horizon import compare_with_full_solve
+
+
+@pytest.fixture
+def csv_data():
+    model_params['input_type'] = 'csv'
+    input_df_dict, input_params = load_data()
+    return input_df_dict['input_data'], input_params
+
+
+def test_required_inventory():
+    # E.g. after the first period, the next three need 60 more than their capacity
+    required = get_required_inventory([10, 10, 200, 150, 0], [100, 100, 100, 100, 100])
+    np.testing.assert_allclose(required, [60, 150, 50, 0, 0])
+
+
+@pytest.mark.parametrize('window_length, overlap', [(5, 2), (4, 1), (3, 0), (2, 1), (1, 0), (12, 0)])
+@pytest.mark.parametrize('module', [None, 'native'])
+def test_windows_leave_enough_inventory(csv_data, window_length, overlap, module):
+    # E.g. the first window of 5 periods used to leave too little inventory for periods 6 to 9
+    row = compare_with_full_solve(*csv_data, window_length, overlap, module)
+    assert row['rolling_objective'] == pytest.approx(row['full_objective'])
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from generate_data import generate_input_data, get_input_params
+from helper import get_optimization_model
+from sensitivity import sensitivity_analysis
+
+# The values of each parameter, as in benchmark.py sensitivity
+SENSITIVITY_RANGES = {'holding_cost': (0, 40), 'initial_inventory': (0, 20000), 'capacity_scale': (1, 1.5)}
+
+
+@pytest.mark.parametrize('parameter', list(SENSITIVITY_RANGES))
+def test_sensitivity_matches_independent_solves(parameter):
+    # The objective values found from lines (without a solve) are those of solving each value on its own
+    input_data = generate_input_data(60, seed=0, capacity_tightness=0.7)
+    values = np.linspace(*SENSITIVITY_RANGES[parameter], 9)
+    sweep_df, breakpoints_df = sensitivity_analysis(input_data, get_input_params(), parameter, values)
+    assert sweep_df['value'].tolist() == pytest.approx(values.tolist())
+
+    for value, status, objective in sweep_df[['value', 'status', 'objective']].itertuples(index=False):
+        scenario_data, input_params = input_data, get_input_params()
+        if parameter == 'capacity_scale':
+            scenario_data = input_data.assign(production_capacity=input_data['production_capacity'] * value)
+        else:
+            input_params[parameter] = value
+        optimizer = get_optimization_model()(scenario_data, input_params)
+        optimizer.optimize()
+        assert status == optimizer.status
+        if status == 'Optimal':
+            assert objective == pytest.approx(optimizer.objective_value, rel=1e-6)
+    assert (breakpoints_df['left_slope'] != breakpoints_df['right_slope']).all()
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+from service import SolveService, parse_job_request, start_server
+
+INPUT_DATA = {'period': [1, 2, 3], 'demand': [100, 200, 300], 'production_cost': [10, 10, 10],
+              'production_capacity': [400, 400, 400]}
+PARAMETERS = {'holding_cost': 1, 'initial_inventory': 0}
+
+
+async def request(port, method, path, body=None):
+    # Returns the status code and the body of the response (a list of json objects if it's chunked)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = b'' if body is None else json.dumps(body).encode()
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n'.encode()
+                 + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    code = int(head.split(b' ', 2)[1])
+    if b'Transfer-Encoding: chunked' not in head:
+        return code, json.loads(content)
+    objects = []
+    while True:
+        size, _, content = content.partition(b'\r\n')
+        if int(size, 16) == 0:
+            return code, objects
+        objects.append(json.loads(content[:int(size, 16)]))
+        content = content[int(size, 16) + 2:]
+
+
+def run_with_server(test, **kwargs):
+    # Runs test(service, port) against a service on a free localhost port
+    async def main():
+        service = SolveService(**kwargs)
+        server = await start_server(service, '127.0.0.1', 0)
+        try:
+            async with server:
+                await test(service, server.sockets[0].getsockname()[1])
+        finally:
+            service.close()
+    asyncio.run(main())
+
+
+def test_submit_events_and_result():
+    async def test(service, port):
+        code, job = await request(port, 'POST', '/jobs', {'input_data': INPUT_DATA, 'parameters': PARAMETERS})
+        assert code == 202 and job['state'] == 'queued'
+        code, events = await request(port, 'GET', f"/jobs/{job['job_id']}/events")
+        assert code == 200 and events[-1]['state'] == 'done'
+        code, job = await request(port, 'GET', f"/jobs/{job['job_id']}")
+        assert code == 200 and job['result']['status'] == 'Optimal'
+        assert job['result']['objective_value'] == (100 + 200 + 300) * 10
+        assert job['result']['output']['production_variables']['value'] == [100, 200, 300]
+        assert service.n_active == 0
+    run_with_server(test)
+
+
+def test_infeasible_job():
+    async def test(service, port):
+        input_data = {**INPUT_DATA, 'production_capacity': [400, 0, 0]}
+        code, job = await request(port, 'POST', '/jobs', {'input_data': input_data, 'parameters': PARAMETERS})
+        assert code == 202
+        _, events = await request(port, 'GET', f"/jobs/{job['job_id']}/events")
+        result = events[-1]['result']
+        assert result['status'] == 'Infeasible' and result['shortfall_period'] == 3 and result['shortfall'] == 200
+        assert service.n_active == 0
+    run_with_server(test)
+
+
+def test_invalid_jobs_are_rejected():
+    async def test(service, port):
+        payloads = [{'input_data': {**INPUT_DATA, 'demand': [100, 'a lot', 300]}, 'parameters': PARAMETERS},
+                    {'input_data': INPUT_DATA, 'parameters': {**PARAMETERS, 'initial_inventory': '500'}},
+                    {'input_data': INPUT_DATA, 'parameters': {'holding_cost': 1}},
+                    {'input_data': INPUT_DATA, 'parameters': PARAMETERS, 'time_limit': 'soon'},
+                    {'input_data': {'period': [1]}, 'parameters': PARAMETERS}]
+        for payload in payloads:
+            code, body = await request(port, 'POST', '/jobs', payload)
+            assert code == 400 and 'error' in body
+        assert service.n_active == 0 and not service.jobs
+    run_with_server(test)
+
+
+@pytest.mark.parametrize('time_limit, expected', [(None, 60.0), (600, 60.0), (30, 30.0)])
+def test_time_limit_is_capped(time_limit, expected):
+    # An explicit null is the same as no time_limit, so it gets the cap rather than no limit at all
+    payload = {'input_data': INPUT_DATA, 'parameters': PARAMETERS, 'time_limit': time_limit}
+    assert parse_job_request(payload, max_time_limit=60)[3] == expected
+    payload.pop('time_limit')
+    assert parse_job_request(payload, max_time_limit=60)[3] == 60.0
+
+
+def test_queue_full():
+    async def test(service, port):
+        # The only worker slot is taken, so the first job stays queued and the queue is full
+        await service._slots.acquire()
+        payload = {'input_data': INPUT_DATA, 'parameters': PARAMETERS}
+        code, job = await request(port, 'POST', '/jobs', payload)
+        assert code == 202
+        code, body = await request(port, 'POST', '/jobs', payload)
+        assert code == 429 and 'error' in body
+        service._slots.release()
+        _, events = await request(port, 'GET', f"/jobs/{job['job_id']}/events")
+        assert events[-1]['state'] == 'done'
+        code, _ = await request(port, 'POST', '/jobs', payload)
+        assert code == 202
+    run_with_server(test, max_workers=1, max_queue=1)
+
+
+def test_unknown_job():
+    async def test(service, port):
+        assert (await request(port, 'GET', '/jobs/42'))[0] == 404
+        assert (await request(port, 'GET', '/jobs'))[0] == 405
+    run_with_server(test)
@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+import pulp
+
+from parameters import model_params
+from solver_race import race
+
+
+def test_race_keeps_solver_files_out_of_the_working_directory(tmp_path, tmp_path_factory, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # The temp directory of the winner is kept with write_log
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path_factory.mktemp('race')))
+    model_params.update(write_log=True, race_log=None)
+    model = pulp.LpProblem('prod_planning', pulp.LpMinimize)
+    x = pulp.LpVariable('x', lowBound=0)
+    model += x
+    model += x >= 3
+    assert race(model, ['cbc', 'highs']) == pulp.LpStatusOptimal
+    assert x.varValue == 3
+    assert os.listdir(tmp_path) == []